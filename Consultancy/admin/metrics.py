@@ -0,0 +1,81 @@
+import pandas as pd
+import streamlit as st
+
+from gsheets import recent_calls
+from outbox import MAX_ATTEMPTS, dead_letters, requeue_dead_letters, discard_dead_letters
+from resource import cached_frames
+from schema import frame_memory, untyped_memory
+
+
+def _summarise(calls, by):
+    df = pd.DataFrame(calls)
+    return (
+        df.groupby(by, dropna=False)
+        .agg(calls=("op", "size"), seconds=("seconds", "sum"), bytes=("bytes", "sum"), errors=("error", "count"))
+        .sort_values("seconds", ascending=False)
+        .reset_index()
+    )
+
+
+def show_sheets_metrics():
+    st.subheader("📈 Google Sheets Usage")
+
+    last_rerun = st.session_state.get("last_rerun_sheets_calls", [])
+    if last_rerun:
+        total = sum(call["seconds"] for call in last_rerun)
+        st.caption(f"Previous rerun ({last_rerun[0]['page']}): {len(last_rerun)} call(s), {total:.2f}s in Google Sheets")
+        st.dataframe(_summarise(last_rerun, ["op", "worksheet"]), use_container_width=True, hide_index=True)
+    else:
+        st.caption("No Google Sheets calls in the previous rerun.")
+    show_outbox_dead_letters()
+
+    recent = list(recent_calls)
+    if recent:
+        with st.expander(f"Recent calls by page (last {len(recent)}, all sessions)"):
+            st.dataframe(_summarise(recent, ["page", "op", "worksheet"]), use_container_width=True, hide_index=True)
+
+
+def show_outbox_dead_letters():
+    dead = dead_letters()
+    if dead.empty:
+        return
+    st.warning(f"⚠ {int(dead['Rows'].sum())} outbox row(s) failed {MAX_ATTEMPTS} times and were set aside.")
+    st.dataframe(dead, use_container_width=True, hide_index=True)
+    col1, col2 = st.columns(2)
+    with col1:
+        if st.button("🔁 Retry set-aside rows", key="outbox_requeue_dead"):
+            st.success(f"Requeued {requeue_dead_letters()} row(s).")
+    with col2:
+        if st.button("🗑️ Discard set-aside rows", key="outbox_discard_dead"):
+            st.success(f"Discarded {discard_dead_letters()} row(s).")
+
+
+def memory_report():
+    """Bytes per frame as Sheets strings (before the schema) and typed (after)."""
+    frames = {f"Shared cache: {title}": df for title, df in cached_frames().items()}
+    frames.update({f"Session: {key}": value for key, value in st.session_state.items() if isinstance(value, pd.DataFrame)})
+    rows = [{
+        "Frame": name,
+        "Rows": len(df),
+        "As strings (MB)": round(untyped_memory(df) / 1e6, 2),
+        "Typed (MB)": round(frame_memory(df) / 1e6, 2),
+    } for name, df in frames.items()]
+    return pd.DataFrame(rows, columns=["Frame", "Rows", "As strings (MB)", "Typed (MB)"])
+
+
+def show_memory_report():
+    st.subheader("🧠 DataFrame Memory")
+    # Converting every frame back to strings is expensive; only do it on request.
+    if not st.button("📏 Measure frame memory", key="measure_frame_memory"):
+        st.caption("Compares the memory of the loaded frames with the same data as Sheets strings.")
+        return
+    report = memory_report()
+    if report.empty:
+        st.caption("No worksheet frames loaded in this process yet.")
+        return
+    st.caption(
+        f"Typed frames use {report['Typed (MB)'].sum():.2f} MB; "
+        f"the same data as Sheets strings would use {report['As strings (MB)'].sum():.2f} MB. "
+        "Each session works on its own copy of the shared frames it reads."
+    )
+    st.dataframe(report, use_container_width=True, hide_index=True)
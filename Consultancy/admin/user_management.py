@@ -1,76 +1,108 @@
+import pandas as pd
 import streamlit as st
 from modules.authentication import require_role
+from modules.email_utils import send_email, show_mail_queue_status
 from modules.user_utils import (
-    spreadsheet,
-    approve_user,
-    ensure_users_sheet,
+    approve_users,
+    disapprove_users,
+    get_users_sheet,
+    get_user_directory,
+    invalidate_user_directory,
+    locate_user,
     delete_registration_request,
     log_registration_event,
-    ensure_reg_requests_sheet
+    ensure_reg_requests_sheet,
+    get_reg_requests_data
 )
 
 from constants import REG_REQUESTS_SHEET
+from gsheets import get_spreadsheet
+from replica import query_frame
+from admin.metrics import show_sheets_metrics, show_memory_report
 
 def admin_panel():
     require_role(["admin"])
     st.header("🛠 Admin Panel: Approve Users")
 
     admin_username = st.session_state.get("username", "unknown_admin")
+    spreadsheet = get_spreadsheet()
 
     # -- Section 1: Pending Requests --
     st.subheader("📥 Pending Registration Requests")
-    sheet = ensure_reg_requests_sheet(spreadsheet)
-    requests = sheet.get_all_records()
+    # Results of the last bulk action survive the st.rerun() that refreshes the list.
+    for level, message in st.session_state.pop("admin_notices", []):
+        getattr(st, level)(message)
+    show_mail_queue_status()
+
+    local_requests = query_frame(REG_REQUESTS_SHEET)
+    if local_requests is not None:
+        requests = local_requests.to_dict("records")
+    else:
+        requests = get_reg_requests_data(ensure_reg_requests_sheet(spreadsheet))
 
     if not requests:
         st.info("No pending registration requests.")
     else:
-        for user in requests:
-            with st.expander(f"Request from {user['Username']}"):
-                st.write(f"Name: {user['Full Name']}")
-                st.write(f"Email: {user['Email']}")
-                st.write(f"Requested Role: {user['Role']}")
-
-                assigned_role = st.selectbox(
-                    f"Assign Role to {user['Username']}",
-                    ["supervisor", "officer", "admin"],
-                    index=["supervisor", "officer", "admin"].index(user["Role"]),
-                    key=f"role_{user['Username']}"
-                )
-
-                col1, col2 = st.columns([1, 1])
-
-                with col1:
-                    if st.button(f"✅ Approve {user['Username']}", key=f"approve_{user['Username']}"):
-                        user["Role"] = assigned_role
-                        msg = approve_user(user, admin_username, spreadsheet)
-                        st.success(msg)
-                        log_registration_event(user["Username"], "approved", admin_username, spreadsheet)
-
-                        
-
-                        st.session_state.approve_user_rerun = True
-                        st.rerun()
-
-                with col2:
-                    if st.button(f"❌ Disapprove {user['Username']}", key=f"disapprove_{user['Username']}"):
-                        delete_registration_request(user["Username"], spreadsheet)
-                        log_registration_event(user["Username"], "disapproved", admin_username, spreadsheet)
-
+        roles = ["supervisor", "officer", "admin"]
+        pending = pd.DataFrame([{
+            "Select": False,
+            "Username": user["Username"],
+            "Full Name": user["Full Name"],
+            "Email": user["Email"],
+            "Requested Role": user["Role"],
+            "Assign Role": user["Role"] if user["Role"] in roles else "officer",
+        } for user in requests])
+
+        edited = st.data_editor(
+            pending,
+            key="pending_requests_editor",
+            hide_index=True,
+            use_container_width=True,
+            disabled=["Username", "Full Name", "Email", "Requested Role"],
+            column_config={
+                "Select": st.column_config.CheckboxColumn("Select"),
+                "Assign Role": st.column_config.SelectboxColumn("Assign Role", options=roles, required=True),
+            }
+        )
+        selected = edited[edited["Select"]]
+        by_username = {user["Username"]: user for user in requests}
+        selected_requests = [
+            {**by_username[row["Username"]], "Role": row["Assign Role"]}
+            for _, row in selected.iterrows()
+        ]
+        st.caption(f"{len(selected_requests)} of {len(requests)} request(s) selected.")
+
+        col1, col2 = st.columns([1, 1])
+
+        with col1:
+            if st.button("✅ Approve selected", disabled=not selected_requests):
+                approved, skipped = approve_users(selected_requests, admin_username, spreadsheet)
+                notices = []
+                if approved:
+                    notices.append(("success", f"Approved {len(approved)} user(s): {', '.join(approved)}"))
+                notices += [("warning", f"Skipped '{username}': {reason}") for username, reason in skipped.items()]
+                st.session_state.admin_notices = notices
+                st.session_state.approve_user_rerun = True
+                st.rerun()
+
+        with col2:
+            if st.button("❌ Disapprove selected", disabled=not selected_requests):
+                removed = disapprove_users(selected_requests, admin_username, spreadsheet)
+                for user in selected_requests:
+                    if user["Username"] in removed:
                         send_email(
                             recipient=user["Email"],
                             subject="❌ Your Registration has been Disapproved",
                             body=f"Hi {user['Full Name']},\n\nWe regret to inform you that your registration request has been disapproved.\n\nIf you have questions, please contact the admin.\n\n- Admin Team"
                         )
-
-                        st.warning(f"User '{user['Username']}' has been disapproved.")
-                        st.session_state.disapprove_user_rerun = True
-                        st.rerun()
+                st.session_state.admin_notices = [("warning", f"Disapproved {len(removed)} request(s).")]
+                st.session_state.disapprove_user_rerun = True
+                st.rerun()
 
     # -- Section 2: Delete Approved Users --
     st.subheader("🗑 Manage Existing Users")
-    users_sheet = ensure_users_sheet(spreadsheet)
-    approved_users = users_sheet.get_all_records()
+    users_sheet = get_users_sheet()
+    approved_users = get_user_directory(users_sheet)["records"]
     usernames = [user["Username"] for user in approved_users]
 
     if usernames:
@@ -101,16 +133,14 @@ def admin_panel():
     else:
         st.info("No approved users to manage.")
 
+    # -- Section 3: Google Sheets usage --
+    show_sheets_metrics()
+    show_memory_report()
+
 def delete_user_from_users_sheet(username, users_sheet):
-    data = users_sheet.get_all_values()
-    header = data[0]
-    try:
-        username_col_index = header.index("Username")
-    except ValueError:
+    user = locate_user(users_sheet, "Username", username)
+    if user is None:
         return False
-
-    for i, row in enumerate(data[1:], start=2):  # Skip header
-        if row[username_col_index].strip().lower() == username.strip().lower():
-            users_sheet.delete_rows(i)
-            return True
-    return False
+    users_sheet.delete_rows(user["_row"])
+    invalidate_user_directory()
+    return True
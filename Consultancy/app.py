@@ -1,23 +1,28 @@
 
+import time
+rerun_started = time.perf_counter()  # before the imports, so time-to-login includes them
+
+import importlib
 import streamlit as st
 import streamlit.components.v1 as components
-import gspread
-from oauth2client.service_account import ServiceAccountCredentials
-
-from admin.show import show
-from admin.user_management import admin_panel
-
-from components import (
-    pm_form,
-    noise,
-    pm_calculation,
-    apartment
-)
 
 from modules.authentication import login, logout_button
-from modules.user_utils import ensure_users_sheet
-from resource import load_data_from_sheet, sheet, spreadsheet
-from constants import MERGED_SHEET, CALC_SHEET, USERS_SHEET, SPREADSHEET_ID
+from modules.user_utils import get_users_sheet
+from gsheets import get_spreadsheet, startup_timings, start_rerun_metrics
+from outbox import show_outbox_status
+from field_queue import pending_count
+from constants import MERGED_SHEET, CALC_SHEET, USERS_SHEET
+
+# Page modules are imported on first visit, so the login screen doesn't pay for
+# pandas-heavy pages (or their Sheets setup) that this user may never open.
+PAGE_MODULES = {
+    "Home": ("components.apartment", "show"),
+    "Particulate Matter": ("components.pm_form", "show"),
+    "PM Calculation": ("components.pm_calculation", "show"),
+    "Bulk Import": ("components.bulk_import", "show"),
+    "Noise/Stack/VOC/Gases": ("components.noise", "show"),
+    "Admin Panel": ("admin.user_management", "admin_panel"),
+}
 
 
 
@@ -35,17 +40,18 @@ from constants import MERGED_SHEET, CALC_SHEET, USERS_SHEET, SPREADSHEET_ID
 # ------------------------
 # 1. Google Sheets Auth
 # ------------------------
-creds_dict = st.secrets["GOOGLE_CREDENTIALS"]
-scope = ["https://spreadsheets.google.com/feeds", "https://www.googleapis.com/auth/drive"]
-creds = ServiceAccountCredentials.from_json_keyfile_dict(creds_dict, scope)
-client = gspread.authorize(creds)
-spreadsheet = client.open_by_key(SPREADSHEET_ID)
-users_sheet = ensure_users_sheet(spreadsheet)
+start_rerun_metrics()
+spreadsheet = get_spreadsheet()
+users_sheet = get_users_sheet()
 
 # ------------------------
 # 2. User Authentication
 # ------------------------
 logged_in, authenticator = login(users_sheet)
+if "login_screen_seconds" not in st.session_state:
+    # Time from the start of the session's first rerun until the login form was drawn.
+    st.session_state.login_screen_seconds = time.perf_counter() - rerun_started
+    print(f"Login screen ready in {st.session_state.login_screen_seconds:.2f}s: {startup_timings}")
 if not logged_in:
     st.stop()
 
@@ -70,14 +76,6 @@ if not logged_in:
 username = st.session_state.get("username")
 role = st.session_state.get("role")
 
-
-
-
-if "df" not in st.session_state:
-    with st.spinner("🔄 Loading data..."):
-        st.session_state.df = load_data_from_sheet(sheet)
-        st.session_state.sheet = sheet
-        st.session_state.spreadsheet = spreadsheet
 # ------------------------
 # 5. Role-Based Navigation
 # ------------------------
@@ -87,13 +85,15 @@ role_pages = {
         ("🦺 Particulate Matter", "Particulate Matter"),
         ("✍️ Noise/Stack/VOC/Gases", "Noise/Stack/VOC/Gases"),
         ("☘️ PM Calculation", "PM Calculation"),
+        ("📥 Bulk Import", "Bulk Import"),
         ("⚙️ Admin Panel", "Admin Panel")
     ],
     "officer": [
         ("🏠 Home", "Home"),
         ("🦺 Particulate Matter", "Particulate Matter"),
         ("✍️ Noise/Stack/VOC/Gases", "Noise/Stack/VOC/Gases"),
-        ("☘️ PM Calculation", "PM Calculation")
+        ("☘️ PM Calculation", "PM Calculation"),
+        ("📥 Bulk Import", "Bulk Import")
     ],
     "supervisor": [
         ("🏠 Home", "Home"),
@@ -124,6 +124,16 @@ with st.sidebar:
             st.session_state["selected_page"] = page
             break
     st.markdown("---")
+    show_outbox_status()
+    held = pending_count()
+    if held:
+        st.caption(f"⏸️ {held} field entr{'y' if held == 1 else 'ies'} held until you sync")
+    if role == "admin":
+        st.caption(
+            f"⏱️ Login screen: {st.session_state.login_screen_seconds:.2f}s "
+            f"(auth {startup_timings.get('authorize', 0):.2f}s, "
+            f"open {startup_timings.get('open_by_key', 0):.2f}s)"
+        )
     logout_button(authenticator)
     
 
@@ -132,16 +142,9 @@ with st.sidebar:
 # ------------------------
 choice = st.session_state.get("selected_page")
 
-if choice == "Home":
-    apartment.show()
-elif choice == "Particulate Matter":
-    pm_form.show()
-elif choice == "PM Calculation":
-    pm_calculation.show()
-elif choice == "Noise/Stack/VOC/Gases":
-    noise.show()
-elif choice == "Admin Panel":
-    admin_panel()
+if choice in PAGE_MODULES:
+    module_name, entry_point = PAGE_MODULES[choice]
+    getattr(importlib.import_module(module_name), entry_point)()
 
 st.markdown("""
 <hr>
@@ -0,0 +1,49 @@
+"""bcrypt hashes per second, overall and per core, for a range of cost factors and pool sizes.
+
+Run from the Consultancy directory:
+
+    python -m benchmarks.bench_hashing --rounds 10 11 12 --workers 1 2 4 --hashes 16
+"""
+import os
+import time
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+from modules.password_hashing import bcrypt_hash
+
+
+def run(rounds, workers, hashes):
+    # Same pool type the app uses; bcrypt releases the GIL, so workers hash on separate cores.
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        # Warm the workers so thread start-up isn't counted.
+        list(pool.map(bcrypt_hash, ["warmup"] * workers, [4] * workers))
+        started = time.perf_counter()
+        list(pool.map(bcrypt_hash, [f"password-{i}" for i in range(hashes)], [rounds] * hashes))
+        elapsed = time.perf_counter() - started
+    return {
+        "rounds": rounds,
+        "workers": workers,
+        "hashes": hashes,
+        "seconds": round(elapsed, 3),
+        "ms_per_hash": round(1000 * elapsed * workers / hashes, 1),
+        "hashes_per_second": round(hashes / elapsed, 2),
+        "hashes_per_second_per_core": round(hashes / elapsed / workers, 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rounds", type=int, nargs="+", default=[10, 11, 12])
+    parser.add_argument("--workers", type=int, nargs="+", default=sorted({1, os.cpu_count() or 1}))
+    parser.add_argument("--hashes", type=int, default=16, help="hashes per measurement")
+    args = parser.parse_args()
+
+    results = [run(rounds, workers, args.hashes) for rounds in args.rounds for workers in args.workers]
+    print(f"CPU cores: {os.cpu_count()}")
+    print(pd.DataFrame(results).to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,172 @@
+"""Sheets calls, bytes and wall time per rerun for each page, against fake_sheets.
+
+Run from the Consultancy directory:
+
+    python -m benchmarks.bench_pages --rows 1000 10000 100000 --latency 0.05
+"""
+import os
+import shutil
+import argparse
+import random
+import time
+from datetime import datetime, timedelta
+
+import pandas as pd
+from streamlit.testing.v1 import AppTest
+
+from constants import (
+    MAIN_SHEET,
+    MERGED_SHEET,
+    USERS_SHEET,
+    REG_REQUESTS_SHEET,
+    META_SHEET,
+    NOISE_SHEET_NAME,
+    SNAPSHOT_DIR
+)
+from fake_sheets import FakeSpreadsheet
+from sites import get_site_registry
+from gsheets import use_spreadsheet
+
+PAGES = ["app", "login", "pm_form", "pm_form_merge", "noise", "pm_calculation", "admin_panel"]
+
+OBSERVATION_HEADERS = [
+    "Entry Type", "Sector", "Company", "Region", "City", "Sampling Point",
+    "Sampling Point Description", "Longitude", "Latitude", "Pollutant", "Monitoring Officer", "Driver",
+    "Date Time", "Temperature (°C)", "RH (%)", "Pressure (mbar)",
+    "Weather", "Wind Speed", "Wind Direction", "Elapsed Time (min)", "Flow Rate (L/min)", "Observation", "Submitted By",
+    "Submitted At"
+]
+
+
+APP_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app.py")
+
+
+def _page_script(page, app_path=None):
+    import streamlit as st
+
+    if page == "app":
+        # The whole app as a logged-out visitor sees it: time-to-login-screen.
+        import runpy
+        runpy.run_path(app_path)
+        return
+    if page != "login":
+        st.session_state.authenticated = True
+        st.session_state.role = "admin"
+        st.session_state.username = "bench"
+
+    if page == "login":
+        from modules.authentication import login
+        from modules.user_utils import get_users_sheet
+        login(get_users_sheet())
+    elif page == "pm_form":
+        from components import pm_form
+        pm_form.show()
+    elif page == "pm_form_merge":
+        from constants import MERGED_SHEET
+        from gsheets import get_spreadsheet
+        from resource import display_merged_data
+        display_merged_data(get_spreadsheet(), MERGED_SHEET)
+    elif page == "noise":
+        from components import noise
+        noise.show()
+    elif page == "pm_calculation":
+        from components import pm_calculation
+        pm_calculation.show()
+    elif page == "admin_panel":
+        from admin.user_management import admin_panel
+        admin_panel()
+
+
+def synthetic_observations(rows, seed=0):
+    rng = random.Random(seed)
+    registry = get_site_registry()
+    sites = [(sector, company) for sector in registry.sectors() for company in registry.companies(sector)]
+    started = datetime(2024, 1, 1, 8, 0)
+    values = [OBSERVATION_HEADERS]
+    for i in range(rows // 2):
+        sector, company = rng.choice(sites)
+        start_at = started + timedelta(hours=6 * i)
+        stop_at = start_at + timedelta(hours=24)
+        common = [sector, company, "Greater Accra", "Accra", "Point 1"]
+        values.append(["START"] + common + ["Gate", "-0.2", "5.6", "PM₂.₅", "Officer", "Driver",
+                       start_at.strftime("%Y-%m-%d %H:%M:%S"), "30", "70", "1010", "Sunny", "1.5", "N",
+                       "100.0", "16.7", "", "bench", start_at.strftime("%Y-%m-%d %H:%M:%S")])
+        values.append(["STOP"] + common + ["", "", "", "", "Officer", "Driver",
+                       stop_at.strftime("%Y-%m-%d %H:%M:%S"), "29", "72", "1011", "Cloudy", "2.0", "NE",
+                       "124.0", "16.7", "", "bench", stop_at.strftime("%Y-%m-%d %H:%M:%S")])
+    return values
+
+
+def build_spreadsheet(rows, latency):
+    from resource import merge_start_stop, _sheet_values
+
+    spreadsheet = FakeSpreadsheet(latency=latency)
+    # Snapshots left by an earlier run describe different fake data; start cold.
+    shutil.rmtree(os.path.join(SNAPSHOT_DIR, FakeSpreadsheet.id), ignore_errors=True)
+    observations = synthetic_observations(rows)
+    spreadsheet.load(MAIN_SHEET, observations)
+
+    merged = merge_start_stop(pd.DataFrame(observations[1:], columns=observations[0]))
+    spreadsheet.load(MERGED_SHEET, [merged.columns.tolist()] + _sheet_values(merged))
+    spreadsheet.load(META_SHEET, [["Key", "Value", "Updated At"], ["merge_checkpoint", str(len(observations) - 1), ""]])
+
+    spreadsheet.load(USERS_SHEET, [["Username", "Full Name", "Email", "Password", "Role"]] + [
+        [f"user{i}", f"User {i}", f"user{i}@example.com", "$2b$12$" + "x" * 53, "officer"] for i in range(50)
+    ])
+    spreadsheet.load(REG_REQUESTS_SHEET, [["Timestamp", "Username", "Full Name", "Email", "Password", "Role", "Status"]] + [
+        ["2025-01-01 00:00:00", f"req{i}", f"Request {i}", f"req{i}@example.com", "$2b$12$" + "x" * 53, "officer", "pending"]
+        for i in range(20)
+    ])
+    spreadsheet.load(NOISE_SHEET_NAME, [["Timestamp", "Sector", "Company"]])
+    return spreadsheet
+
+
+def run_page(spreadsheet, page):
+    use_spreadsheet(spreadsheet)
+    app = AppTest.from_function(_page_script, kwargs={"page": page, "app_path": APP_PATH}, default_timeout=600)
+    app.secrets["EMAIL_SENDER"] = "bench@example.com"
+    app.secrets["EMAIL_PASSWORD"] = "unused"
+    app.secrets["USE_LOCAL_REPLICA"] = False
+
+    results = []
+    for run in ("cold", "warm"):
+        spreadsheet.reset_calls()
+        started = time.perf_counter()
+        app.run()
+        elapsed = time.perf_counter() - started
+        calls = spreadsheet.reset_calls()
+        results.append({
+            "page": page,
+            "run": run,
+            "sheets_calls": len(calls),
+            "bytes": sum(call.bytes for call in calls),
+            "sheets_seconds": round(sum(call.seconds for call in calls), 3),
+            "wall_seconds": round(elapsed, 3),
+            "login_screen_seconds": round(app.session_state["login_screen_seconds"], 3)
+            if "login_screen_seconds" in app.session_state else None,
+            "exception": app.exception[0].message if app.exception else "",
+        })
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every fake Sheets call")
+    parser.add_argument("--pages", nargs="+", default=PAGES, choices=PAGES)
+    args = parser.parse_args()
+
+    results = []
+    for rows in args.rows:
+        spreadsheet = build_spreadsheet(rows, args.latency)
+        for page in args.pages:
+            for result in run_page(spreadsheet, page):
+                results.append({"rows": rows, **result})
+
+    report = pd.DataFrame(results)
+    with pd.option_context("display.max_rows", None, "display.width", 200, "display.max_colwidth", 60):
+        print(report.to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
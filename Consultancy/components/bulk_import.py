@@ -0,0 +1,110 @@
+import streamlit as st
+
+from constants import MAIN_SHEET
+from importer import IMPORT_COLUMNS, guess_mapping, read_headers, import_observations
+from modules.authentication import require_role
+from outbox import enqueue_rows
+from replica import request_sync
+from partitions import open_partition, write_target
+from resource import load_table, request_merge
+
+
+def _write_rows(rows, deferred):
+    """append_rows one chunk; a chunk Sheets refuses goes to the outbox to be retried.
+
+    Deferred chunks are counted in `deferred` ({"rows", "error"}) so the page can
+    say so; the outbox asks for a merge once it has written them.
+    """
+    try:
+        open_partition(write_target(MAIN_SHEET)).append_rows(rows, value_input_option="RAW")
+    except Exception as e:
+        enqueue_rows(MAIN_SHEET, rows)
+        deferred["rows"] += len(rows)
+        deferred["error"] = str(e)
+
+
+def show():
+    require_role(["admin", "officer"])
+    st.title("📥 Bulk Import of Field Observations")
+    st.caption("Upload a CSV or Excel export with one START or STOP record per row.")
+
+    st.download_button(
+        "⬇️ Download a blank template",
+        data=(",".join(IMPORT_COLUMNS) + "\n").encode("utf-8"),
+        file_name="observations_template.csv",
+        mime="text/csv",
+    )
+
+    uploaded = st.file_uploader("📄 Observations file", type=["csv", "xlsx"])
+    if uploaded is None:
+        return
+
+    try:
+        headers = read_headers(uploaded, uploaded.name)
+    except Exception as e:
+        st.error(f"❌ Could not read the file: {e}")
+        return
+
+    # --- Column mapping: guessed from the header, adjustable ---
+    guessed = guess_mapping(headers)
+    mapping = {}
+    with st.expander("🧭 Column mapping", expanded=len(guessed) < len(IMPORT_COLUMNS) // 2):
+        options = ["(not in file)"] + headers
+        for column in IMPORT_COLUMNS:
+            default = guessed.get(column)
+            choice = st.selectbox(
+                column, options, index=options.index(default) if default in options else 0, key=f"import_map_{column}"
+            )
+            if choice != "(not in file)":
+                mapping[column] = choice
+    st.caption(f"{len(mapping)} of {len(IMPORT_COLUMNS)} columns mapped.")
+
+    validate_only = st.checkbox("🔍 Check only (don't write anything)")
+    if not st.button("📥 Import" if not validate_only else "🔍 Check file"):
+        return
+
+    try:
+        # Strict: a failed read must not look like an empty sheet, or every row would be imported again.
+        existing = load_table(MAIN_SHEET, shared=True, strict=True)
+    except Exception as e:
+        st.error(f"❌ Could not read {MAIN_SHEET} to check for duplicates, so nothing was imported: {e}")
+        return
+    deferred = {"rows": 0, "error": None}
+    progress = st.progress(0.0, text="Reading…")
+    size = max(uploaded.size, 1)
+
+    def on_progress(summary):
+        progress.progress(min(uploaded.tell() / size, 1.0), text=f"{summary['read']} rows read, {summary['rejected']} rejected")
+
+    try:
+        summary = import_observations(
+            uploaded, uploaded.name, mapping, st.session_state.username,
+            write=None if validate_only else lambda rows: _write_rows(rows, deferred), existing=existing, on_progress=on_progress,
+        )
+    except Exception as e:
+        st.error(f"❌ Import stopped: {e}")
+        return
+    progress.progress(1.0, text=f"{summary['read']} rows read")
+
+    if not validate_only and summary["imported"]:
+        request_sync(MAIN_SHEET)
+        request_merge()
+    verb = "would be imported" if validate_only else "imported"
+    st.success(f"✅ {summary['imported']} of {summary['read']} rows {verb}.")
+    if deferred["rows"]:
+        st.warning(
+            f"⚠ Google Sheets refused {deferred['rows']} of them ({deferred['error']}); "
+            "they are queued in the outbox and will be written in the background."
+        )
+    if summary["rejected"]:
+        st.warning(f"⚠ {summary['rejected']} rows rejected.")
+        rejects = summary["rejects"]
+        if summary["rejected"] > len(rejects):
+            st.caption(f"Showing the first {len(rejects)} rejects.")
+        st.dataframe(rejects, use_container_width=True, hide_index=True)
+        st.download_button(
+            "⬇️ Download rejects as CSV",
+            data=rejects.to_csv(index=False).encode("utf-8"),
+            file_name="observations_rejects.csv",
+            mime="text/csv",
+        )
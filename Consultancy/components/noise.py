@@ -1,46 +1,34 @@
 import streamlit as st
-import gspread
 from datetime import datetime
-from oauth2client.service_account import ServiceAccountCredentials
 from general import general_info_form
 from forms_monitoring import monitoring_type_form
 from modules.authentication import require_role
+from field_queue import submit_entry, hold_entries_toggle, show_field_queue
+from exports import show_export_panel
 from constants import (
-    SPREADSHEET_ID,
     NOISE_SHEET_NAME,
     GASES_SHEET_NAME,
     STACK_SHEET_NAME,
     VOC_SHEET_NAME
 )
 
-# === Google Sheets Setup ===
-creds_dict = st.secrets["GOOGLE_CREDENTIALS"]  # Already a dictionary
-
-scope = [
-    "https://spreadsheets.google.com/feeds",
-    "https://www.googleapis.com/auth/spreadsheets",
-    "https://www.googleapis.com/auth/drive.file",
-    "https://www.googleapis.com/auth/drive"
-]
-creds = ServiceAccountCredentials.from_json_keyfile_dict(creds_dict, scope)
-client = gspread.authorize(creds)
-
-def open_worksheet(client, sheet_name):
-    spreadsheet = client.open_by_key(SPREADSHEET_ID)
-    try:
-        worksheet = spreadsheet.worksheet(sheet_name)
-    except gspread.WorksheetNotFound:
-        worksheet = spreadsheet.add_worksheet(title=sheet_name, rows="1000", cols="20")
-    return worksheet
-
-def append_data_to_sheet(worksheet, data_list):
-    worksheet.append_row(data_list, value_input_option='USER_ENTERED')
+# Company, Sampling Point and Date Time identify a monitoring row.
+MONITORING_KEY_COLUMNS = [2, 5, 8]
+
+def _submit(sheet_name, row, monitoring_type):
+    label = f"{monitoring_type} · {row[2]} · {row[5]} · {row[8]}"
+    if submit_entry(sheet_name, row, label, MONITORING_KEY_COLUMNS, value_input_option="USER_ENTERED"):
+        st.success(f"{monitoring_type} data saved successfully!")
+    else:
+        st.info(f"⏸️ {monitoring_type} data held; press Sync to send it.")
 
 # === Main App Function ===
 def show():
     require_role(["admin", "officer"])
 
     st.title("Environmental Monitoring Form")
+    hold_entries_toggle()
+    queue_area = st.container()  # filled after the form, so an entry held this run is listed
 
     # Step 1: General Info Form
     general_data = general_info_form()
@@ -81,7 +69,6 @@ def show():
 
             try:
                 if monitoring_type == "Noise":
-                    worksheet = open_worksheet(client, NOISE_SHEET_NAME)
                     noise_data = [
                         monitoring_data.get("leq", ""),
                         monitoring_data.get("l10", ""),
@@ -89,20 +76,16 @@ def show():
                         monitoring_data.get("l90", ""),
                         monitoring_data.get("lmax", ""),
                     ]
-                    append_data_to_sheet(worksheet, common_data + noise_data)
-                    st.success("Noise data saved successfully!")
+                    _submit(NOISE_SHEET_NAME, common_data + noise_data, "Noise")
 
                 elif monitoring_type == "Gases":
-                    worksheet = open_worksheet(client, GASES_SHEET_NAME)
                     gases_data = [
                         monitoring_data.get("no2", ""),
                         monitoring_data.get("so2", ""),
                     ]
-                    append_data_to_sheet(worksheet, common_data + gases_data)
-                    st.success("Gases data saved successfully!")
+                    _submit(GASES_SHEET_NAME, common_data + gases_data, "Gases")
 
                 elif monitoring_type == "Stack Emission":
-                    worksheet = open_worksheet(client, STACK_SHEET_NAME)
                     stack_data = [
                         monitoring_data.get("gen_set", ""),
                         monitoring_data.get("installation", ""),
@@ -115,22 +98,25 @@ def show():
                         monitoring_data.get("so2_stack", ""),
                         monitoring_data.get("no2_stack", ""),
                     ]
-                    append_data_to_sheet(worksheet, common_data + stack_data)
-                    st.success("Stack Emission data saved successfully!")
+                    _submit(STACK_SHEET_NAME, common_data + stack_data, "Stack Emission")
 
                 elif monitoring_type == "VOCs":
-                    worksheet = open_worksheet(client, VOC_SHEET_NAME)
                     voc_data = [
                         monitoring_data.get("voc_total", ""),
                         monitoring_data.get("benzene", ""),
                         monitoring_data.get("toluene", ""),
                         monitoring_data.get("xylene", ""),
                     ]
-                    append_data_to_sheet(worksheet, common_data + voc_data)
-                    st.success("VOCs data saved successfully!")
+                    _submit(VOC_SHEET_NAME, common_data + voc_data, "VOCs")
 
                 else:
                     st.warning("Please select a valid monitoring type before submitting.")
 
             except Exception as e:
                 st.error(f"Failed to save data: {e}")
+
+    with queue_area:
+        show_field_queue()
+
+    with st.expander("📦 Export monitoring data"):
+        show_export_panel([NOISE_SHEET_NAME, GASES_SHEET_NAME, STACK_SHEET_NAME, VOC_SHEET_NAME], key="monitoring_export")
@@ -1,12 +1,266 @@
 import streamlit as st
+import numpy as np
 import pandas as pd
-from datetime import datetime
-from resource import spreadsheet
+from gsheets import get_spreadsheet
+from replica import query_frame, query_row, quote_identifier, request_sync
+from gspread.exceptions import WorksheetNotFound
+from resource import (
+    count_merged_records,
+    query_merged_page,
+    load_indexed_frame,
+    load_data_from_sheet,
+    invalidate_sheet_cache,
+    rewrite_sheet,
+    upsert_keyed_rows
+)
+from schema import apply_schema, DATETIME_FORMAT
 from constants import MERGED_SHEET, CALC_SHEET
 from modules.authentication import require_role
+from exports import show_export_panel
+
+PM_STATUSES = ["OK", "Invalid Input", "Elapsed < 1200", "Invalid Flow", "Post < Pre", "Zero Volume"]
+WEIGHT_COLUMNS = ["Pre Weight (g)", "Post Weight (g)"]
+RESULT_COLUMNS = WEIGHT_COLUMNS + ["PM (µg/m³)", "PM Status"]
+CALC_KEY_COLUMN = "Sample Key"
+KEY_SOURCE_COLUMNS = ["Company", "Sampling Point_Start", "Date Time_Start"]
+PAGE_SIZE = 50  # rows per editor page; only one page is materialised at a time
+
+# --- PM₂.₅ Calculation ---
+def calculate_pm_frame(df):
+    """Compute PM₂.₅ (µg/m³) for every row at once.
+
+    Returns a float concentration series (NaN where the row is invalid) and a
+    categorical status series naming the first check each row failed.
+    """
+    inputs = ["Elapsed Time Diff (min)", "Average Flow Rate (L/min)", "Pre Weight (g)", "Post Weight (g)"]
+    typed = apply_schema(df[inputs], CALC_SHEET)
+    elapsed, flow, pre, post = (typed[column].to_numpy(dtype="float64", na_value=np.nan) for column in inputs)
+
+    mass_mg = (post - pre) * 1000
+    volume_m3 = (flow * elapsed) / 1000
+
+    invalid_input = np.isnan(elapsed) | np.isnan(flow) | np.isnan(pre) | np.isnan(post)
+    conditions = [
+        invalid_input,
+        elapsed < 1200,
+        flow <= 0.05,
+        post < pre,
+        volume_m3 == 0,
+    ]
+    codes = np.select(conditions, np.arange(1, len(conditions) + 1), default=0)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        conc = np.round((mass_mg * 1000) / volume_m3, 2)
+    conc = np.where(codes == 0, conc, np.nan)
+
+    status = pd.Categorical.from_codes(codes, categories=PM_STATUSES)
+    return pd.Series(conc, index=df.index, dtype="float64"), pd.Series(status, index=df.index)
+
+def _require_calc_inputs(columns):
+    if not {"Elapsed Time Diff (min)", "Average Flow Rate (L/min)"}.issubset(columns):
+        st.error("❌ Required columns missing: 'Elapsed Time Diff (min)', 'Average Flow Rate (L/min)'")
+        st.stop()
+
+def _select_date_range(bounds):
+    if bounds is None:
+        return None
+    min_date, max_date = bounds[0].date(), bounds[1].date()
+    st.subheader("📅 Filter by Start Date")
+    date_range = st.date_input("Select Date Range", value=(min_date, max_date), min_value=min_date, max_value=max_date)
+    return date_range if isinstance(date_range, tuple) and len(date_range) == 2 else None
+
+def _select_merged_from_replica():
+    """Company/date filters as indexed SQL on the local replica; None when it cannot answer.
+
+    Returns (row count, page loader, filter signature); pages are fetched with LIMIT/OFFSET.
+    """
+    company_col = quote_identifier("Company")
+    date_col = quote_identifier("Date Time_Start")
+    companies = query_frame(MERGED_SHEET, columns=["Company"], where=f"{company_col} != ''", order_by="1", distinct=True)
+    if companies is None:
+        return None
+    header = query_frame(MERGED_SHEET, limit=1)
+    if header is not None:
+        _require_calc_inputs(header.columns)
+
+    company_options = ["All Companies"] + companies["Company"].tolist()
+    first_row = query_frame(MERGED_SHEET, columns=["Company"], where=f"{company_col} != ''", limit=1)
+    most_recent_company = first_row["Company"].iloc[0] if first_row is not None and not first_row.empty else "All Companies"
+
+    st.subheader("🏢 Filter by Company")
+    selected_company = st.selectbox("🏷️ Select Company", options=company_options, index=company_options.index(most_recent_company))
+
+    where, params = f"{date_col} != ''", []
+    if selected_company != "All Companies":
+        where += f" AND {company_col} = ?"
+        params.append(selected_company)
+    bounds = query_row(MERGED_SHEET, f"MIN({date_col}), MAX({date_col})", where=where, params=params)
+    date_range = _select_date_range(
+        (pd.to_datetime(bounds[0]), pd.to_datetime(bounds[1])) if bounds and bounds[0] is not None else None
+    )
+
+    total = count_merged_records(MERGED_SHEET, selected_company, date_range)
+    if total is None:
+        return None
+
+    def load_page(offset, limit):
+        page = query_merged_page(MERGED_SHEET, offset, limit, selected_company, date_range)
+        return apply_schema(page if page is not None else pd.DataFrame(), MERGED_SHEET)
+
+    return total, load_page, (selected_company, date_range)
+
+
+def _select_merged_from_sheet(spreadsheet):
+    """Company/date filters as row selections on the cached Merged Records frame.
+
+    The frame is shared with the sheet cache and indexed once per revision;
+    only the rows of the page being shown are ever copied out of it.
+    """
+    try:
+        # Typed by the schema and served from the tail cache: only new rows are downloaded.
+        df_merged, index = load_indexed_frame(spreadsheet.worksheet(MERGED_SHEET), "Company", "Date Time_Start")
+    except Exception as e:
+        st.error(f"❌ Failed to load merged sheet: {e}")
+        st.stop()
+    _require_calc_inputs(df_merged.columns)
+    if index is None:
+        st.warning("⚠ 'Company' or 'Date Time_Start' column not found — skipping filters.")
+        positions = np.arange(len(df_merged))
+        return len(positions), lambda offset, limit: df_merged.iloc[positions[offset:offset + limit]], (None, None)
+
+    # --- Company Filter ---
+    company_options = ["All Companies"] + index.groups()
+    companies = df_merged["Company"]
+    most_recent_company = companies.iloc[0] if len(companies) and companies.iloc[0] in index.groups() else "All Companies"
+    st.subheader("🏢 Filter by Company")
+    selected_company = st.selectbox("🏷️ Select Company", options=company_options, index=company_options.index(most_recent_company))
+    group = None if selected_company == "All Companies" else selected_company
+
+    # --- Date Filter ---
+    date_range = _select_date_range(index.time_bounds(group))
+    positions = index.select(group, date_range)
+
+    def load_page(offset, limit):
+        return df_merged.iloc[positions[offset:offset + limit]]
+
+    return len(positions), load_page, (selected_company, date_range)
+
+
+# --- Keyed saves into PM Calculations ---
+def sample_keys(df):
+    """Company|sampling point|start time: one stable key per calculated sample ('' if incomplete)."""
+    if not set(KEY_SOURCE_COLUMNS).issubset(df.columns):
+        return pd.Series("", index=df.index)
+    start = df["Date Time_Start"]
+    if not pd.api.types.is_datetime64_any_dtype(start):
+        start = pd.to_datetime(start, errors="coerce")
+    company = df["Company"].astype(str).str.strip()
+    point = df["Sampling Point_Start"].astype(str).str.strip()
+    keys = company + "|" + point + "|" + start.dt.strftime(DATETIME_FORMAT)
+    complete = (company != "") & start.notna()
+    return keys.where(complete, "").fillna("")
+
+def load_saved_calculations(spreadsheet):
+    """Saved PM Calculations rows, typed, one per Sample Key (last save wins); empty if none."""
+    try:
+        saved = load_data_from_sheet(spreadsheet.worksheet(CALC_SHEET))
+    except WorksheetNotFound:
+        return pd.DataFrame()
+    if saved.empty:
+        return saved
+    saved = apply_schema(saved, CALC_SHEET)
+    if CALC_KEY_COLUMN not in saved.columns:
+        saved[CALC_KEY_COLUMN] = sample_keys(saved)
+    saved = saved[saved[CALC_KEY_COLUMN] != ""]
+    return saved.drop_duplicates(CALC_KEY_COLUMN, keep="last").set_index(CALC_KEY_COLUMN, drop=False)
+
+def _results_changed(new, saved):
+    """Per row of `new`: do weights or results differ from the saved row with the same key?"""
+    saved = saved.reindex(new.index)
+    changed = pd.Series(False, index=new.index)
+    for column in RESULT_COLUMNS:
+        if column not in saved.columns:
+            return pd.Series(True, index=new.index)
+        if column == "PM Status":
+            changed |= new[column].astype(str) != saved[column].astype(str)
+        else:
+            a = new[column].to_numpy(dtype="float64", na_value=np.nan)
+            b = pd.to_numeric(saved[column], errors="coerce").to_numpy(dtype="float64", na_value=np.nan)
+            changed |= ~np.isclose(a, b, rtol=1e-9, atol=1e-9, equal_nan=True)
+    return changed
+
+def save_calculations(df, spreadsheet):
+    """Upsert calculated rows into PM Calculations by Sample Key.
+
+    Only new rows and rows whose weights or results changed are written.
+    Returns a summary dict of inserted/updated/unchanged/skipped counts.
+    """
+    df = df.copy()
+    df[CALC_KEY_COLUMN] = sample_keys(df)
+    skipped = int((df[CALC_KEY_COLUMN] == "").sum())
+    df = df[df[CALC_KEY_COLUMN] != ""].drop_duplicates(CALC_KEY_COLUMN, keep="last")
+    df = df.set_index(CALC_KEY_COLUMN, drop=False)
+
+    try:
+        calc_ws = spreadsheet.worksheet(CALC_SHEET)
+        header = calc_ws.row_values(1)
+    except WorksheetNotFound:
+        calc_ws, header = None, []
+    saved = load_saved_calculations(spreadsheet) if header else pd.DataFrame()
+
+    is_new = ~df.index.isin(saved.index)
+    known = df[~is_new]
+    changed = _results_changed(known, saved)
+    summary = {
+        "inserted": int(is_new.sum()),
+        "updated": int(changed.sum()),
+        "unchanged": int(len(known) - changed.sum()),
+        "skipped": skipped,
+    }
+    to_write = pd.concat([known[changed.to_numpy()], df[is_new]])
+    columns = df.columns.tolist()
+
+    if calc_ws is not None and header and header != columns:
+        # Older sheet layout (no Sample Key, or different columns): rewrite it once
+        # with one row per key, keeping saved samples this save doesn't touch.
+        kept = saved[~saved.index.isin(df.index)].reindex(columns=columns)
+        rewrite_sheet(pd.concat([kept, df], ignore_index=True), spreadsheet, CALC_SHEET, value_input_option="USER_ENTERED")
+        invalidate_sheet_cache(calc_ws)
+    elif not to_write.empty:
+        if calc_ws is None:
+            calc_ws = spreadsheet.add_worksheet(title=CALC_SHEET, rows="1000", cols=str(len(columns)))
+            calc_ws.append_row(columns)
+            header = columns
+        upsert_keyed_rows(to_write.reset_index(drop=True), calc_ws, CALC_KEY_COLUMN, header, value_input_option="USER_ENTERED")
+    if summary["inserted"] or summary["updated"] or header != columns:
+        request_sync(CALC_SHEET)
+    return summary
+
+def _with_weights(df, saved, edits):
+    """A copy of `df` with saved weights, overridden by unsaved edits.
+
+    Returns (frame, sample keys, the saved weights before edits).
+    """
+    df = df.copy()
+    keys = sample_keys(df)
+    for column in WEIGHT_COLUMNS:
+        previous = pd.to_numeric(saved.get(column, pd.Series(dtype="float64")).reindex(keys.to_numpy()), errors="coerce")
+        df[column] = previous.fillna(0.0).to_numpy(dtype="float64")
+    base_weights = df[WEIGHT_COLUMNS].copy()
+    for position, key in enumerate(keys):
+        if key in edits:
+            df.iloc[position, df.columns.get_indexer(WEIGHT_COLUMNS)] = [edits[key][column] for column in WEIGHT_COLUMNS]
+    return df, keys, base_weights
+
+def _selection_results(load_page, total, saved, edits):
+    """Every filtered sample with its current weights and calculated PM, as shown page by page."""
+    df, _, _ = _with_weights(load_page(0, total), saved, edits)
+    df["PM (µg/m³)"], df["PM Status"] = calculate_pm_frame(df)
+    return df
 
 def show():
     require_role(["admin", "officer"])
+    spreadsheet = get_spreadsheet()
 
     # --- Page Title ---
     st.markdown("""
@@ -30,146 +284,90 @@ def show():
         <hr>
     """, unsafe_allow_html=True)
 
-    # --- Load Merged Data ---
-    try:
-        merged_data = spreadsheet.worksheet(MERGED_SHEET).get_all_records()
-        df_merged = pd.DataFrame(merged_data)
-        df_merged.columns = df_merged.columns.str.strip()
+    # --- Select Merged Data (filters become row selections; nothing is copied yet) ---
+    selection = _select_merged_from_replica()
+    if selection is None:
+        selection = _select_merged_from_sheet(spreadsheet)
+    total, load_page, signature = selection
 
-        if not {"Elapsed Time Diff (min)", "Average Flow Rate (L/min)"}.issubset(df_merged.columns):
-            st.error("❌ Required columns missing: 'Elapsed Time Diff (min)', 'Average Flow Rate (L/min)'")
-            st.stop()
-    except Exception as e:
-        st.error(f"❌ Failed to load merged sheet: {e}")
-        st.stop()
-
-    # --- Company Filter ---
-    if "Company" in df_merged.columns:
-        try:
-            available_companies = sorted(df_merged["Company"].dropna().unique())
-            company_options = ["All Companies"] + available_companies
-            most_recent_company = df_merged["Company"].dropna().iloc[0] if not df_merged.empty else "All Companies"
-
-            st.subheader("🏢 Filter by Company")
-            selected_company = st.selectbox("🏷️ Select Company", options=company_options, index=company_options.index(most_recent_company))
-            if selected_company != "All Companies":
-                filtered_df = df_merged[df_merged["Company"] == selected_company].copy()
-            else:
-                filtered_df = df_merged.copy()
-        except Exception as e:
-            st.warning(f"⚠ Could not auto-select company: {e}")
-            filtered_df = df_merged.copy()
-    else:
-        st.warning("⚠ 'Company' column not found — skipping company filter.")
-        filtered_df = df_merged.copy()
-
-    # --- Date Filter ---
-    if "Date Time_Start" in filtered_df.columns:
-        try:
-            filtered_df = filtered_df.copy()
-            filtered_df["Date Time_Start"] = pd.to_datetime(filtered_df["Date Time_Start"], errors="coerce")
-            filtered_df = filtered_df.dropna(subset=["Date Time_Start"])
-
-            min_date = filtered_df["Date Time_Start"].min().date()
-            max_date = filtered_df["Date Time_Start"].max().date()
-
-            st.subheader("📅 Filter by Start Date")
-            date_range = st.date_input("Select Date Range", value=(min_date, max_date), min_value=min_date, max_value=max_date)
-
-            if isinstance(date_range, tuple) and len(date_range) == 2:
-                start_date, end_date = date_range
-                mask = (filtered_df["Date Time_Start"].dt.date >= start_date) & (filtered_df["Date Time_Start"].dt.date <= end_date)
-                filtered_df = filtered_df.loc[mask].copy()
-        except Exception as e:
-            st.warning(f"⚠ Could not filter by date: {e}")
-    else:
-        st.warning("⚠ 'Date Time_Start' column not found — skipping date filter.")
-
-    # --- Add Pre/Post Weight Columns Safely ---
-    filtered_df = filtered_df.copy()
-    filtered_df["Pre Weight (g)"] = 0.0
-    filtered_df["Post Weight (g)"] = 0.0
+    # --- Current Page, with weights from earlier saves and unsaved edits ---
+    edits = st.session_state.setdefault("pm_weight_edits", {})
+    pages = max(1, -(-total // PAGE_SIZE))
+    page_number = st.number_input(f"Page (of {pages}, {total} samples)", min_value=1, max_value=pages, value=1, step=1)
+    saved = load_saved_calculations(spreadsheet)
+    page_df, keys, base_weights = _with_weights(load_page((page_number - 1) * PAGE_SIZE, PAGE_SIZE), saved, edits)
 
     # --- Data Editor ---
     st.subheader("📊 Enter Weights")
     editable_columns = ["Pre Weight (g)", "Post Weight (g)"]
     edited_df = st.data_editor(
-        filtered_df,
-        num_rows="dynamic",
+        page_df,
+        key=f"pm_weights_{signature}_{page_number}",
         use_container_width=True,
         column_config={
             "Pre Weight (g)": st.column_config.NumberColumn("Pre Weight (g)", help="Mass before sampling (grams)"),
             "Post Weight (g)": st.column_config.NumberColumn("Post Weight (g)", help="Mass after sampling (grams)")
         },
-        disabled=[col for col in filtered_df.columns if col not in editable_columns],
+        disabled=[col for col in page_df.columns if col not in editable_columns],
     )
 
-    # --- PM₂.₅ Calculation Function ---
-    def calculate_pm(row):
-        try:
-            elapsed = float(row["Elapsed Time Diff (min)"])
-            flow = float(row["Average Flow Rate (L/min)"])
-            pre = float(row["Pre Weight (g)"])
-            post = float(row["Post Weight (g)"])
-            mass_mg = (post - pre) * 1000
-
-            if elapsed < 1200:
-                return "Elapsed < 1200"
-            if flow <= 0.05:
-                return "Invalid Flow"
-            if post < pre:
-                return "Post < Pre"
-
-            volume_m3 = (flow * elapsed) / 1000
-            if volume_m3 == 0:
-                return "Zero Volume"
-
-            conc = (mass_mg * 1000) / volume_m3
-            return round(conc, 2)
-        except Exception as e:
-            return f"Error: {e}"
+    # --- Remember edits across pages (only rows whose weights differ from what is saved) ---
+    changed = ~np.isclose(
+        edited_df[WEIGHT_COLUMNS].to_numpy(dtype="float64", na_value=np.nan),
+        base_weights.to_numpy(dtype="float64"),
+        equal_nan=True,
+    ).all(axis=1)
+    for key, is_changed, (_, row) in zip(keys, changed, edited_df.iterrows()):
+        if not key:
+            continue
+        if is_changed:
+            edits[key] = row.to_dict()
+        else:
+            edits.pop(key, None)
 
     # --- Calculate PM₂.₅ ---
-    edited_df["PM (µg/m³)"] = edited_df.apply(calculate_pm, axis=1)
+    edited_df["PM (µg/m³)"], edited_df["PM Status"] = calculate_pm_frame(edited_df)
 
     # --- Display Calculated Data ---
     st.subheader("📊 Calculated Results")
     st.dataframe(edited_df, use_container_width=True)
 
-    # --- CSV Export ---
-    csv = edited_df.to_csv(index=False).encode("utf-8")
+    # --- Unsaved edits from every page ---
+    pending_df = pd.DataFrame(list(edits.values()))
+    if not pending_df.empty:
+        pending_df = apply_schema(pending_df, MERGED_SHEET)
+        pending_df["PM (µg/m³)"], pending_df["PM Status"] = calculate_pm_frame(pending_df)
+    st.caption(f"✏️ {len(pending_df)} sample(s) with unsaved weights across all pages.")
+
+    # --- CSV Export of the whole selection, every page (built only when clicked) ---
     st.download_button(
         label="⬇️ Download Results as CSV",
-        data=csv,
+        data=lambda: _selection_results(load_page, total, saved, edits).to_csv(index=False).encode("utf-8"),
         file_name="pm25_results.csv",
         mime="text/csv"
     )
 
-    if st.button("✅ Save Edited DataFrame"):
+    if st.button("✅ Save Edited DataFrame", disabled=pending_df.empty):
         try:
-            safe_df = edited_df.copy()
-            for col in safe_df.select_dtypes(include=["datetime64[ns]", "datetime64", "object"]):
-                if pd.api.types.is_datetime64_any_dtype(safe_df[col]):
-                    safe_df[col] = safe_df[col].dt.strftime("%Y-%m-%d %H:%M:%S")
-            rows_to_save = safe_df.values.tolist()
-            st.write(f"First row to save: {rows_to_save[0]}")
-
-            sheet_titles = [ws.title for ws in spreadsheet.worksheets()]
-            if CALC_SHEET not in sheet_titles:
-                calc_ws = spreadsheet.add_worksheet(title=CALC_SHEET, rows="1000", cols=str(len(safe_df.columns)))
-                calc_ws.append_row(safe_df.columns.tolist())
-            else:
-                calc_ws = spreadsheet.worksheet(CALC_SHEET)
-
-            calc_ws.append_rows(rows_to_save, value_input_option="USER_ENTERED")
-            st.success(f"✅ Saved {len(rows_to_save)} rows successfully.")
+            summary = save_calculations(pending_df, spreadsheet)
+            edits.clear()
+            st.success(
+                f"✅ Saved: {summary['inserted']} inserted, {summary['updated']} updated, "
+                f"{summary['unchanged']} unchanged."
+            )
+            if summary["skipped"]:
+                st.warning(f"⚠ {summary['skipped']} row(s) without company or start time were not saved.")
         except Exception as e:
             st.error(f"❌ Error saving data: {e}")
 
     if st.checkbox("📖 Show Saved Entries in Sheet"):
         try:
-            saved_data = spreadsheet.worksheet(CALC_SHEET).get_all_records(head=1)
-            df_saved = pd.DataFrame(saved_data)
+            df_saved = query_frame(CALC_SHEET)
+            if df_saved is None:
+                df_saved = pd.DataFrame(spreadsheet.worksheet(CALC_SHEET).get_all_records(head=1))
             st.dataframe(df_saved, use_container_width=True)
         except Exception as e:
             st.warning(f"⚠ Could not load saved entries: {e}")
+
+    with st.expander("📦 Export PM Calculations / Merged Records"):
+        show_export_panel([CALC_SHEET, MERGED_SHEET], key="pm_export")
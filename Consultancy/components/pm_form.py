@@ -1,17 +1,11 @@
 import streamlit as st
 from datetime import datetime
-from resource import (
-    load_data_from_sheet,
-    add_data,
-    merge_start_stop,
-    save_merged_data_to_sheet,
-    sheet,
-    spreadsheet,
-    display_and_merge_data
-)
-from constants import MERGED_SHEET
+from resource import display_merged_data, request_merge
+from gsheets import get_spreadsheet
+from constants import MAIN_SHEET, MERGED_SHEET
+from field_queue import submit_entry, hold_entries_toggle, show_field_queue
 from modules.authentication import require_role
-from general import sector_data  # Assumes your sector_data is saved here
+from sites import get_site_registry, select_company
 
 # -----------------------------
 # Constants and configuration
@@ -19,7 +13,6 @@ from general import sector_data  # Assumes your sector_data is saved here
 officers = ['Obed Korankye', 'Clement Ackaah', 'Peter Ohene-Twum', 'Benjamin Essien', 'Mawuli Amegah','Ludwick Adjei','Maxwell Sunu','John Nyante']
 wind_directions = ["-- Select --", "N", "NE", "E", "SE", "S", "NNE", "NEN", "SWS", "SES", "SSW", "SW", "W", "NW"]
 weather_conditions = ["-- Select --", "Sunny", "Cloudy", "Partly Cloudy", "Rainy", "Windy", "Hazy", "Stormy", "Foggy"]
-sampling_points = ["-- Select --", "Point 1", "Point 2", "Point 3", "Point 4"]
 pollutants = ["-- Select --", "PM₂.₅", "PM₁₀", "TSP"]
 drivers = ["Kanazoe Sia", "Kofi Adjei", "Fatau"]
 
@@ -34,16 +27,32 @@ weather_defaults = {
     "Foggy": {"temp": list(range(15, 22)), "rh": list(range(85, 101))}
 }
 
-def get_companies(sector):
-    return list(sector_data.get(sector, {}).get("companies", {}).keys())
-
-def get_region_city(company_name):
-    for sector in sector_data.values():
-        companies = sector.get("companies", {})
-        if company_name in companies:
-            info = companies[company_name]
-            return info.get("region", "Unknown"), info.get("city", "Unknown")
-    return "Unknown", "Unknown"
+# Entry Type, Company, Sampling Point and Date Time identify an observation row.
+OBSERVATION_KEY_COLUMNS = [0, 2, 5, 12]
+
+def observation_problems(row):
+    """The submission rules for a START/STOP row (before Submitted By/At); empty when it can be sent."""
+    officers_cell, driver, temp, rh, weather, wind_speed, wind_direction = (row[i] for i in (10, 11, 13, 14, 16, 17, 18))
+    problems = []
+    if not officers_cell or driver == "-- Select --":
+        problems.append("⚠ Please complete all required fields before submitting.")
+    if "-- Select --" in (weather, temp, rh, wind_direction) or wind_speed is None:
+        problems.append("⚠ Please select valid weather, temperature, humidity, wind direction, and wind speed.")
+    return problems
+
+def submit_observation(row):
+    """Validate a START/STOP row and send it, or hold it when "Hold entries" is on."""
+    problems = observation_problems(row)
+    for problem in problems:
+        st.error(problem)
+    if problems:
+        return
+    row = row + [st.session_state.username, datetime.now().strftime("%Y-%m-%d %H:%M:%S")]
+    label = f"{row[0]} · {row[2]} · {row[5]} · {row[12]}"
+    if submit_entry(MAIN_SHEET, row, label, OBSERVATION_KEY_COLUMNS, after_sync="merge"):
+        st.success(f"✅ {row[0].title()} day data submitted successfully!")
+    else:
+        st.info(f"⏸️ {row[0].title()} day data held; press Sync to send it.")
 
 def get_custom_time(label, key_prefix, hour_key="hour", minute_key="minute"):
     col1, col2 = st.columns(2)
@@ -53,6 +62,114 @@ def get_custom_time(label, key_prefix, hour_key="hour", minute_key="minute"):
         minute = st.selectbox(f"{label} - Minute", list(range(0, 60)), key=f"{key_prefix}_{minute_key}")
     return datetime.strptime(f"{hour}:{minute}", "%H:%M").time()
 
+def _show_submit_tab():
+    entry_type = st.selectbox("Select Entry Type", ["", "START", "STOP"])
+    if not entry_type:
+        return
+
+    sites = get_site_registry()
+    sector_options = ["-- Select --"] + sites.sectors()
+    selected_sector = st.selectbox("🏭 Select Industry Sector", sector_options)
+    if selected_sector == "-- Select --":
+        return
+
+    selected_company = select_company(selected_sector, "🏢 Select Company")
+    if selected_company == "-- Select --":
+        return
+
+    site = sites.site(selected_company)
+    region, city = sites.region_city(selected_company)
+    point_options = ["-- Select --"] + sites.sampling_points(selected_company)
+    st.text_input("🌍 Region", value=region, disabled=True)
+    st.text_input("🏙️ Town/City", value=city, disabled=True)
+
+    st.subheader("5. Officer(s) Involved")
+    officer_selected = st.multiselect("👷 Monitoring Officer(s)", officers)
+    driver = st.selectbox("🧑‍🌾 Select Driver", ["-- Select --"] + drivers, key="driver")
+
+    wind_speed_options = [f"{x:.1f}" for x in [i * 0.5 for i in range(0, 41)]]
+
+    if entry_type == "START":
+        st.subheader("🟢 Start Monitoring")
+        start_sampling_point = st.selectbox("📍 Sampling Point", point_options)
+        sampling_point_description = st.text_input("📍 Sampling Point Description")
+        longitude = st.number_input("🌐 Longitude", value=getattr(site, "longitude", None) or 0.0, step=0.0001, format="%.4f")
+        latitude = st.number_input("🌐 Latitude", value=getattr(site, "latitude", None) or 0.0, step=0.0001, format="%.4f")
+        pollutants_selected = st.selectbox("🌫️ Pollutant", pollutants)
+
+        start_date = st.date_input("📅 Start Date", value=datetime.today())
+        start_time = get_custom_time("⏱️ Start Time", "start")
+        start_date_time = datetime.combine(start_date, start_time)
+
+        start_obs = st.text_area("🧿 Final Observations")
+
+        start_weather = st.selectbox("🌦️ Weather", weather_conditions)
+        if start_weather != "-- Select --":
+            temp_options = ["-- Select --"] + weather_defaults[start_weather]["temp"]
+            rh_options = ["-- Select --"] + weather_defaults[start_weather]["rh"]
+            start_temp = st.selectbox("🌡️ Temperature (°C)", temp_options)
+            start_rh = st.selectbox("💧 Humidity (%)", rh_options)
+        else:
+            start_temp = start_rh = "-- Select --"
+
+        start_pressure = st.number_input("🧭 Pressure (mbar)", step=0.1)
+        start_wind_speed = st.selectbox("💨 Wind Speed (km/h)", ["-- Select --"] + wind_speed_options)
+        start_wind_speed = float(start_wind_speed) if start_wind_speed != "-- Select --" else None
+        start_wind_direction = st.selectbox("🌪️ Wind Direction", wind_directions)
+
+        start_elapsed = st.number_input("⏰ Elapsed Time (min)", step=0.1)
+        start_flow = st.selectbox("🧯 Flow Rate (L/min)", options=[5, 16.7])
+
+        if st.button("✅ Submit Start Day Data"):
+            start_row = [
+                "START", selected_sector, selected_company, region, city,
+                start_sampling_point, sampling_point_description, longitude, latitude,
+                pollutants_selected if pollutants_selected != "-- Select --" else "", ", ".join(officer_selected), driver,
+                start_date_time.strftime("%Y-%m-%d %H:%M:%S"),
+                start_temp, start_rh, start_pressure, start_weather,
+                start_wind_speed, start_wind_direction,
+                start_elapsed, start_flow, start_obs
+            ]
+            submit_observation(start_row)
+
+    elif entry_type == "STOP":
+        st.subheader("🔴 Stop Monitoring")
+        stop_sampling_point = st.selectbox("📍 Sampling Point", point_options)
+        stop_date = st.date_input("📅 Stop Date", value=datetime.today())
+        stop_time = get_custom_time("⏱️ Stop Time", "stop")
+        stop_date_time = datetime.combine(stop_date, stop_time)
+
+        stop_obs = st.text_area("🧿 Final Observations")
+
+        stop_weather = st.selectbox("🌦️ Final Weather", weather_conditions)
+        if stop_weather != "-- Select --":
+            temp_options = ["-- Select --"] + weather_defaults[stop_weather]["temp"]
+            rh_options = ["-- Select --"] + weather_defaults[stop_weather]["rh"]
+            stop_temp = st.selectbox("🌡️ Final Temperature (°C)", temp_options)
+            stop_rh = st.selectbox("💧 Final Humidity (%)", rh_options)
+        else:
+            stop_temp = stop_rh = "-- Select --"
+
+        stop_pressure = st.number_input("🧭 Final Pressure (mbar)", step=0.1)
+        stop_wind_speed = st.selectbox("💨 Final Wind Speed (km/h)", ["-- Select --"] + wind_speed_options)
+        stop_wind_speed = float(stop_wind_speed) if stop_wind_speed != "-- Select --" else None
+        stop_wind_direction = st.selectbox("🌪️ Final Wind Direction", wind_directions)
+
+        stop_elapsed = st.number_input("⏰ Final Elapsed Time (min)", step=0.1)
+        stop_flow = st.selectbox("🧯 Final Flow Rate (L/min)", options=[5, 16.7])
+
+        if st.button("✅ Submit Stop Day Data"):
+            stop_row = [
+                "STOP", selected_sector, selected_company, region, city,
+                stop_sampling_point, "", "", "",  # No GPS or description
+                "", ", ".join(officer_selected), driver,
+                stop_date_time.strftime("%Y-%m-%d %H:%M:%S"),
+                stop_temp, stop_rh, stop_pressure, stop_weather,
+                stop_wind_speed, stop_wind_direction,
+                stop_elapsed, stop_flow, stop_obs
+            ]
+            submit_observation(stop_row)
+
 def show():
     require_role(["admin", "officer"])
     st.title("📋 Field Observation")
@@ -62,134 +179,16 @@ def show():
 
     # ------------------ TAB 1: Submit START or STOP ------------------
     with tab1:
-        entry_type = st.selectbox("Select Entry Type", ["", "START", "STOP"])
-        if not entry_type:
-            return
-
-        sector_options = ["-- Select --"] + list(sector_data.keys())
-        selected_sector = st.selectbox("🏭 Select Industry Sector", sector_options)
-        if selected_sector == "-- Select --":
-            return
-
-        company_options = ["-- Select --"] + get_companies(selected_sector)
-        selected_company = st.selectbox("🏢 Select Company", company_options)
-        if selected_company == "-- Select --":
-            return
-
-        region, city = get_region_city(selected_company)
-        st.text_input("🌍 Region", value=region, disabled=True)
-        st.text_input("🏙️ Town/City", value=city, disabled=True)
-
-        st.subheader("5. Officer(s) Involved")
-        officer_selected = st.multiselect("👷 Monitoring Officer(s)", officers)
-        driver = st.selectbox("🧑‍🌾 Select Driver", ["-- Select --"] + drivers, key="driver")
-
-        wind_speed_options = [f"{x:.1f}" for x in [i * 0.5 for i in range(0, 41)]]
-
-        if entry_type == "START":
-            st.subheader("🟢 Start Monitoring")
-            start_sampling_point = st.selectbox("📍 Sampling Point", sampling_points)
-            sampling_point_description = st.text_input("📍 Sampling Point Description")
-            longitude = st.number_input("🌐 Longitude", step=0.0001, format="%.4f")
-            latitude = st.number_input("🌐 Latitude", step=0.0001, format="%.4f")
-            pollutants_selected = st.selectbox("🌫️ Pollutant", pollutants)
-
-            start_date = st.date_input("📅 Start Date", value=datetime.today())
-            start_time = get_custom_time("⏱️ Start Time", "start")
-            start_date_time = datetime.combine(start_date, start_time)
-
-            start_obs = st.text_area("🧿 Final Observations")
-
-            start_weather = st.selectbox("🌦️ Weather", weather_conditions)
-            if start_weather != "-- Select --":
-                temp_options = ["-- Select --"] + weather_defaults[start_weather]["temp"]
-                rh_options = ["-- Select --"] + weather_defaults[start_weather]["rh"]
-                start_temp = st.selectbox("🌡️ Temperature (°C)", temp_options)
-                start_rh = st.selectbox("💧 Humidity (%)", rh_options)
-            else:
-                start_temp = start_rh = "-- Select --"
-
-            start_pressure = st.number_input("🧭 Pressure (mbar)", step=0.1)
-            start_wind_speed = st.selectbox("💨 Wind Speed (km/h)", ["-- Select --"] + wind_speed_options)
-            start_wind_speed = float(start_wind_speed) if start_wind_speed != "-- Select --" else None
-            start_wind_direction = st.selectbox("🌪️ Wind Direction", wind_directions)
-
-            start_elapsed = st.number_input("⏰ Elapsed Time (min)", step=0.1)
-            start_flow = st.selectbox("🧯 Flow Rate (L/min)", options=[5, 16.7])
-
-            if st.button("✅ Submit Start Day Data"):
-                if not officer_selected or driver == "-- Select --":
-                    st.error("⚠ Please complete all required fields before submitting.")
-                    return
-                if start_weather == "-- Select --" or start_temp == "-- Select --" or start_rh == "-- Select --" or start_wind_direction == "-- Select --" or start_wind_speed is None:
-                    st.error("⚠ Please select valid weather, temperature, humidity, wind direction, and wind speed.")
-                    return
-
-                start_row = [
-                    "START", selected_sector, selected_company, region, city,
-                    start_sampling_point, sampling_point_description, longitude, latitude,
-                    ", ".join(pollutants_selected), ", ".join(officer_selected), driver,
-                    start_date_time.strftime("%Y-%m-%d %H:%M:%S"),
-                    start_temp, start_rh, start_pressure, start_weather,
-                    start_wind_speed, start_wind_direction,
-                    start_elapsed, start_flow, start_obs
-                ]
-                add_data(start_row, st.session_state.username)
-                st.success("✅ Start day data submitted successfully!")
-
-        elif entry_type == "STOP":
-            st.subheader("🔴 Stop Monitoring")
-            stop_sampling_point = st.selectbox("📍 Sampling Point", sampling_points)
-            stop_date = st.date_input("📅 Stop Date", value=datetime.today())
-            stop_time = get_custom_time("⏱️ Stop Time", "stop")
-            stop_date_time = datetime.combine(stop_date, stop_time)
-
-            stop_obs = st.text_area("🧿 Final Observations")
-
-            stop_weather = st.selectbox("🌦️ Final Weather", weather_conditions)
-            if stop_weather != "-- Select --":
-                temp_options = ["-- Select --"] + weather_defaults[stop_weather]["temp"]
-                rh_options = ["-- Select --"] + weather_defaults[stop_weather]["rh"]
-                stop_temp = st.selectbox("🌡️ Final Temperature (°C)", temp_options)
-                stop_rh = st.selectbox("💧 Final Humidity (%)", rh_options)
-            else:
-                stop_temp = stop_rh = "-- Select --"
-
-            stop_pressure = st.number_input("🧭 Final Pressure (mbar)", step=0.1)
-            stop_wind_speed = st.selectbox("💨 Final Wind Speed (km/h)", ["-- Select --"] + wind_speed_options)
-            stop_wind_speed = float(stop_wind_speed) if stop_wind_speed != "-- Select --" else None
-            stop_wind_direction = st.selectbox("🌪️ Final Wind Direction", wind_directions)
-
-            stop_elapsed = st.number_input("⏰ Final Elapsed Time (min)", step=0.1)
-            stop_flow = st.selectbox("🧯 Final Flow Rate (L/min)", options=[5, 16.7])
-
-            if st.button("✅ Submit Stop Day Data"):
-                if not officer_selected or driver == "-- Select --":
-                    st.error("⚠ Please complete all required fields before submitting.")
-                    return
-                if stop_weather == "-- Select --" or stop_temp == "-- Select --" or stop_rh == "-- Select --" or stop_wind_direction == "-- Select --" or stop_wind_speed is None:
-                    st.error("⚠ Please select valid weather, temperature, humidity, wind direction, and wind speed.")
-                    return
-
-                stop_row = [
-                    "STOP", selected_sector, selected_company, region, city,
-                    stop_sampling_point, "", "", "",  # No GPS or description
-                    "", ", ".join(officer_selected), driver,
-                    stop_date_time.strftime("%Y-%m-%d %H:%M:%S"),
-                    stop_temp, stop_rh, stop_pressure, stop_weather,
-                    stop_wind_speed, stop_wind_direction,
-                    stop_elapsed, stop_flow, stop_obs
-                ]
-                add_data(stop_row, st.session_state.username)
-                st.success("✅ Stop day data submitted successfully!")
+        hold_entries_toggle()
+        queue_area = st.container()  # filled after the form, so an entry held this run is listed
+        # Its own function so an incomplete form only ends this tab, not the whole page.
+        _show_submit_tab()
+        with queue_area:
+            show_field_queue()
 
     # ------------------ TAB 2: Merge START/STOP ------------------
     with tab2:
         st.subheader("🔄 Merge START and STOP Entries")
 
-        df = load_data_from_sheet(sheet)
-
-        if df.empty:
-            st.info("ℹ️ No observation data found.")
-        else:
-            display_and_merge_data(df, spreadsheet, MERGED_SHEET)
+        request_merge()
+        display_merged_data(get_spreadsheet(), MERGED_SHEET)
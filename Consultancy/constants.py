@@ -1,3 +1,5 @@
+import os
+
 SPREADSHEET_ID = "1F1nGYKzmeuMTtkRkazFFUOk7w7V9JXYdE7R5ZNJ6wyk"
 NOISE_SHEET_NAME = "Noise"
 GASES_SHEET_NAME = "Gases"
@@ -8,4 +10,17 @@ USERS_SHEET = "Users"
 LOG_SHEET = "Registration Log"
 MAIN_SHEET = 'Observations'
 MERGED_SHEET = 'Merged Records'
-CALC_SHEET = "PM Calculations"
\ No newline at end of file
+CALC_SHEET = "PM Calculations"
+META_SHEET = "App Meta"
+
+# Local, per-replica state (outbox, caches); never committed.
+LOCAL_STATE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".state")
+OUTBOX_DB_PATH = os.path.join(LOCAL_STATE_DIR, "outbox.sqlite3")
+REPLICA_DB_PATH = os.path.join(LOCAL_STATE_DIR, "replica.sqlite3")
+SHEETS_METRICS_PATH = os.path.join(LOCAL_STATE_DIR, "sheets_metrics.jsonl")
+SNAPSHOT_DIR = os.path.join(LOCAL_STATE_DIR, "snapshots")
+EXPORT_DIR = os.path.join(LOCAL_STATE_DIR, "exports")
+
+# Site registry (sectors, companies, sampling points); edited by hand, so it lives with the code.
+SITES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "sites.csv")
+SITES_SHEET = "Sites"
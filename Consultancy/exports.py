@@ -0,0 +1,219 @@
+import os
+import time
+import uuid
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import streamlit as st
+
+from constants import EXPORT_DIR
+from schema import DATETIME_FORMAT, to_sheet_values
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # Parquet exports are offered only when pyarrow is installed
+    pa = pq = None
+
+try:
+    import openpyxl
+except ImportError:  # likewise Excel and openpyxl
+    openpyxl = None
+
+# Worksheet exports are written to files under EXPORT_DIR by a small
+# background pool, EXPORT_CHUNK_ROWS rows at a time, straight from the cached
+# (shared, uncopied) sheet frame. The download button opens the finished file
+# only when clicked, so no page rerun holds an export in memory.
+EXPORT_CHUNK_ROWS = 5000
+EXPORT_WORKERS = 2
+EXPORT_TTL_SECONDS = 3600
+
+FORMATS = {
+    "CSV": {"extension": "csv", "mime": "text/csv"},
+    "Parquet": {"extension": "parquet", "mime": "application/vnd.apache.parquet"},
+    "Excel": {"extension": "xlsx", "mime": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"},
+}
+
+
+def available_formats():
+    formats = ["CSV"]
+    if pq is not None:
+        formats.append("Parquet")
+    if openpyxl is not None:
+        formats.append("Excel")
+    return formats
+
+
+def _chunks(df):
+    for start in range(0, len(df), EXPORT_CHUNK_ROWS):
+        yield df.iloc[start:start + EXPORT_CHUNK_ROWS]
+
+
+def write_csv(df, path, progress):
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        if df.empty:
+            f.write(",".join(map(str, df.columns)) + "\n")
+        for i, chunk in enumerate(_chunks(df)):
+            chunk.to_csv(f, index=False, header=i == 0, date_format=DATETIME_FORMAT)
+            progress(len(chunk))
+
+
+def _arrow_ready(df):
+    """Object columns as pandas strings, so every chunk has the same (string) Arrow type."""
+    objects = df.columns[df.dtypes == object]
+    return df.astype({column: "string" for column in objects}) if len(objects) else df
+
+
+def write_parquet(df, path, progress):
+    # An empty object column would be typed null; typed as string it matches every chunk.
+    schema = pa.Schema.from_pandas(_arrow_ready(df.iloc[:0]), preserve_index=False)
+    with pq.ParquetWriter(path, schema) as writer:
+        for chunk in _chunks(df):
+            writer.write_table(pa.Table.from_pandas(_arrow_ready(chunk), schema=schema, preserve_index=False))
+            progress(len(chunk))
+
+
+def write_excel(df, path, progress):
+    workbook = openpyxl.Workbook(write_only=True)
+    worksheet = workbook.create_sheet()
+    worksheet.append([str(column) for column in df.columns])
+    for chunk in _chunks(df):
+        for row in to_sheet_values(chunk):
+            worksheet.append(row)
+        progress(len(chunk))
+    workbook.save(path)
+
+
+WRITERS = {"CSV": write_csv, "Parquet": write_parquet, "Excel": write_excel}
+
+
+@st.cache_resource
+def _get_export_state():
+    return {
+        "lock": threading.Lock(),
+        "pool": ThreadPoolExecutor(max_workers=EXPORT_WORKERS, thread_name_prefix="export"),
+        "jobs": {},
+    }
+
+
+def _run(job, df):
+    state = _get_export_state()
+
+    def progress(rows):
+        with state["lock"]:
+            job["written"] += rows
+
+    with state["lock"]:
+        job["status"] = "running"
+    tmp_path = f"{job['path']}.tmp"
+    try:
+        WRITERS[job["format"]](df, tmp_path, progress)
+        os.replace(tmp_path, job["path"])
+        status, error = "done", None
+    except Exception as e:
+        print(f"Export of '{job['sheet']}' failed: {e}")
+        status, error = "failed", str(e)
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    with state["lock"]:
+        job.update(status=status, error=error, finished=time.monotonic())
+
+
+def _expire_old_exports(state):
+    now = time.monotonic()
+    with state["lock"]:
+        expired = [
+            job_id for job_id, job in state["jobs"].items()
+            if job["finished"] and now - job["finished"] > EXPORT_TTL_SECONDS
+        ]
+        for job_id in expired:
+            job = state["jobs"].pop(job_id)
+            if os.path.exists(job["path"]):
+                os.remove(job["path"])
+
+
+def start_export(sheet_name, df, fmt):
+    """Write `df` (read, never modified) to an export file in the background; returns the job id."""
+    state = _get_export_state()
+    _expire_old_exports(state)
+    os.makedirs(EXPORT_DIR, exist_ok=True)
+    job_id = uuid.uuid4().hex[:12]
+    stamp = time.strftime("%Y%m%d-%H%M%S")
+    file_name = f"{sheet_name.lower().replace(' ', '_')}_{stamp}.{FORMATS[fmt]['extension']}"
+    job = {
+        "id": job_id,
+        "sheet": sheet_name,
+        "format": fmt,
+        "file_name": file_name,
+        "path": os.path.join(EXPORT_DIR, f"{job_id}_{file_name}"),
+        "rows": len(df),
+        "written": 0,
+        "status": "queued",
+        "error": None,
+        "finished": None,
+    }
+    with state["lock"]:
+        state["jobs"][job_id] = job
+    state["pool"].submit(_run, job, df)
+    return job_id
+
+
+def export_jobs(job_ids):
+    """Snapshots of the given jobs that still exist, newest first."""
+    state = _get_export_state()
+    with state["lock"]:
+        return [dict(state["jobs"][job_id]) for job_id in reversed(job_ids) if job_id in state["jobs"]]
+
+
+def _open_export(path):
+    def read():
+        with open(path, "rb") as f:
+            return f.read()
+    return read
+
+
+def show_export_panel(sheet_names, key):
+    """Sheet/format picker, an 'Prepare export' button and this session's exports with download buttons."""
+    from resource import load_table
+
+    # Every render, not only on a new export, so finished files don't outlive EXPORT_TTL_SECONDS.
+    _expire_old_exports(_get_export_state())
+    session_jobs = st.session_state.setdefault("export_jobs", [])
+    col1, col2 = st.columns(2)
+    with col1:
+        sheet_name = st.selectbox("📄 Worksheet", sheet_names, key=f"{key}_sheet")
+    with col2:
+        fmt = st.radio("Format", available_formats(), horizontal=True, key=f"{key}_format")
+    if st.button("📦 Prepare export", key=f"{key}_start"):
+        df = load_table(sheet_name, shared=True)
+        if df.columns.empty:
+            st.warning(f"⚠ Worksheet '{sheet_name}' has no data yet.")
+        else:
+            session_jobs.append(start_export(sheet_name, df, fmt))
+
+    jobs = [job for job in export_jobs(session_jobs) if job["sheet"] in sheet_names]
+    if not jobs:
+        return
+    running = any(job["status"] in ("queued", "running") for job in jobs)
+
+    @st.fragment(run_every=2 if running else None)
+    def show_jobs():
+        current = [job for job in export_jobs(session_jobs) if job["sheet"] in sheet_names]
+        for job in current:
+            label = f"{job['sheet']} · {job['format']} · {job['rows']} rows"
+            if job["status"] == "done":
+                st.download_button(
+                    f"⬇️ {label}",
+                    data=_open_export(job["path"]),
+                    file_name=job["file_name"],
+                    mime=FORMATS[job["format"]]["mime"],
+                    key=f"{key}_download_{job['id']}",
+                )
+            elif job["status"] == "failed":
+                st.error(f"❌ {label}: {job['error']}")
+            else:
+                st.progress(job["written"] / max(job["rows"], 1), text=f"⏳ {label}")
+        if running and not any(job["status"] in ("queued", "running") for job in current):
+            st.rerun()  # stop polling once everything has finished
+
+    show_jobs()
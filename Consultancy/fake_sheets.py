@@ -0,0 +1,229 @@
+import json
+import time
+import threading
+from collections import namedtuple
+
+from gspread.exceptions import WorksheetNotFound
+from gspread.utils import a1_range_to_grid_range
+
+# In-process stand-in for the parts of gspread's Spreadsheet/Worksheet API the
+# app uses. Every call sleeps for `latency` seconds and is recorded in
+# `spreadsheet.calls`, so benchmarks can count Sheets round trips per page.
+
+Call = namedtuple("Call", ["op", "worksheet", "bytes", "seconds"])
+
+
+def _payload_size(payload):
+    if payload is None:
+        return 0
+    return len(json.dumps(payload, default=str))
+
+
+class FakeWorksheet:
+    def __init__(self, spreadsheet, title, rows=1000, cols=26, sheet_id=0):
+        self.spreadsheet = spreadsheet
+        self.spreadsheet_id = spreadsheet.id
+        self.title = title
+        self.id = sheet_id
+        self.row_count = int(rows)
+        self.col_count = int(cols)
+        self._rows = []
+
+    def _call(self, op, payload=None):
+        return self.spreadsheet._record(op, self.title, payload)
+
+    # --- helpers ---
+    def _values(self):
+        width = max((len(row) for row in self._rows), default=0)
+        values = [list(row) + [""] * (width - len(row)) for row in self._rows]
+        while values and all(cell == "" for cell in values[-1]):
+            values.pop()
+        return values
+
+    def _set(self, row, col, value):
+        while len(self._rows) <= row:
+            self._rows.append([])
+        cells = self._rows[row]
+        while len(cells) <= col:
+            cells.append("")
+        cells[col] = "" if value is None else str(value)
+        self.row_count = max(self.row_count, row + 1)
+        self.col_count = max(self.col_count, col + 1)
+
+    def _write(self, range_name, values):
+        grid = a1_range_to_grid_range(range_name)
+        top, left = grid.get("startRowIndex", 0), grid.get("startColumnIndex", 0)
+        for i, row in enumerate(values):
+            for j, value in enumerate(row):
+                self._set(top + i, left + j, value)
+
+    def _grid(self, range_name):
+        grid = a1_range_to_grid_range(range_name)
+        return (grid.get("startRowIndex", 0), grid.get("endRowIndex", self.row_count),
+                grid.get("startColumnIndex", 0), grid.get("endColumnIndex", self.col_count))
+
+    # --- reads ---
+    def get_all_values(self, **kwargs):
+        values = self._values()
+        self._call("get_all_values", values)
+        return values
+
+    def get_all_records(self, head=1, **kwargs):
+        values = self._values()
+        self._call("get_all_records", values)
+        if len(values) < head:
+            return []
+        header = values[head - 1]
+        return [dict(zip(header, row)) for row in values[head:]]
+
+    def get(self, range_name=None, **kwargs):
+        top, bottom, left, right = self._grid(range_name)
+        values = [row[left:right] for row in self._values()[top:bottom]]
+        values = [self._trim(row) for row in values]
+        self._call("get", values)
+        return values
+
+    def get_values(self, range_name=None, **kwargs):
+        return self.get(range_name, **kwargs)
+
+    @staticmethod
+    def _trim(row):
+        row = list(row)
+        while row and row[-1] == "":
+            row.pop()
+        return row
+
+    def row_values(self, row, **kwargs):
+        values = self._values()
+        result = self._trim(values[row - 1]) if row <= len(values) else []
+        self._call("row_values", result)
+        return result
+
+    def col_values(self, col, **kwargs):
+        values = [row[col - 1] if len(row) >= col else "" for row in self._values()]
+        while values and values[-1] == "":
+            values.pop()
+        self._call("col_values", values)
+        return values
+
+    # --- writes ---
+    def append_row(self, values, **kwargs):
+        return self.append_rows([values], **kwargs)
+
+    def append_rows(self, values, **kwargs):
+        self._call("append_rows", values)
+        self._rows = self._values()
+        for row in values:
+            self._rows.append(["" if v is None else str(v) for v in row])
+        self.row_count = max(self.row_count, len(self._rows))
+
+    def update(self, range_name=None, values=None, **kwargs):
+        if isinstance(range_name, list):  # gspread 6 positional order: update(values, range_name)
+            range_name, values = values, range_name
+        self._call("update", values)
+        self._write(range_name or "A1", values)
+
+    def batch_update(self, data, **kwargs):
+        self._call("batch_update", data)
+        for item in data:
+            self._write(item["range"], item["values"])
+
+    def batch_clear(self, ranges):
+        self._call("batch_clear", ranges)
+        for range_name in ranges:
+            top, bottom, left, right = self._grid(range_name)
+            for row in self._rows[top:bottom]:
+                for col in range(left, min(right, len(row))):
+                    row[col] = ""
+
+    def clear(self):
+        self._call("clear")
+        self._rows = []
+
+    def delete_rows(self, start_index, end_index=None):
+        self._call("delete_rows")
+        end_index = end_index or start_index
+        del self._rows[start_index - 1:end_index]
+
+    def resize(self, rows=None, cols=None):
+        self._call("resize")
+        self.row_count = int(rows or self.row_count)
+        self.col_count = int(cols or self.col_count)
+
+
+class FakeSpreadsheet:
+    id = "fake"
+
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.calls = []
+        self._sheets = {}
+        self._next_id = 1
+        self._lock = threading.Lock()
+
+    def _record(self, op, worksheet, payload=None):
+        started = time.perf_counter()
+        if self.latency:
+            time.sleep(self.latency)
+        with self._lock:
+            self.calls.append(Call(op, worksheet, _payload_size(payload), time.perf_counter() - started))
+
+    def reset_calls(self):
+        with self._lock:
+            calls, self.calls = self.calls, []
+        return calls
+
+    def load(self, title, values):
+        """Seed a worksheet without recording calls (for building synthetic fixtures)."""
+        worksheet = self._sheets.get(title) or self._new_worksheet(title, len(values) + 10, max(map(len, values or [[]])) + 2)
+        worksheet._rows = [[str(v) for v in row] for row in values]
+        worksheet.row_count = max(worksheet.row_count, len(values))
+        return worksheet
+
+    def _new_worksheet(self, title, rows, cols, sheet_id=None):
+        if sheet_id is None:
+            sheet_id = self._next_id
+            self._next_id += 1
+        worksheet = FakeWorksheet(self, title, rows, cols, sheet_id=sheet_id)
+        self._sheets[title] = worksheet
+        return worksheet
+
+    def worksheet(self, title):
+        self._record("worksheet", title)
+        if title not in self._sheets:
+            raise WorksheetNotFound(title)
+        return self._sheets[title]
+
+    def worksheets(self):
+        self._record("worksheets", None)
+        return list(self._sheets.values())
+
+    def add_worksheet(self, title, rows=1000, cols=26, **kwargs):
+        self._record("add_worksheet", title)
+        return self._new_worksheet(title, rows, cols)
+
+    def del_worksheet(self, worksheet):
+        self._record("del_worksheet", worksheet.title)
+        self._sheets.pop(worksheet.title, None)
+
+    def batch_update(self, body):
+        self._record("batch_update", None, body)
+        by_id = {ws.id: ws for ws in self._sheets.values()}
+        for request in body.get("requests", []):
+            if "addSheet" in request:
+                properties = request["addSheet"]["properties"]
+                grid = properties.get("gridProperties", {})
+                new = self._new_worksheet(properties["title"], grid.get("rowCount", 1000), grid.get("columnCount", 26), properties.get("sheetId"))
+                by_id[new.id] = new
+            cells = request.get("updateCells")
+            if cells:
+                worksheet, start = by_id[cells["start"]["sheetId"]], cells["start"]
+                for i, row in enumerate(cells["rows"]):
+                    for j, cell in enumerate(row["values"]):
+                        value = next(iter(cell.get("userEnteredValue", {"": ""}).values()))
+                        worksheet._set(start.get("rowIndex", 0) + i, start.get("columnIndex", 0) + j, value)
+            dimension = request.get("deleteDimension", {}).get("range")
+            if dimension and dimension.get("dimension") == "ROWS":
+                worksheet = by_id[dimension["sheetId"]]
+                del worksheet._rows[dimension["startIndex"]:dimension["endIndex"]]
+        return {}
@@ -0,0 +1,171 @@
+import uuid
+from datetime import datetime
+
+import pandas as pd
+import streamlit as st
+
+from outbox import enqueue_rows, hold_entry, held_entries, held_count, set_held_problems, release_held, discard_held
+from schema import DATETIME_FORMAT
+
+# Completed field entries a user holds back (with "Hold entries" on, or when
+# sending one fails), then checks for conflicts and sends together: one outbox
+# transaction and one append_rows per worksheet. Held entries are stored in the
+# outbox database under the user's name, so they survive a closed tab or a
+# restart; they are kept on the server, not on the user's device. Each entry
+# names the row positions that identify it (e.g. entry type, company, sampling
+# point and time) so a re-sent or duplicated entry is reported instead of
+# written twice.
+HOLD_KEY = "hold_entries"
+
+
+def _owner():
+    return st.session_state.get("username", "")
+
+
+def pending_count():
+    return held_count(_owner())
+
+
+def hold_entries_toggle():
+    return st.toggle(
+        "⏸️ Hold entries",
+        key=HOLD_KEY,
+        help="Keep completed entries back and send them together with 'Sync'. Held entries are saved under your username.",
+    )
+
+
+def queue_entry(sheet_name, row, label, key_columns, value_input_option="RAW", after_sync=None):
+    """Hold a validated row for the current user until sync_queue sends it."""
+    hold_entry(_owner(), {
+        "id": uuid.uuid4().hex,
+        "sheet": sheet_name,
+        "row": row,
+        "label": label,
+        "key_columns": key_columns,
+        "value_input_option": value_input_option,
+        "after_sync": after_sync,
+        "queued_at": datetime.now().strftime(DATETIME_FORMAT),
+        "problem": None,
+    })
+
+
+def submit_entry(sheet_name, row, label, key_columns, value_input_option="RAW", after_sync=None):
+    """Send a row now, or hold it when "Hold entries" is on or sending fails. Returns True if sent."""
+    if not st.session_state.get(HOLD_KEY):
+        try:
+            enqueue_rows(sheet_name, [row], value_input_option)
+            _after_sync({after_sync})
+            return True
+        except Exception as e:
+            st.warning(f"⚠ Could not send the entry ({e}); it is held until you sync.")
+    queue_entry(sheet_name, row, label, key_columns, value_input_option, after_sync)
+    return False
+
+
+def _after_sync(actions):
+    if "merge" in actions:
+        from resource import request_merge
+        request_merge()
+
+
+def _key(values, positions):
+    return "|".join(str(values[p]).strip() if p < len(values) and values[p] is not None else "" for p in positions)
+
+
+def _since(entries):
+    """Earliest timestamp among the entries' key values; older partitions can't hold a match."""
+    times = []
+    for entry in entries:
+        for position in entry["key_columns"]:
+            try:
+                times.append(datetime.strptime(str(entry["row"][position]), DATETIME_FORMAT))
+            except (IndexError, ValueError):
+                pass
+    return min(times) if times else None
+
+
+def _existing_keys(sheet_name, positions, since=None):
+    """Keys already in the worksheet (or its partitions from `since` on), from the revision-aware sheet cache.
+
+    Raises when the worksheet can't be read, so entries aren't sent unchecked.
+    """
+    from resource import load_table
+
+    df = load_table(sheet_name, since=since, shared=True, strict=True)
+    if df.empty or max(positions) >= len(df.columns):
+        return set()
+    parts = []
+    for position in positions:
+        column = df.iloc[:, position]
+        if pd.api.types.is_datetime64_any_dtype(column):
+            column = column.dt.strftime(DATETIME_FORMAT)
+        parts.append(column.astype(object).where(column.notna(), "").astype(str).str.strip())
+    return set(pd.concat(parts, axis=1).agg("|".join, axis=1)) if parts else set()
+
+
+def sync_queue():
+    """Send every held entry that doesn't conflict; conflicting ones stay held with a reason.
+
+    Returns (sent, conflicts).
+    """
+    owner = _owner()
+    by_sheet, problems, ready_ids = {}, {}, []
+    for entry in held_entries(owner):
+        by_sheet.setdefault((entry["sheet"], entry["value_input_option"]), []).append(entry)
+
+    for (sheet_name, value_input_option), entries in by_sheet.items():
+        try:
+            existing = _existing_keys(sheet_name, entries[0]["key_columns"], _since(entries))
+        except Exception as e:
+            problems.update((entry["id"], f"Could not check against '{sheet_name}': {e}") for entry in entries)
+            continue
+        seen = set()
+        for entry in entries:
+            key = _key(entry["row"], entry["key_columns"])
+            if key in existing:
+                problems[entry["id"]] = f"Already in '{sheet_name}'"
+            elif key in seen:
+                problems[entry["id"]] = "Duplicate of another held entry"
+            else:
+                seen.add(key)
+                ready_ids.append(entry["id"])
+
+    set_held_problems(owner, problems)
+    try:
+        sent = release_held(owner, ready_ids)
+    except Exception as e:
+        set_held_problems(owner, {entry_id: f"Not sent: {e}" for entry_id in ready_ids})
+        sent = []
+    _after_sync({entry["after_sync"] for entry in sent})
+    return len(sent), len(problems) + len(ready_ids) - len(sent)
+
+
+def show_field_queue():
+    """Held count, per-entry problems and the Sync / Discard buttons."""
+    if not pending_count():
+        if st.session_state.get(HOLD_KEY):
+            st.caption("⏸️ Entries are held under your username until you sync.")
+        return
+    count = pending_count()
+    if st.button(f"🔄 Sync {count} held entr{'y' if count == 1 else 'ies'}", key="field_queue_sync"):
+        sent, conflicts = sync_queue()
+        if sent:
+            st.success(f"✅ Sent {sent} entr{'y' if sent == 1 else 'ies'}.")
+        if conflicts:
+            st.warning(f"⚠ {conflicts} entr{'y' if conflicts == 1 else 'ies'} not sent; see the Problem column.")
+
+    queue = held_entries(_owner())
+    if not queue:
+        return
+    st.info(f"⏸️ {len(queue)} entr{'y' if len(queue) == 1 else 'ies'} held until you sync.")
+    st.dataframe(
+        pd.DataFrame([
+            {"Entry": entry["label"], "Sheet": entry["sheet"], "Held At": entry["queued_at"], "Problem": entry["problem"] or ""}
+            for entry in queue
+        ]),
+        use_container_width=True,
+        hide_index=True,
+    )
+    if any(entry["problem"] for entry in queue) and st.button("🗑️ Discard entries with problems", key="field_queue_discard"):
+        discard_held(_owner(), [entry["id"] for entry in queue if entry["problem"]])
+        st.rerun()
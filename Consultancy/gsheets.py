@@ -1,28 +1,434 @@
+import os
+import json
+import time
+import random
+import logging
+import threading
+from collections import deque
+from concurrent.futures import Future
+from datetime import datetime
+from logging.handlers import RotatingFileHandler
 import gspread
+from gspread.exceptions import APIError
 from oauth2client.service_account import ServiceAccountCredentials
 import streamlit as st
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+from constants import SPREADSHEET_ID, META_SHEET, LOCAL_STATE_DIR, SHEETS_METRICS_PATH
+
+SCOPE = [
+    "https://spreadsheets.google.com/feeds",
+    "https://www.googleapis.com/auth/spreadsheets",
+    "https://www.googleapis.com/auth/drive.file",
+    "https://www.googleapis.com/auth/drive"
+]
+
+# Seconds spent on each one-off startup step (auth, open_by_key), per process.
+startup_timings = {}
 
 
 @st.cache_resource
 def init_gsheet_client():
+    started = time.perf_counter()
     creds_dict = st.secrets["GOOGLE_CREDENTIALS"]
-    scope = [
-        "https://spreadsheets.google.com/feeds",
-        "https://www.googleapis.com/auth/spreadsheets",
-        "https://www.googleapis.com/auth/drive.file",
-        "https://www.googleapis.com/auth/drive"
-    ]
-    creds = ServiceAccountCredentials.from_json_keyfile_dict(creds_dict, scope)
+    creds = ServiceAccountCredentials.from_json_keyfile_dict(creds_dict, SCOPE)
     client = gspread.authorize(creds)
+    startup_timings["authorize"] = time.perf_counter() - started
     return client
 
-def open_worksheet(client, sheet_name):
+
+# === Call accounting: every spreadsheet/worksheet call is timed and recorded ===
+RECENT_CALLS_LIMIT = 5000
+METRICS_FILE_MAX_BYTES = 5 * 1024 * 1024
+METRICS_FILE_BACKUPS = 5
+
+recent_calls = deque(maxlen=RECENT_CALLS_LIMIT)
+_recent_calls_lock = threading.Lock()
+_metrics_logger = None
+
+
+def _get_metrics_logger():
+    global _metrics_logger
+    if _metrics_logger is None:
+        os.makedirs(LOCAL_STATE_DIR, exist_ok=True)
+        logger = logging.getLogger("sheets_metrics")
+        logger.setLevel(logging.INFO)
+        logger.propagate = False
+        if not logger.handlers:
+            handler = RotatingFileHandler(SHEETS_METRICS_PATH, maxBytes=METRICS_FILE_MAX_BYTES, backupCount=METRICS_FILE_BACKUPS)
+            handler.setFormatter(logging.Formatter("%(message)s"))
+            logger.addHandler(handler)
+        _metrics_logger = logger
+    return _metrics_logger
+
+
+def _payload_size(value):
+    """Approximate bytes of cell data sent or received (sum of cell text lengths)."""
+    if isinstance(value, str):
+        return len(value)
+    if isinstance(value, dict):
+        return sum(_payload_size(v) for v in value.values())
+    if isinstance(value, (list, tuple)):
+        return sum(_payload_size(v) if isinstance(v, (list, tuple, dict)) else len(str(v)) for v in value)
+    return 0
+
+
+def _record_call(op, worksheet, seconds, payload_bytes, error=None):
+    in_session = get_script_run_ctx(suppress_warning=True) is not None
+    record = {
+        "at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        "page": (st.session_state.get("selected_page") or "Login") if in_session else "background",
+        "op": op,
+        "worksheet": worksheet,
+        "seconds": round(seconds, 4),
+        "bytes": payload_bytes,
+        "error": error,
+    }
+    with _recent_calls_lock:
+        recent_calls.append(record)
+    if in_session:
+        st.session_state.setdefault("sheets_calls", []).append(record)
+    try:
+        _get_metrics_logger().info(json.dumps(record))
+    except OSError as e:
+        print(f"Could not write Sheets metrics: {e}")
+
+
+def start_rerun_metrics():
+    """Call at the top of each rerun; keeps the previous rerun's calls for the Admin Panel."""
+    st.session_state["last_rerun_sheets_calls"] = st.session_state.get("sheets_calls", [])
+    st.session_state["sheets_calls"] = []
+
+
+# === Quota: one per-minute budget for the process, retries and read coalescing ===
+REQUESTS_PER_MINUTE = 60
+MAX_RETRIES = 5
+BACKOFF_BASE_SECONDS = 1.0
+BACKOFF_MAX_SECONDS = 32.0
+READ_OPS = {
+    "get_all_values", "get_all_records", "get", "get_values", "row_values", "col_values",
+    "acell", "cell", "worksheet", "worksheets"
+}
+
+_quota_lock = threading.Lock()
+_quota_window = deque()
+_inflight = {}
+_inflight_lock = threading.Lock()
+
+
+_quota_limit = None
+
+
+def _requests_per_minute():
+    # Override with SHEETS_REQUESTS_PER_MINUTE in secrets.toml; read once per process.
+    global _quota_limit
+    if _quota_limit is None:
+        try:
+            _quota_limit = int(st.secrets.get("SHEETS_REQUESTS_PER_MINUTE", REQUESTS_PER_MINUTE))
+        except Exception:
+            _quota_limit = REQUESTS_PER_MINUTE
+    return _quota_limit
+
+
+def _acquire_quota():
+    """Block until the sliding one-minute window has room for another request."""
+    limit = _requests_per_minute()
+    while True:
+        with _quota_lock:
+            now = time.monotonic()
+            while _quota_window and now - _quota_window[0] >= 60:
+                _quota_window.popleft()
+            if len(_quota_window) < limit:
+                _quota_window.append(now)
+                return
+            wait = 60 - (now - _quota_window[0])
+        time.sleep(wait)
+
+
+def _is_retryable(error, idempotent):
+    """429 means the request was refused, so anything can be retried; after a 5xx the
+    call may already have been applied, so only calls that are safe to repeat are."""
+    status = getattr(getattr(error, "response", None), "status_code", None)
+    return status == 429 or (idempotent and status is not None and status >= 500)
+
+
+def _copy_rows(result):
+    # Coalesced callers each get their own rows so one caller's edits don't leak into another's.
+    if isinstance(result, list):
+        return [list(item) if isinstance(item, list) else dict(item) if isinstance(item, dict) else item for item in result]
+    return result
+
+
+def _coalesced(key, fetch):
+    """Run `fetch` once for concurrent identical reads; followers wait for the leader's result."""
+    with _inflight_lock:
+        future = _inflight.get(key)
+        leader = future is None
+        if leader:
+            future = Future()
+            _inflight[key] = future
+    if not leader:
+        return _copy_rows(future.result())
+    try:
+        result = fetch()
+        future.set_result(result)
+        return result
+    except BaseException as e:
+        future.set_exception(e)
+        raise
+    finally:
+        with _inflight_lock:
+            _inflight.pop(key, None)
+
+
+class _Instrumented:
+    # Calls besides the reads that give the same result when repeated.
+    IDEMPOTENT_OPS = frozenset()
+
+    def __init__(self, target, worksheet_title=None):
+        self._target = target
+        self._worksheet_title = worksheet_title
+
+    def __getattr__(self, name):
+        attr = getattr(self._target, name)
+        if not callable(attr) or name.startswith("_"):
+            return attr
+
+        def call(*args, **kwargs):
+            title = self._worksheet_title or (args[0] if args and isinstance(args[0], str) else kwargs.get("title"))
+            if name in READ_OPS:
+                key = (title, name, repr(args), repr(sorted(kwargs.items())))
+                result = _coalesced(key, lambda: self._invoke(attr, name, title, args, kwargs))
+            else:
+                result = self._invoke(attr, name, title, args, kwargs)
+                if name in WRITE_OPS:
+                    self._after_write(name, args, kwargs)
+            return self._wrap_result(result)
+
+        return call
+
+    def _invoke(self, method, name, title, args, kwargs):
+        sent = _payload_size(args) + _payload_size(kwargs)
+        for attempt in range(MAX_RETRIES + 1):
+            _acquire_quota()
+            started = time.perf_counter()
+            try:
+                result = method(*args, **kwargs)
+            except Exception as e:
+                _record_call(name, title, time.perf_counter() - started, sent, error=type(e).__name__)
+                idempotent = name in READ_OPS or name in self.IDEMPOTENT_OPS
+                if not isinstance(e, APIError) or not _is_retryable(e, idempotent) or attempt == MAX_RETRIES:
+                    raise
+                # Full jitter: sleep a random time up to the exponential cap.
+                time.sleep(random.uniform(0, min(BACKOFF_MAX_SECONDS, BACKOFF_BASE_SECONDS * 2 ** attempt)))
+                continue
+            _record_call(name, title, time.perf_counter() - started, sent + _payload_size(result))
+            return result
+
+    def _wrap_result(self, result):
+        return result
+
+    def _after_write(self, name, args, kwargs):
+        pass
+
+
+class InstrumentedWorksheet(_Instrumented):
+    # Writes of fixed values to fixed ranges; appends, inserts and deletes are not.
+    IDEMPOTENT_OPS = frozenset({"update", "update_cell", "update_cells", "batch_update", "batch_clear"})
+
+    def __init__(self, worksheet):
+        super().__init__(worksheet, worksheet_title=worksheet.title)
+
+    def _after_write(self, name, args, kwargs):
+        if self._worksheet_title != META_SHEET:
+            bump_revisions([self._target.id], edited=name not in APPEND_OPS)
+
+
+def _sheet_ids(body):
+    """Every sheetId mentioned in a spreadsheet batch_update body."""
+    if isinstance(body, dict):
+        ids = {body["sheetId"]} if "sheetId" in body else set()
+        return ids.union(*(_sheet_ids(value) for value in body.values()))
+    if isinstance(body, list):
+        return set().union(*(_sheet_ids(value) for value in body))
+    return set()
+
+
+class InstrumentedSpreadsheet(_Instrumented):
+    def _after_write(self, name, args, kwargs):
+        if name == "batch_update":
+            body = args[0] if args else kwargs.get("body", {})
+            sheet_ids = _sheet_ids(body)
+            if sheet_ids:
+                bump_revisions(sorted(sheet_ids), edited=True)
+
+    def _wrap_result(self, result):
+        if isinstance(result, list):
+            return [self._wrap_result(item) for item in result]
+        if hasattr(result, "row_count") and hasattr(result, "title"):
+            return InstrumentedWorksheet(result)
+        return result
+
+
+_spreadsheet_override = None
+
+
+def use_spreadsheet(spreadsheet):
+    """Route all Sheets access to `spreadsheet` (e.g. fake_sheets.FakeSpreadsheet for benchmarks)."""
+    global _spreadsheet_override
+    _spreadsheet_override = InstrumentedSpreadsheet(spreadsheet)
+    st.cache_resource.clear()
+
+
+def get_spreadsheet():
+    """Shared spreadsheet handle; nothing is opened until the first call."""
+    if _spreadsheet_override is not None:
+        return _spreadsheet_override
+    return _open_spreadsheet()
+
+
+@st.cache_resource
+def _open_spreadsheet():
+    client = init_gsheet_client()
+    started = time.perf_counter()
     spreadsheet = client.open_by_key(SPREADSHEET_ID)
+    startup_timings["open_by_key"] = time.perf_counter() - started
+    print(f"Google Sheets ready in {sum(startup_timings.values()):.2f}s: {startup_timings}")
+    return InstrumentedSpreadsheet(spreadsheet)
+
+
+def open_worksheet(sheet_name, rows="1000", cols="20"):
+    spreadsheet = get_spreadsheet()
     try:
         worksheet = spreadsheet.worksheet(sheet_name)
     except gspread.WorksheetNotFound:
-        worksheet = spreadsheet.add_worksheet(title=sheet_name, rows="1000", cols="20")
+        worksheet = spreadsheet.add_worksheet(title=sheet_name, rows=rows, cols=cols)
     return worksheet
 
 def append_data_to_sheet(worksheet, data_list):
     worksheet.append_row(data_list, value_input_option='USER_ENTERED')
+
+
+# === App Meta: small key/value worksheet for shared app state (checkpoints etc.) ===
+@st.cache_resource
+def get_meta_sheet():
+    worksheet = open_worksheet(META_SHEET, rows="50", cols="3")
+    if not worksheet.row_values(1):
+        worksheet.append_row(["Key", "Value", "Updated At"])
+    return worksheet
+
+@st.cache_resource
+def _get_meta_state():
+    # Last read of App Meta in this process, plus each key's row for in-place updates.
+    return {"lock": threading.Lock(), "meta": {}, "rows": {}, "read_at": None}
+
+def read_meta(max_age=0):
+    """All meta entries as {key: (value, updated_at)}.
+
+    With `max_age`, a read made by this process within that many seconds is reused.
+    """
+    state = _get_meta_state()
+    with state["lock"]:
+        if max_age and state["read_at"] is not None and time.monotonic() - state["read_at"] < max_age:
+            return dict(state["meta"])
+    values = get_meta_sheet().get_all_values()
+    meta, rows = {}, {}
+    for row_number, row in enumerate(values[1:], start=2):
+        row = row + [""] * (3 - len(row))
+        if row[0] and row[0] not in meta:
+            meta[row[0]] = (row[1], row[2])
+            rows[row[0]] = row_number
+    with state["lock"]:
+        state["meta"], state["rows"], state["read_at"] = meta, rows, time.monotonic()
+    return dict(meta)
+
+def write_meta_many(entries):
+    """Set several meta keys: one batch_update for known keys, one append for new ones."""
+    worksheet = get_meta_sheet()
+    state = _get_meta_state()
+    if state["read_at"] is None or any(key not in state["rows"] for key in entries):
+        read_meta()
+    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    with state["lock"]:
+        rows = dict(state["rows"])
+        for key, value in entries.items():
+            state["meta"][key] = (str(value), timestamp)
+    updates = [
+        {"range": f"B{rows[key]}:C{rows[key]}", "values": [[str(value), timestamp]]}
+        for key, value in entries.items() if key in rows
+    ]
+    new_rows = [[key, str(value), timestamp] for key, value in entries.items() if key not in rows]
+    if updates:
+        worksheet.batch_update(updates)
+    if new_rows:
+        worksheet.append_rows(new_rows)
+        with state["lock"]:
+            state["read_at"] = None  # learn the new rows' positions on the next write
+
+def write_meta(key, value):
+    write_meta_many({key: value})
+
+
+# === Revisions: tokens in App Meta bumped by every write, so unchanged sheets are never re-read ===
+# "rev:<sheet id>" changes on any write, "edit:<sheet id>" only on in-place edits
+# (appends can be picked up with a tail read; edits need a full one). Edits made
+# by hand in the Sheets UI don't bump anything, so readers still revalidate
+# after MAX_UNVERIFIED_SECONDS.
+REVISION_CHECK_SECONDS = 5
+MAX_UNVERIFIED_SECONDS = 300
+APPEND_OPS = {"append_row", "append_rows"}
+WRITE_OPS = APPEND_OPS | {
+    "update", "update_cell", "update_cells", "batch_update", "batch_clear", "clear",
+    "delete_rows", "delete_columns", "insert_row", "insert_rows", "resize"
+}
+
+def bump_revisions(sheet_ids, edited):
+    token = str(time.time_ns())
+    entries = {f"rev:{sheet_id}": token for sheet_id in sheet_ids}
+    if edited:
+        entries.update({f"edit:{sheet_id}": token for sheet_id in sheet_ids})
+    try:
+        write_meta_many(entries)
+    except Exception as e:
+        # Readers fall back to their periodic revalidation; the write itself succeeded.
+        print(f"Could not bump revision for sheets {sheet_ids}: {e}")
+
+def sheet_revision(sheet):
+    """[rev, edit] tokens for `sheet`, or None if no write has been recorded for it yet."""
+    try:
+        meta = read_meta(max_age=REVISION_CHECK_SECONDS)
+    except Exception as e:
+        print(f"Could not read sheet revisions: {e}")
+        return None
+    rev = meta.get(f"rev:{sheet.id}")
+    if rev is None:
+        return None
+    edit = meta.get(f"edit:{sheet.id}", ("", ""))[0]
+    return [rev[0], edit]
+
+def revision_unchanged(entry, revision):
+    """True when a cached read tagged with entry["revision"] can be served without asking Sheets."""
+    # None == None counts as unchanged: no write to that sheet has been recorded yet.
+    return (
+        entry.get("revision") == revision
+        and entry.get("checked_at") is not None
+        and time.monotonic() - entry["checked_at"] < MAX_UNVERIFIED_SECONDS
+    )
+
+@st.cache_resource
+def _get_read_cache():
+    return {"lock": threading.Lock(), "reads": {}}
+
+def cached_read(sheet, op="get_all_values"):
+    """`sheet.<op>()`, downloaded again only when the sheet's revision has changed."""
+    cache = _get_read_cache()
+    key = (sheet.id, op)
+    revision = sheet_revision(sheet)
+    with cache["lock"]:
+        entry = cache["reads"].get(key)
+        if entry is not None and revision_unchanged(entry, revision):
+            return _copy_rows(entry["result"])
+    result = getattr(sheet, op)()
+    with cache["lock"]:
+        cache["reads"][key] = {"result": result, "revision": revision, "checked_at": time.monotonic()}
+    return _copy_rows(result)
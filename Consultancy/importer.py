@@ -0,0 +1,255 @@
+import re
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from schema import OBSERVATION_COLUMNS, DATETIME_FORMAT
+from sites import get_site_registry
+
+try:
+    import openpyxl
+except ImportError:  # Excel uploads need openpyxl; CSV works without it
+    openpyxl = None
+
+# Bulk import of sampler/field-sheet exports into Observations. Files are read
+# PARSE_CHUNK_ROWS rows at a time, each chunk is validated with column-wise
+# checks (the pm_form submission rules, plus parseable dates and numbers, a
+# known company and no duplicates), and accepted rows are written
+# WRITE_CHUNK_ROWS at a time, so memory stays bounded by the chunk size.
+PARSE_CHUNK_ROWS = 2000
+WRITE_CHUNK_ROWS = 500
+MAX_REPORTED_REJECTS = 1000
+
+# Filled in by the importer, never taken from the file.
+AUTO_COLUMNS = ["Submitted By", "Submitted At"]
+IMPORT_COLUMNS = [column for column in OBSERVATION_COLUMNS if column not in AUTO_COLUMNS]
+KEY_COLUMNS = ["Entry Type", "Company", "Sampling Point", "Date Time"]
+NUMERIC_COLUMNS = [
+    "Longitude", "Latitude", "Temperature (°C)", "RH (%)", "Pressure (mbar)",
+    "Wind Speed", "Elapsed Time (min)", "Flow Rate (L/min)",
+]
+# Same required fields as pm_form.observation_problems.
+REQUIRED_COLUMNS = [
+    "Entry Type", "Company", "Date Time", "Monitoring Officer", "Driver",
+    "Weather", "Temperature (°C)", "RH (%)", "Wind Speed", "Wind Direction",
+]
+
+# Other spellings seen in logger and field-sheet exports, after _normalize_header.
+HEADER_ALIASES = {
+    "type": "Entry Type", "entry": "Entry Type", "start stop": "Entry Type",
+    "industry": "Sector", "site": "Company", "company name": "Company", "facility": "Company",
+    "town": "City", "point": "Sampling Point", "location": "Sampling Point",
+    "description": "Sampling Point Description", "lon": "Longitude", "lng": "Longitude", "long": "Longitude",
+    "lat": "Latitude", "officer": "Monitoring Officer", "officers": "Monitoring Officer",
+    "datetime": "Date Time", "date": "Date Time", "timestamp": "Date Time", "time": "Date Time",
+    "temp": "Temperature (°C)", "temperature": "Temperature (°C)", "rh": "RH (%)", "humidity": "RH (%)",
+    "pressure": "Pressure (mbar)", "wind": "Wind Speed", "direction": "Wind Direction",
+    "elapsed": "Elapsed Time (min)", "elapsed time": "Elapsed Time (min)", "flow": "Flow Rate (L/min)",
+    "flow rate": "Flow Rate (L/min)", "observations": "Observation", "remarks": "Observation", "notes": "Observation",
+}
+
+
+def _normalize_header(name):
+    name = re.sub(r"\(.*?\)", " ", str(name).lower())
+    return " ".join(re.sub(r"[^a-z0-9]+", " ", name).split())
+
+
+def guess_mapping(headers):
+    """{Observations column: file column} for the headers that match by name or alias."""
+    by_name = {_normalize_header(column): column for column in IMPORT_COLUMNS}
+    mapping = {}
+    for header in headers:
+        normalized = _normalize_header(header)
+        column = by_name.get(normalized) or HEADER_ALIASES.get(normalized)
+        if column and column not in mapping:
+            mapping[column] = header
+    return mapping
+
+
+def _file_kind(name):
+    return "excel" if name.lower().endswith((".xlsx", ".xlsm")) else "csv"
+
+
+def read_headers(file, name):
+    """Column names of an uploaded CSV or Excel file, without reading its rows."""
+    file.seek(0)
+    if _file_kind(name) == "csv":
+        return [str(column) for column in pd.read_csv(file, nrows=0, dtype=str).columns]
+    if openpyxl is None:
+        raise RuntimeError("Reading Excel files needs openpyxl (pip install openpyxl).")
+    workbook = openpyxl.load_workbook(file, read_only=True, data_only=True)
+    try:
+        first = next(workbook.active.iter_rows(max_row=1, values_only=True), ())
+        return ["" if value is None else str(value) for value in first]
+    finally:
+        workbook.close()
+
+
+def iter_chunks(file, name, chunk_rows=PARSE_CHUNK_ROWS):
+    """Yield (first data row number, DataFrame of strings) for each chunk of the file."""
+    file.seek(0)
+    first_row = 2  # row 1 is the header
+    if _file_kind(name) == "csv":
+        for chunk in pd.read_csv(file, dtype=str, keep_default_na=False, chunksize=chunk_rows):
+            yield first_row, chunk
+            first_row += len(chunk)
+        return
+    if openpyxl is None:
+        raise RuntimeError("Reading Excel files needs openpyxl (pip install openpyxl).")
+    workbook = openpyxl.load_workbook(file, read_only=True, data_only=True)
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        headers = ["" if value is None else str(value) for value in next(rows, ())]
+        width = len(headers)
+        buffer = []
+        for row in rows:
+            row = ["" if value is None else value for value in row[:width]]
+            buffer.append(row + [""] * (width - len(row)))
+            if len(buffer) == chunk_rows:
+                yield first_row, pd.DataFrame(buffer, columns=headers).astype(str)
+                first_row += len(buffer)
+                buffer = []
+        if buffer:
+            yield first_row, pd.DataFrame(buffer, columns=headers).astype(str)
+    finally:
+        workbook.close()
+
+
+# Exports spell PM₂.₅ and PM₁₀ with plain digits, sometimes with a space.
+_SUBSCRIPTS = str.maketrans("₀₁₂₃₄₅₆₇₈₉", "0123456789")
+
+
+def _option_key(value):
+    return "".join(str(value).translate(_SUBSCRIPTS).lower().split())
+
+
+def _canonical(series, allowed):
+    """Match against `allowed` ignoring case, spaces and subscript digits; unmatched values become NaN."""
+    lookup = {_option_key(option): option for option in allowed if option != "-- Select --"}
+    return series.map(_option_key).map(lookup)
+
+
+def key_strings(df):
+    """'type|company|point|time' per row, as used to detect duplicate observations."""
+    parts = []
+    for column in KEY_COLUMNS:
+        values = df[column]
+        if pd.api.types.is_datetime64_any_dtype(values):
+            values = values.dt.strftime(DATETIME_FORMAT)
+        parts.append(values.astype(object).where(values.notna(), "").astype(str).str.strip())
+    return parts[0].str.cat(parts[1:], sep="|")
+
+
+def validate_chunk(chunk, first_row, mapping, sheet_keys, file_keys, username):
+    """Map a parsed chunk onto the Observations columns and check it.
+
+    Returns (accepted rows as cell lists, rejects frame). `sheet_keys` are the
+    keys already in Observations; `file_keys` those accepted from earlier
+    chunks, and is updated in place.
+    """
+    from components.pm_form import weather_conditions, wind_directions, pollutants
+
+    n = len(chunk)
+    out = pd.DataFrame(index=chunk.index)
+    for column in IMPORT_COLUMNS:
+        source = mapping.get(column)
+        out[column] = chunk[source].astype(str).str.strip() if source in chunk.columns else ""
+    out = out.replace({"nan": "", "None": "", "NaT": ""})
+    reasons = pd.Series("", index=out.index)
+
+    def reject(mask, reason):
+        nonlocal reasons
+        reasons = reasons.where(~mask | (reasons != ""), reason)
+
+    out["Entry Type"] = out["Entry Type"].str.upper()
+    for column in REQUIRED_COLUMNS:
+        reject(out[column] == "", f"Missing {column}")
+    reject(~out["Entry Type"].isin(["START", "STOP", ""]), "Entry Type must be START or STOP")
+
+    # Company must be a registered site; sector, region and city come from it when blank.
+    sites = get_site_registry()
+    site = out["Company"].map({company: sites.site(company) for company in out["Company"].unique()})
+    reject((out["Company"] != "") & site.isna(), "Unknown company")
+    for column, field in (("Sector", "sector"), ("Region", "region"), ("City", "city")):
+        known = site.map(lambda s: getattr(s, field, ""), na_action="ignore").fillna("")
+        out[column] = out[column].where(out[column] != "", known)
+
+    when = pd.to_datetime(out["Date Time"], errors="coerce", format=DATETIME_FORMAT)
+    # Exports from other tools use other layouts; parse just those the slow way.
+    # Field sheets write dates day first (01/10/2026 is 1 October); only a date
+    # that starts with the year (2026-10-01, 2026/10/01) is read year-month-day.
+    leftover = when.isna() & (out["Date Time"] != "")
+    if leftover.any():
+        year_first = out["Date Time"].str.match(r"\d{4}\D")
+        for mask, dayfirst in ((leftover & year_first, False), (leftover & ~year_first, True)):
+            if mask.any():
+                when[mask] = pd.to_datetime(out["Date Time"][mask], errors="coerce", format="mixed", dayfirst=dayfirst)
+    reject((out["Date Time"] != "") & when.isna(), "Unreadable Date Time")
+    out["Date Time"] = when.dt.strftime(DATETIME_FORMAT).fillna(out["Date Time"])
+
+    for column in NUMERIC_COLUMNS:
+        numbers = pd.to_numeric(out[column], errors="coerce")
+        reject((out[column] != "") & numbers.isna(), f"{column} is not a number")
+        out[column] = numbers.astype(object).where(numbers.notna(), "")
+
+    for column, allowed in (("Weather", weather_conditions), ("Wind Direction", wind_directions), ("Pollutant", pollutants)):
+        canonical = _canonical(out[column], allowed)
+        reject((out[column] != "") & canonical.isna(), f"Unknown {column}")
+        out[column] = canonical.fillna(out[column])
+
+    keys = key_strings(out)
+    # Set lookups per row: Series.isin would copy the whole (growing) key set every chunk.
+    reject(pd.Series([key in sheet_keys for key in keys], index=keys.index), "Already in Observations")
+    reject(pd.Series([key in file_keys for key in keys], index=keys.index) | keys.duplicated(), "Duplicate row in file")
+    ok = (reasons == "").to_numpy()
+    file_keys.update(keys[ok])
+
+    out["Submitted By"] = username
+    out["Submitted At"] = datetime.now().strftime(DATETIME_FORMAT)
+    accepted = out.loc[ok, OBSERVATION_COLUMNS].values.tolist()
+    rejects = pd.DataFrame({
+        "Row": np.arange(first_row, first_row + n)[~ok],
+        "Reason": reasons[~ok].to_numpy(),
+        "Entry Type": out.loc[~ok, "Entry Type"].to_numpy(),
+        "Company": out.loc[~ok, "Company"].to_numpy(),
+        "Date Time": out.loc[~ok, "Date Time"].to_numpy(),
+    })
+    return accepted, rejects
+
+
+def import_observations(file, name, mapping, username, write=None, existing=None, on_progress=None):
+    """Stream `file` into Observations.
+
+    `write(rows)` is called with at most WRITE_CHUNK_ROWS accepted rows at a
+    time (None: validate only). `existing` is a frame of the current sheet for
+    duplicate checks. Returns a summary dict with the first
+    MAX_REPORTED_REJECTS rejects.
+    """
+    sheet_keys = set(key_strings(existing)) if existing is not None and not existing.empty else set()
+    file_keys = set()
+    summary = {"read": 0, "imported": 0, "rejected": 0, "rejects": []}
+    pending = []
+    for first_row, chunk in iter_chunks(file, name):
+        accepted, rejects = validate_chunk(chunk, first_row, mapping, sheet_keys, file_keys, username)
+        summary["read"] += len(chunk)
+        summary["rejected"] += len(rejects)
+        room = MAX_REPORTED_REJECTS - sum(len(r) for r in summary["rejects"])
+        if room > 0 and not rejects.empty:
+            summary["rejects"].append(rejects.head(room))
+        pending += accepted
+        while len(pending) >= WRITE_CHUNK_ROWS:
+            batch, pending = pending[:WRITE_CHUNK_ROWS], pending[WRITE_CHUNK_ROWS:]
+            if write:
+                write(batch)
+            summary["imported"] += len(batch)
+        if on_progress:
+            on_progress(summary)
+    if pending:
+        if write:
+            write(pending)
+        summary["imported"] += len(pending)
+    summary["rejects"] = pd.concat(summary["rejects"], ignore_index=True) if summary["rejects"] else pd.DataFrame(
+        columns=["Row", "Reason", "Entry Type", "Company", "Date Time"]
+    )
+    return summary
@@ -1,25 +1,136 @@
-import streamlit as st
+import time
+import queue
 import smtplib
+import threading
+from collections import namedtuple
+
+import streamlit as st
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 
-EMAIL_SENDER = st.secrets["EMAIL_SENDER"]
-EMAIL_PASSWORD = st.secrets["EMAIL_PASSWORD"]
+# Outgoing mail is queued and sent by one background worker that keeps a
+# single authenticated SMTP connection open across a burst of messages.
+# Point SMTP_HOST / SMTP_PORT / SMTP_SSL in secrets.toml at a local stand-in
+# (e.g. `python -m aiosmtpd -n -l localhost:8025` with SMTP_SSL = false) to test.
+DEFAULT_SMTP_HOST = "smtp.gmail.com"
+DEFAULT_SMTP_PORT = 465
+MAX_ATTEMPTS = 3
+RETRY_BASE_SECONDS = 2
+IDLE_DISCONNECT_SECONDS = 30
 
-def send_email(recipient, subject, body):
+Email = namedtuple("Email", ["recipient", "subject", "body"])
+
+_queue = queue.Queue()
+_stats_lock = threading.Lock()
+_stats = {"sent": 0, "failed": 0, "last_error": None}
+
+
+def _smtp_settings():
+    return {
+        "host": st.secrets.get("SMTP_HOST", DEFAULT_SMTP_HOST),
+        "port": int(st.secrets.get("SMTP_PORT", DEFAULT_SMTP_PORT)),
+        "ssl": bool(st.secrets.get("SMTP_SSL", True)),
+        "sender": st.secrets["EMAIL_SENDER"],
+        "password": st.secrets.get("EMAIL_PASSWORD", ""),
+    }
+
+
+def _connect(settings):
+    smtp_class = smtplib.SMTP_SSL if settings["ssl"] else smtplib.SMTP
+    server = smtp_class(settings["host"], settings["port"], timeout=30)
+    server.ehlo()
+    # Local stand-ins usually don't offer AUTH; real servers always do.
+    if server.has_extn("auth") and settings["password"]:
+        server.login(settings["sender"], settings["password"])
+    return server
+
+
+def _close(server):
+    if server is None:
+        return
     try:
-        msg = MIMEMultipart()
-        msg["From"] = EMAIL_SENDER
-        msg["To"] = recipient
-        msg["Subject"] = subject
+        server.quit()
+    except Exception:
+        server.close()
+
 
-        msg.attach(MIMEText(body, "plain"))
+def _build_message(sender, email):
+    msg = MIMEMultipart()
+    msg["From"] = sender
+    msg["To"] = email.recipient
+    msg["Subject"] = email.subject
+    msg.attach(MIMEText(email.body, "plain"))
+    return msg.as_string()
 
-        with smtplib.SMTP_SSL("smtp.gmail.com", 465) as server:
-            server.login(EMAIL_SENDER, EMAIL_PASSWORD)
-            server.sendmail(EMAIL_SENDER, recipient, msg.as_string())
 
-        return True
-    except Exception as e:
-        print(f"Email failed: {e}")
+def _is_transient(error):
+    if isinstance(error, smtplib.SMTPResponseException):
+        return 400 <= error.smtp_code < 500
+    if isinstance(error, smtplib.SMTPRecipientsRefused):
         return False
+    return isinstance(error, (smtplib.SMTPServerDisconnected, smtplib.SMTPConnectError, OSError))
+
+
+def _deliver(server, settings, email):
+    """Send one message, reconnecting and retrying transient failures. Returns the live connection."""
+    for attempt in range(1, MAX_ATTEMPTS + 1):
+        try:
+            if server is None:
+                server = _connect(settings)
+            server.sendmail(settings["sender"], email.recipient, _build_message(settings["sender"], email))
+            with _stats_lock:
+                _stats["sent"] += 1
+            return server
+        except Exception as e:
+            # Drop the connection; the next attempt (or message) opens a fresh one.
+            _close(server)
+            server = None
+            if not _is_transient(e) or attempt == MAX_ATTEMPTS:
+                print(f"Email to {email.recipient} failed: {e}")
+                with _stats_lock:
+                    _stats["failed"] += 1
+                    _stats["last_error"] = str(e)
+                return None
+            time.sleep(RETRY_BASE_SECONDS ** attempt)
+    return server
+
+
+def _send_forever(settings):
+    server = None
+    while True:
+        try:
+            email = _queue.get(timeout=IDLE_DISCONNECT_SECONDS if server else None)
+        except queue.Empty:
+            _close(server)
+            server = None
+            continue
+        try:
+            server = _deliver(server, settings, email)
+        finally:
+            _queue.task_done()
+
+
+@st.cache_resource
+def start_mail_worker():
+    thread = threading.Thread(target=_send_forever, args=(_smtp_settings(),), name="mail-sender", daemon=True)
+    thread.start()
+    return thread
+
+
+def send_email(recipient, subject, body):
+    """Queue a message for the background sender; returns immediately."""
+    start_mail_worker()
+    _queue.put(Email(recipient, subject, body))
+    return True
+
+
+def mail_queue_stats():
+    with _stats_lock:
+        return {"queued": _queue.unfinished_tasks, **_stats}
+
+
+def show_mail_queue_status():
+    stats = mail_queue_stats()
+    st.caption(f"✉️ Email: {stats['queued']} queued, {stats['sent']} sent, {stats['failed']} failed")
+    if stats["last_error"]:
+        st.caption(f"Last email error: {stats['last_error']}")
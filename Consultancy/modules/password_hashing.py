@@ -0,0 +1,53 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import bcrypt
+import streamlit as st
+
+# bcrypt runs in a small bounded worker pool so a burst of registrations or
+# password resets can't pin every core. bcrypt releases the GIL while hashing,
+# so threads hash in parallel and other sessions' scripts keep running.
+# Tune with BCRYPT_ROUNDS, PASSWORD_HASH_WORKERS and MAX_CONCURRENT_HASHES in
+# secrets.toml; size them with `python -m benchmarks.bench_hashing`.
+DEFAULT_BCRYPT_ROUNDS = 12
+DEFAULT_HASH_WORKERS = 2
+HASH_WAIT_SECONDS = 30
+
+
+class HashingBusyError(RuntimeError):
+    """Too many hashes already waiting; the caller should ask the user to retry."""
+
+
+def bcrypt_hash(password, rounds):
+    # Produces the same $2b$ hashes streamlit_authenticator verifies.
+    return bcrypt.hashpw(password.encode(), bcrypt.gensalt(rounds)).decode()
+
+
+def _setting(name, default):
+    try:
+        return int(st.secrets.get(name, default))
+    except Exception:
+        return default
+
+
+@st.cache_resource
+def _get_hash_pool():
+    workers = max(1, min(_setting("PASSWORD_HASH_WORKERS", DEFAULT_HASH_WORKERS), os.cpu_count() or 1))
+    # Threads, not processes: Streamlit swaps the page script in as __main__, which
+    # spawned workers would re-execute, and forking a multi-threaded server is unsafe.
+    pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="password-hash")
+    slots = threading.BoundedSemaphore(_setting("MAX_CONCURRENT_HASHES", workers * 4))
+    return {"pool": pool, "slots": slots}
+
+
+def hash_password(password, rounds=None):
+    """bcrypt-hash `password` in the worker pool; raises HashingBusyError when the pool is saturated."""
+    state = _get_hash_pool()
+    if not state["slots"].acquire(timeout=HASH_WAIT_SECONDS):
+        raise HashingBusyError("Too many password operations in progress. Please try again shortly.")
+    try:
+        rounds = rounds or _setting("BCRYPT_ROUNDS", DEFAULT_BCRYPT_ROUNDS)
+        return state["pool"].submit(bcrypt_hash, password, rounds).result()
+    finally:
+        state["slots"].release()
@@ -1,22 +1,29 @@
 
-import streamlit_authenticator as stauth
+from gspread.utils import rowcol_to_a1
+from .user_utils import get_user_directory, invalidate_user_directory, locate_user
+from .password_hashing import hash_password, HashingBusyError
 
 def reset_password(email, new_password, sheet):
-    data = sheet.get_all_values()
-    for i, row in enumerate(data):
-        if i == 0: continue
-        if row[2] == email:
-            if row[4].lower() == "admin":
-                return False, "❌ Admin users cannot reset password via this form."
-            hashed_pw = stauth.Hasher([new_password]).generate()[0]
-            data[i][3] = hashed_pw
-            sheet.update(f"A{i+1}:E{i+1}", [data[i]])
-            return True, "✅ Password reset successfully."
-    return False, "❌ Email not found."
+    user = get_user_directory(sheet)["by_email"].get(email)
+    if user is None:
+        return False, "❌ Email not found."
+    if user["Role"].lower() == "admin":
+        return False, "❌ Admin users cannot reset password via this form."
+    try:
+        hashed_pw = hash_password(new_password)
+    except HashingBusyError as e:
+        return False, f"⏳ {e}"
+    # Hashing takes a while; confirm the row still belongs to this user right before writing.
+    user = locate_user(sheet, "Email", email)
+    if user is None or user["Role"].lower() == "admin":
+        return False, "❌ Email not found."
+    cell = rowcol_to_a1(user["_row"], get_user_directory(sheet)["header"].index("Password") + 1)
+    sheet.update(range_name=cell, values=[[hashed_pw]])
+    invalidate_user_directory()
+    return True, "✅ Password reset successfully."
 
 def recover_username(email, sheet):
-    users = sheet.get_all_records()
-    for user in users:
-        if user["Email"] == email:
-            return True, f"✅ Your username is: {user['Username']} (Role: {user['Role']})"
+    user = get_user_directory(sheet)["by_email"].get(email)
+    if user:
+        return True, f"✅ Your username is: {user['Username']} (Role: {user['Role']})"
     return False, "❌ Email not found."
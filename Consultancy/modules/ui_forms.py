@@ -1,7 +1,8 @@
 
 import streamlit as st
 from contextlib import contextmanager
-from .user_utils import register_user_request,spreadsheet
+from .user_utils import register_user_request
+from gsheets import get_spreadsheet
 from .recovery import reset_password, recover_username
 from constants import REG_REQUESTS_SHEET, LOG_SHEET
 
@@ -26,7 +27,7 @@ def show_registration_form(sheet):
                 st.error("❌ All fields must be filled in.")
             else:
                 # Register user and move the data to the registration request sheet
-                success, message = register_user_request(username, name, email, password, role,spreadsheet)
+                success, message = register_user_request(username, name, email, password, role, get_spreadsheet())
                 if success:
                     st.success(message)
                 else:
@@ -1,30 +1,17 @@
+import time
+import threading
 import streamlit as st
 import gspread
 import json
-from oauth2client.service_account import ServiceAccountCredentials
 from datetime import datetime
-import streamlit_authenticator as stauth
 
 from gspread.exceptions import APIError
 from gspread.exceptions import WorksheetNotFound 
 
 from constants import USERS_SHEET, REG_REQUESTS_SHEET, LOG_SHEET
-
-
-
-# Load credentials from Streamlit secrets
-creds_dict = st.secrets["GOOGLE_CREDENTIALS"]
-
-scope = [
-    "https://spreadsheets.google.com/feeds",
-    "https://www.googleapis.com/auth/spreadsheets",
-    "https://www.googleapis.com/auth/drive.file",
-    "https://www.googleapis.com/auth/drive"
-]
-creds = ServiceAccountCredentials.from_json_keyfile_dict(creds_dict, scope)
-client = gspread.authorize(creds)
-SPREADSHEET_ID = "1F1nGYKzmeuMTtkRkazFFUOk7w7V9JXYdE7R5ZNJ6wyk" 
-spreadsheet = client.open_by_key(SPREADSHEET_ID)
+from gsheets import get_spreadsheet, cached_read, sheet_revision, revision_unchanged
+from replica import query_frame, request_sync
+from .password_hashing import hash_password, HashingBusyError
 
 
 def ensure_users_sheet(spreadsheet):
@@ -36,6 +23,11 @@ def ensure_users_sheet(spreadsheet):
         return sheet
 
 
+@st.cache_resource
+def get_users_sheet():
+    return ensure_users_sheet(get_spreadsheet())
+
+
 def ensure_reg_requests_sheet(spreadsheet):
     try:
         return spreadsheet.worksheet(REG_REQUESTS_SHEET)
@@ -56,30 +48,91 @@ def ensure_log_sheet(spreadsheet):
 
 
 
-@st.cache_data(ttl=60)
+# Re-downloaded only when the sheet's revision in App Meta changes.
 def get_users_sheet_data(sheet):
-    return sheet.get_all_records()
+    return cached_read(sheet, "get_all_records")
 
-@st.cache_data(ttl=60)
 def get_reg_requests_data(sheet):
-    return sheet.get_all_records()
+    return cached_read(sheet, "get_all_records")
 
-@st.cache_data(ttl=60)
 def get_reg_requests_values(sheet):
-    return sheet.get_all_values()
-
-
-
-def hash_password(password):
-    return stauth.Hasher([password]).generate()[0]
-
-
-
+    return cached_read(sheet, "get_all_values")
+
+
+
+# === User directory: one cached, indexed copy of the Users sheet ===
+@st.cache_resource
+def _get_user_directory_state():
+    return {"lock": threading.Lock(), "directory": None, "sheet_id": None, "revision": None, "checked_at": None}
+
+
+def _build_user_directory(values):
+    header = values[0] if values else []
+    records = []
+    for row_number, row in enumerate(values[1:], start=2):
+        record = dict(zip(header, row + [""] * (len(header) - len(row))))
+        record["_row"] = row_number
+        records.append(record)
+    return {
+        "header": header,
+        "records": records,
+        "by_username": {r["Username"]: r for r in records if r.get("Username")},
+        "by_email": {r["Email"]: r for r in records if r.get("Email")},
+    }
+
+
+def get_user_directory(sheet):
+    """Users indexed by username and email; re-read from Sheets only when the Users sheet changed."""
+    state = _get_user_directory_state()
+    revision = sheet_revision(sheet)
+    with state["lock"]:
+        if state["directory"] is None or state["sheet_id"] != sheet.id or not revision_unchanged(state, revision):
+            try:
+                values = sheet.get_all_values()
+            except APIError:
+                # Sheets down or rate-limited: serve the local replica if there is one.
+                local_copy = query_frame(USERS_SHEET)
+                if local_copy is None:
+                    raise
+                values = [local_copy.columns.tolist()] + local_copy.values.tolist()
+            state["directory"] = _build_user_directory(values)
+            state["sheet_id"] = sheet.id
+            state["revision"] = revision
+            state["checked_at"] = time.monotonic()
+        return state["directory"]
+
+
+def invalidate_user_directory():
+    state = _get_user_directory_state()
+    with state["lock"]:
+        state["directory"] = None
+    request_sync(USERS_SHEET)
+
+
+def locate_user(sheet, column, value):
+    """The directory record whose `column` matches `value`, checked against its row in the sheet.
+
+    Rows move when another admin deletes or approves a user, so the cached
+    `_row` is confirmed before anything is written there; a stale directory
+    is re-read once. Returns None when there is no such user.
+    """
+    wanted = str(value).strip().lower()
+    for _ in range(2):
+        directory = get_user_directory(sheet)
+        user = next((r for r in directory["records"] if str(r.get(column, "")).strip().lower() == wanted), None)
+        if user is None:
+            return None
+        cells = sheet.row_values(user["_row"])
+        position = directory["header"].index(column)
+        if position < len(cells) and cells[position].strip().lower() == wanted:
+            return user
+        invalidate_user_directory()
+    return None
 
 
 def register_user_request(username, name, email, password, role, spreadsheet):
     sheet = ensure_reg_requests_sheet(spreadsheet)
-    requests = sheet.get_all_records()
+    requests = get_reg_requests_data(sheet)
 
     for user in requests:
         if user["Username"].lower() == username.lower():
@@ -88,7 +141,10 @@ def register_user_request(username, name, email, password, role, spreadsheet):
             return False, "Email already requested."
 
     # Hash the password before saving it to the sheet
-    password_hash = hash_password(password)
+    try:
+        password_hash = hash_password(password)
+    except HashingBusyError as e:
+        return False, f"⏳ {e}"
     
     # Print the password hash to the console for debugging
     print("Generated Password Hash:", password_hash)
@@ -96,25 +152,32 @@ def register_user_request(username, name, email, password, role, spreadsheet):
     # Append the registration request with hashed password
     timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
     sheet.append_row([timestamp, username, name, email, password_hash, role, "pending"])
+    request_sync(REG_REQUESTS_SHEET)
 
     return True, "✅ Registration request submitted."
 
 
 def register_user_to_sheet(username, name, email, password, role, sheet, is_hashed=False):
-    users = sheet.get_all_records()
-    for user in users:
-        if user["Username"] == username:
-            return False, "Username already exists."
-        if user["Email"] == email:
-            return False, "Email already registered."
+    directory = get_user_directory(sheet)
+    if username in directory["by_username"]:
+        return False, "Username already exists."
+    if email in directory["by_email"]:
+        return False, "Email already registered."
 
-    final_pw = password if is_hashed else stauth.Hasher([password]).generate()[0]
+    try:
+        final_pw = password if is_hashed else hash_password(password)
+    except HashingBusyError as e:
+        return False, f"⏳ {e}"
     sheet.append_row([username, name, email, final_pw, role])
+    invalidate_user_directory()
     return True, "User approved and added."
 
-def delete_registration_request(username, spreadsheet):
+def delete_registration_requests(usernames, spreadsheet):
+    """Remove the request rows for `usernames` in one batch request. Returns the usernames deleted."""
     sheet = ensure_reg_requests_sheet(spreadsheet)
     data = sheet.get_all_values()
+    if not data:
+        return []
 
     # Find the index of the "Username" column in the header row (first row)
     header = data[0]
@@ -122,45 +185,101 @@ def delete_registration_request(username, spreadsheet):
         username_col_index = header.index("Username")
     except ValueError:
         print("Error: 'Username' column not found in header")
-        return False
+        return []
+
+    wanted = {username.strip().lower() for username in usernames}
+    rows, deleted = [], []
+    for i, row in enumerate(data[1:], start=1):  # 0-based grid index; the header is index 0
+        name = row[username_col_index] if len(row) > username_col_index else ""
+        if name.strip().lower() in wanted:
+            rows.append(i)
+            deleted.append(name)
+    if not rows:
+        print(f"Usernames {sorted(wanted)} not found for deletion.")
+        return []
+
+    # Merge adjacent rows into ranges and delete bottom-up so earlier deletions don't shift later ones.
+    ranges = []
+    for i in sorted(rows):
+        if ranges and ranges[-1][1] == i:
+            ranges[-1][1] = i + 1
+        else:
+            ranges.append([i, i + 1])
+    spreadsheet.batch_update({"requests": [
+        {"deleteDimension": {"range": {"sheetId": sheet.id, "dimension": "ROWS", "startIndex": start, "endIndex": end}}}
+        for start, end in reversed(ranges)
+    ]})
+    request_sync(REG_REQUESTS_SHEET)
+    return deleted
 
-    for i, row in enumerate(data[1:], start=2):  # start=2 for 1-based sheet rows skipping header
-        print(f"Checking row {i}: {row}")
-        # Check with case-insensitive comparison and strip whitespace
-        if row[username_col_index].strip().lower() == username.strip().lower():
-            print(f"Deleting row {i} for username '{username}'")
-            sheet.delete_rows(i)
-            return True
 
-    print(f"Username '{username}' not found for deletion.")
-    return False
+def delete_registration_request(username, spreadsheet):
+    return bool(delete_registration_requests([username], spreadsheet))
 
 
-def log_registration_event(username, action, admin_username, spreadsheet):
+def log_registration_events(usernames, action, admin_username, spreadsheet):
+    if not usernames:
+        return
     sheet = ensure_log_sheet(spreadsheet)
-    sheet.append_row([username, action, admin_username, datetime.now().strftime("%Y-%m-%d %H:%M:%S")])
+    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    sheet.append_rows([[username, action, admin_username, timestamp] for username in usernames])
+    request_sync(LOG_SHEET)
+
+
+def log_registration_event(username, action, admin_username, spreadsheet):
+    log_registration_events([username], action, admin_username, spreadsheet)
+
+
+def approve_users(requests, admin_username, spreadsheet):
+    """Approve registration requests in bulk: one append to Users, one batched delete, one log append.
+
+    Passwords in the requests sheet are already hashed, so nothing is hashed here.
+    Returns (approved_usernames, {username: reason}) for requests that were skipped.
+    """
+    users_sheet = get_users_sheet()
+    directory = get_user_directory(users_sheet)
+    taken_usernames = set(directory["by_username"])
+    taken_emails = set(directory["by_email"])
+
+    rows, approved, skipped = [], [], {}
+    for request in requests:
+        username, email = request["Username"], request["Email"]
+        if username in taken_usernames:
+            skipped[username] = "Username already exists."
+            continue
+        if email in taken_emails:
+            skipped[username] = "Email already registered."
+            continue
+        taken_usernames.add(username)
+        taken_emails.add(email)
+        rows.append([username, request["Full Name"], email, request["Password"], request["Role"]])
+        approved.append(username)
+
+    if rows:
+        users_sheet.append_rows(rows)
+        invalidate_user_directory()
+        delete_registration_requests(approved, spreadsheet)
+        log_registration_events(approved, "approved", admin_username, spreadsheet)
+    return approved, skipped
+
+
+def disapprove_users(requests, admin_username, spreadsheet):
+    """Drop registration requests in bulk. Returns the usernames removed."""
+    removed = delete_registration_requests([request["Username"] for request in requests], spreadsheet)
+    log_registration_events(removed, "disapproved", admin_username, spreadsheet)
+    return removed
+
 
 def approve_user(user_data, admin_username, spreadsheet):
-    users_sheet = ensure_users_sheet(spreadsheet)
-    success, message = register_user_to_sheet(
-        username=user_data["Username"],
-        name=user_data["Full Name"],
-        email=user_data["Email"],
-        password=user_data["Password"],
-        role=user_data["Role"],  # <-- admin-assigned role
-        sheet=users_sheet,
-        is_hashed=True
-    )
-
-    if success:
-        delete_registration_request(user_data["Username"], spreadsheet)
-        log_registration_event(user_data["Username"], "approved", admin_username, spreadsheet)
-    return message
+    approved, skipped = approve_users([user_data], admin_username, spreadsheet)
+    if approved:
+        return "User approved and added."
+    return skipped[user_data["Username"]]
 
 
 def load_users_from_sheet(sheet):
     try:
-        users = sheet.get_all_records()
+        users = get_user_directory(sheet)["records"]
     except APIError as e:
         st.error("❌ Failed to load users from sheet.")
         st.write("Error details:", e)
@@ -176,9 +295,6 @@ def load_users_from_sheet(sheet):
 
 
 def get_user_role(username, sheet):
-    users = sheet.get_all_records()
-    for user in users:
-        if user["Username"] == username:
-            return user["Role"]
-    return "collector"
+    user = get_user_directory(sheet)["by_username"].get(username)
+    return user["Role"] if user else "collector"
 
@@ -0,0 +1,328 @@
+import os
+import json
+import time
+import sqlite3
+import threading
+from datetime import datetime
+
+import pandas as pd
+import streamlit as st
+
+from constants import LOCAL_STATE_DIR, OUTBOX_DB_PATH, MAIN_SHEET
+from partitions import open_partition, write_target
+from replica import request_sync
+
+FLUSH_INTERVAL_SECONDS = 5
+FLUSH_BATCH_SIZE = 200
+# A failing batch is retried with exponential backoff; after MAX_ATTEMPTS it is
+# moved to the outbox_dead table (shown in the Admin Panel) so it stops
+# holding up the rows queued behind it for the same worksheet.
+MAX_ATTEMPTS = 8
+RETRY_BASE_SECONDS = 5
+RETRY_MAX_SECONDS = 600
+
+_flush_lock = threading.Lock()
+_wake = threading.Event()
+
+
+def _connect():
+    os.makedirs(LOCAL_STATE_DIR, exist_ok=True)
+    conn = sqlite3.connect(OUTBOX_DB_PATH, timeout=30)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS outbox (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            sheet_name TEXT NOT NULL,
+            value_input_option TEXT NOT NULL,
+            row_json TEXT NOT NULL,
+            created_at TEXT NOT NULL,
+            attempts INTEGER NOT NULL DEFAULT 0,
+            last_error TEXT
+        )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_outbox_sheet ON outbox (sheet_name, id)")
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(outbox)")}
+    if "next_attempt_at" not in columns:
+        conn.execute("ALTER TABLE outbox ADD COLUMN next_attempt_at REAL NOT NULL DEFAULT 0")
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS outbox_dead (
+            id INTEGER PRIMARY KEY,
+            sheet_name TEXT NOT NULL,
+            value_input_option TEXT NOT NULL,
+            row_json TEXT NOT NULL,
+            created_at TEXT NOT NULL,
+            attempts INTEGER NOT NULL,
+            last_error TEXT,
+            failed_at TEXT NOT NULL
+        )
+    """)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS outbox_held (
+            id TEXT PRIMARY KEY,
+            owner TEXT NOT NULL,
+            entry_json TEXT NOT NULL,
+            held_at TEXT NOT NULL
+        )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_outbox_held_owner ON outbox_held (owner)")
+    return conn
+
+
+def enqueue_row(sheet_name, row, value_input_option="RAW"):
+    """Durably record a row for `sheet_name`; it is appended to Sheets by the background flusher."""
+    enqueue_rows(sheet_name, [row], value_input_option)
+
+
+def enqueue_rows(sheet_name, rows, value_input_option="RAW"):
+    """enqueue_row for several rows in one transaction; the flusher sends them in one append_rows."""
+    start_outbox_flusher()
+    created_at = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    conn = _connect()
+    try:
+        with conn:
+            conn.executemany(
+                "INSERT INTO outbox (sheet_name, value_input_option, row_json, created_at) VALUES (?, ?, ?, ?)",
+                [(sheet_name, value_input_option, json.dumps(row, default=str), created_at) for row in rows]
+            )
+    finally:
+        conn.close()
+    _wake.set()
+
+
+def flush_outbox(batch_size=FLUSH_BATCH_SIZE):
+    """Send at most one batch per worksheet with append_rows. Returns the number of rows written."""
+    written = 0
+    with _flush_lock:
+        conn = _connect()
+        try:
+            groups = conn.execute(
+                "SELECT DISTINCT sheet_name, value_input_option FROM outbox"
+            ).fetchall()
+            for sheet_name, value_input_option in groups:
+                batch = conn.execute(
+                    "SELECT id, row_json, attempts, next_attempt_at FROM outbox "
+                    "WHERE sheet_name = ? AND value_input_option = ? ORDER BY id LIMIT ?",
+                    (sheet_name, value_input_option, batch_size)
+                ).fetchall()
+                # Rows keep their order: while the head batch backs off, the rows behind it wait too.
+                # A batch that has failed is retried on its own, so rows queued since aren't
+                # moved aside with it.
+                batch = [row for row in batch if row[2] == batch[0][2]]
+                if batch[0][3] > time.time():
+                    continue
+                ids = [row[0] for row in batch]
+                placeholders = ",".join("?" * len(ids))
+                try:
+                    # The partition is picked when the rows are sent, so a batch queued before a
+                    # month boundary can't land behind rows already sent to the new month.
+                    worksheet = open_partition(write_target(sheet_name))
+                    worksheet.append_rows(
+                        [json.loads(row[1]) for row in batch],
+                        value_input_option=value_input_option
+                    )
+                except Exception as e:
+                    print(f"Outbox flush to '{sheet_name}' failed: {e}")
+                    _record_failure(conn, ids, batch[0][2] + 1, str(e))
+                    continue
+                with conn:
+                    conn.execute(f"DELETE FROM outbox WHERE id IN ({placeholders})", ids)
+                request_sync(sheet_name)
+                if sheet_name == MAIN_SHEET:
+                    # The merge asked for at submit time may have run before a delayed row landed.
+                    from resource import request_merge
+                    request_merge()
+                written += len(ids)
+        finally:
+            conn.close()
+    return written
+
+
+def _record_failure(conn, ids, attempts, error):
+    """Back the batch off, or move it to outbox_dead once it has failed MAX_ATTEMPTS times."""
+    placeholders = ",".join("?" * len(ids))
+    with conn:
+        conn.execute(
+            f"UPDATE outbox SET attempts = ?, last_error = ?, next_attempt_at = ? WHERE id IN ({placeholders})",
+            [attempts, error, time.time() + min(RETRY_MAX_SECONDS, RETRY_BASE_SECONDS * 2 ** (attempts - 1))] + ids
+        )
+        if attempts >= MAX_ATTEMPTS:
+            conn.execute(
+                "INSERT INTO outbox_dead (id, sheet_name, value_input_option, row_json, created_at, attempts, last_error, failed_at) "
+                f"SELECT id, sheet_name, value_input_option, row_json, created_at, attempts, last_error, ? FROM outbox WHERE id IN ({placeholders})",
+                [datetime.now().strftime("%Y-%m-%d %H:%M:%S")] + ids
+            )
+            conn.execute(f"DELETE FROM outbox WHERE id IN ({placeholders})", ids)
+            print(f"Outbox moved {len(ids)} row(s) aside after {attempts} failed attempts: {error}")
+
+
+def dead_letters():
+    """Rows that failed MAX_ATTEMPTS times, per worksheet."""
+    conn = _connect()
+    try:
+        rows = conn.execute(
+            "SELECT sheet_name, COUNT(*), MIN(created_at), MAX(failed_at), MAX(last_error) "
+            "FROM outbox_dead GROUP BY sheet_name ORDER BY sheet_name"
+        ).fetchall()
+    finally:
+        conn.close()
+    return pd.DataFrame(rows, columns=["Worksheet", "Rows", "Oldest", "Failed At", "Last Error"])
+
+
+def requeue_dead_letters():
+    """Put every moved-aside row back in the outbox (behind anything queued since) for a fresh set of attempts."""
+    conn = _connect()
+    try:
+        with conn:
+            moved = conn.execute(
+                "INSERT INTO outbox (sheet_name, value_input_option, row_json, created_at) "
+                "SELECT sheet_name, value_input_option, row_json, created_at FROM outbox_dead ORDER BY id"
+            ).rowcount
+            conn.execute("DELETE FROM outbox_dead")
+    finally:
+        conn.close()
+    _wake.set()
+    return moved
+
+
+def discard_dead_letters():
+    conn = _connect()
+    try:
+        with conn:
+            return conn.execute("DELETE FROM outbox_dead").rowcount
+    finally:
+        conn.close()
+
+
+# Held entries: complete rows a user chose to keep back (field_queue) and send
+# later in one go. They live here rather than in the browser session so they
+# survive a closed tab, a restart or a second device logged in as the same user.
+def hold_entry(owner, entry):
+    """Keep `entry` (a dict with "id", "sheet", "row" and "value_input_option") for `owner` until released."""
+    conn = _connect()
+    try:
+        with conn:
+            conn.execute(
+                "INSERT INTO outbox_held (id, owner, entry_json, held_at) VALUES (?, ?, ?, ?)",
+                (entry["id"], owner, json.dumps(entry, default=str), datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
+            )
+    finally:
+        conn.close()
+
+
+def held_entries(owner):
+    """`owner`'s held entries, oldest first."""
+    conn = _connect()
+    try:
+        rows = conn.execute("SELECT entry_json FROM outbox_held WHERE owner = ? ORDER BY rowid", (owner,)).fetchall()
+    finally:
+        conn.close()
+    return [json.loads(row[0]) for row in rows]
+
+
+def held_count(owner):
+    conn = _connect()
+    try:
+        return conn.execute("SELECT COUNT(*) FROM outbox_held WHERE owner = ?", (owner,)).fetchone()[0]
+    finally:
+        conn.close()
+
+
+def set_held_problems(owner, problems):
+    """Record {entry id: problem or None} on `owner`'s held entries."""
+    conn = _connect()
+    try:
+        with conn:
+            for entry_id, entry_json in conn.execute(
+                "SELECT id, entry_json FROM outbox_held WHERE owner = ?", (owner,)
+            ).fetchall():
+                if entry_id in problems:
+                    entry = {**json.loads(entry_json), "problem": problems[entry_id]}
+                    conn.execute("UPDATE outbox_held SET entry_json = ? WHERE id = ?", (json.dumps(entry, default=str), entry_id))
+    finally:
+        conn.close()
+
+
+def release_held(owner, entry_ids):
+    """Move the given held entries into the outbox in one transaction. Returns the entries moved.
+
+    Entries another session released or discarded in the meantime are skipped,
+    so two tabs syncing at once can't send the same entry twice.
+    """
+    if not entry_ids:
+        return []
+    start_outbox_flusher()
+    created_at = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    conn = _connect()
+    try:
+        with conn:
+            placeholders = ",".join("?" * len(entry_ids))
+            rows = conn.execute(
+                f"SELECT id, entry_json FROM outbox_held WHERE owner = ? AND id IN ({placeholders}) ORDER BY rowid",
+                [owner] + list(entry_ids)
+            ).fetchall()
+            entries = [json.loads(row[1]) for row in rows]
+            conn.executemany(
+                "INSERT INTO outbox (sheet_name, value_input_option, row_json, created_at) VALUES (?, ?, ?, ?)",
+                [(entry["sheet"], entry["value_input_option"], json.dumps(entry["row"], default=str), created_at) for entry in entries]
+            )
+            conn.executemany("DELETE FROM outbox_held WHERE id = ?", [(row[0],) for row in rows])
+    finally:
+        conn.close()
+    _wake.set()
+    return entries
+
+
+def discard_held(owner, entry_ids):
+    conn = _connect()
+    try:
+        with conn:
+            return conn.executemany(
+                "DELETE FROM outbox_held WHERE owner = ? AND id = ?", [(owner, entry_id) for entry_id in entry_ids]
+            ).rowcount
+    finally:
+        conn.close()
+
+
+def pending_counts():
+    conn = _connect()
+    try:
+        rows = conn.execute(
+            "SELECT sheet_name, COUNT(*), MIN(created_at), MAX(attempts), MAX(last_error) "
+            "FROM outbox GROUP BY sheet_name ORDER BY sheet_name"
+        ).fetchall()
+    finally:
+        conn.close()
+    return pd.DataFrame(rows, columns=["Worksheet", "Pending Rows", "Oldest", "Attempts", "Last Error"])
+
+
+def _flush_forever():
+    while True:
+        try:
+            written = flush_outbox()
+        except Exception as e:
+            print(f"Outbox flusher error: {e}")
+            written = 0
+        # Keep draining while batches are full; otherwise sleep until woken or the interval passes.
+        if written < FLUSH_BATCH_SIZE:
+            _wake.wait(FLUSH_INTERVAL_SECONDS)
+            _wake.clear()
+
+
+@st.cache_resource
+def start_outbox_flusher():
+    thread = threading.Thread(target=_flush_forever, name="outbox-flusher", daemon=True)
+    thread.start()
+    return thread
+
+
+def show_outbox_status():
+    counts = pending_counts()
+    total = int(counts["Pending Rows"].sum()) if not counts.empty else 0
+    if total == 0:
+        st.caption("📤 All submissions synced to Google Sheets.")
+        return
+    st.caption(f"📤 {total} submission(s) waiting to sync")
+    with st.expander("Outbox details"):
+        st.dataframe(counts, use_container_width=True, hide_index=True)
+        if st.button("🔁 Sync now", key="outbox_sync_now"):
+            flushed = flush_outbox()
+            st.success(f"Synced {flushed} row(s).")
@@ -0,0 +1,147 @@
+import re
+import time
+import random
+import threading
+from datetime import datetime
+
+import streamlit as st
+from gspread.exceptions import APIError, WorksheetNotFound
+
+from constants import MAIN_SHEET, NOISE_SHEET_NAME, GASES_SHEET_NAME, STACK_SHEET_NAME, VOC_SHEET_NAME
+from gsheets import get_spreadsheet, read_meta, write_meta, REVISION_CHECK_SECONDS, MAX_UNVERIFIED_SECONDS
+
+# Time-partitioned tables. With SHEET_PARTITIONS = "month" (or "year") in
+# secrets.toml, rows written to the tables below go to one worksheet per
+# period, e.g. "Observations 2026-10", chosen by the time the row is written.
+# Partitions are therefore append-only in time order: the table read as
+# base worksheet + partitions oldest first is the same sequence of rows an
+# unpartitioned sheet would hold, and only the newest partition changes.
+# A row's own timestamps (sampled, submitted) never come after the write, so
+# a read of rows from `since` onwards only needs the partitions that end
+# after `since`, plus the unpartitioned base worksheet, if any.
+PARTITIONED_SHEETS = [MAIN_SHEET, NOISE_SHEET_NAME, GASES_SHEET_NAME, STACK_SHEET_NAME, VOC_SHEET_NAME]
+PARTITION_FORMATS = {"month": "%Y-%m", "year": "%Y"}
+# Bumped in App Meta whenever a partition is created, so other processes
+# re-list the worksheets on their next revision check.
+PARTITIONS_META_KEY = "partitions"
+
+_PARTITION_TITLE = re.compile(r"^(?P<table>.+) (?P<year>\d{4})(?:-(?P<month>\d{2}))?$")
+
+
+def partition_scheme():
+    """"month", "year" or None (writes go to the table's own worksheet)."""
+    try:
+        scheme = str(st.secrets.get("SHEET_PARTITIONS", "")).lower()
+    except Exception:
+        return None
+    return scheme if scheme in PARTITION_FORMATS else None
+
+
+def parse_partition(title):
+    """(table, start, end) for a partition title such as "Noise 2026-10", else None."""
+    match = _PARTITION_TITLE.match(title)
+    if not match or match["table"] not in PARTITIONED_SHEETS:
+        return None
+    year = int(match["year"])
+    if match["month"] is None:
+        return match["table"], datetime(year, 1, 1), datetime(year + 1, 1, 1)
+    month = int(match["month"])
+    if not 1 <= month <= 12:
+        return None
+    end = datetime(year + 1, 1, 1) if month == 12 else datetime(year, month + 1, 1)
+    return match["table"], datetime(year, month, 1), end
+
+
+def table_name(title):
+    """The logical table a worksheet belongs to: "Observations 2026-10" -> "Observations"."""
+    parsed = parse_partition(title)
+    return parsed[0] if parsed else title
+
+
+def write_target(sheet_name, when=None):
+    """Title of the worksheet that rows for `sheet_name` written at `when` (default now) go to."""
+    scheme = partition_scheme()
+    if scheme is None or sheet_name not in PARTITIONED_SHEETS:
+        return sheet_name
+    return f"{sheet_name} {(when or datetime.now()).strftime(PARTITION_FORMATS[scheme])}"
+
+
+@st.cache_resource
+def _get_partition_state():
+    return {"lock": threading.Lock(), "worksheets": None, "signature": None, "listed_at": 0.0}
+
+
+def _worksheets():
+    """{title: worksheet} for the whole spreadsheet, re-listed when a partition is created."""
+    state = _get_partition_state()
+    signature = read_meta(max_age=REVISION_CHECK_SECONDS).get(PARTITIONS_META_KEY, ("", ""))[0]
+    with state["lock"]:
+        fresh = time.monotonic() - state["listed_at"] < MAX_UNVERIFIED_SECONDS
+        if state["worksheets"] is not None and state["signature"] == signature and fresh:
+            return state["worksheets"]
+        state["worksheets"] = {worksheet.title: worksheet for worksheet in get_spreadsheet().worksheets()}
+        state["signature"] = signature
+        state["listed_at"] = time.monotonic()
+        return state["worksheets"]
+
+
+def table_worksheets(sheet_name, since=None):
+    """The worksheets holding `sheet_name`'s rows, in row order.
+
+    The unpartitioned worksheet comes first, then partitions oldest first.
+    With `since`, partitions that ended before it are left out.
+    """
+    base, partitions = None, []
+    for title, worksheet in _worksheets().items():
+        if title == sheet_name:
+            base = worksheet
+            continue
+        parsed = parse_partition(title)
+        if parsed and parsed[0] == sheet_name and (since is None or parsed[2] > since):
+            partitions.append((parsed[1], worksheet))
+    partitions.sort(key=lambda item: item[0])
+    return ([base] if base is not None else []) + [worksheet for _, worksheet in partitions]
+
+
+def _header_for(sheet_name):
+    from schema import TABLE_COLUMNS
+    return TABLE_COLUMNS.get(sheet_name, [])
+
+
+def open_partition(title, rows="1000", cols="30"):
+    """The worksheet `title`, created with its table's header row (schema.TABLE_COLUMNS) if it doesn't exist yet."""
+    worksheet = _worksheets().get(title)
+    if worksheet is not None:
+        return worksheet
+    spreadsheet = get_spreadsheet()
+    try:
+        return spreadsheet.worksheet(title)
+    except WorksheetNotFound:
+        pass
+    header = _header_for(table_name(title))
+    # One request adds the worksheet and writes its header row, so no other
+    # process can see it (or append to it) before the header is in place.
+    sheet_id = random.randrange(1, 2 ** 31)
+    requests = [{"addSheet": {"properties": {
+        "sheetId": sheet_id, "title": title, "gridProperties": {"rowCount": int(rows), "columnCount": max(int(cols), len(header))},
+    }}}]
+    if header:
+        requests.append({"updateCells": {
+            "start": {"sheetId": sheet_id, "rowIndex": 0, "columnIndex": 0},
+            "rows": [{"values": [{"userEnteredValue": {"stringValue": str(column)}} for column in header]}],
+            "fields": "userEnteredValue",
+        }})
+    try:
+        spreadsheet.batch_update({"requests": requests})
+    except APIError:
+        # Another process created it first.
+        return spreadsheet.worksheet(title)
+    worksheet = spreadsheet.worksheet(title)
+    token = str(time.time_ns())
+    write_meta(PARTITIONS_META_KEY, token)
+    state = _get_partition_state()
+    with state["lock"]:
+        if state["worksheets"] is not None:
+            state["worksheets"][title] = worksheet
+            state["signature"] = token
+    return worksheet
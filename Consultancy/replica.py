@@ -0,0 +1,236 @@
+import os
+import time
+import sqlite3
+import threading
+from datetime import datetime
+
+import pandas as pd
+import streamlit as st
+
+from constants import (
+    LOCAL_STATE_DIR,
+    REPLICA_DB_PATH,
+    NOISE_SHEET_NAME,
+    GASES_SHEET_NAME,
+    STACK_SHEET_NAME,
+    VOC_SHEET_NAME,
+    REG_REQUESTS_SHEET,
+    USERS_SHEET,
+    LOG_SHEET,
+    MAIN_SHEET,
+    MERGED_SHEET,
+    CALC_SHEET
+)
+from gsheets import sheet_revision, revision_unchanged
+from partitions import table_name, table_worksheets
+from schema import split_header
+
+# Optional local SQLite mirror of the worksheets below. Enable with
+# USE_LOCAL_REPLICA = true in secrets.toml; every reader falls back to
+# Google Sheets when the replica is off, missing a table, or awaiting a sync.
+REPLICATED_SHEETS = [
+    MAIN_SHEET, MERGED_SHEET, CALC_SHEET,
+    NOISE_SHEET_NAME, GASES_SHEET_NAME, STACK_SHEET_NAME, VOC_SHEET_NAME,
+    USERS_SHEET, REG_REQUESTS_SHEET, LOG_SHEET
+]
+INDEXED_COLUMNS = [
+    "Company", "Sector", "Entry Type", "Date Time", "Submitted At",
+    "Date Time_Start", "Username", "Email"
+]
+SYNC_INTERVAL_SECONDS = 60
+
+_dirty = set()
+# Revision tokens of each table as last copied, so unchanged sheets aren't downloaded again.
+_synced = {}
+_dirty_lock = threading.Lock()
+_wake = threading.Event()
+
+
+def replica_enabled():
+    try:
+        return bool(st.secrets.get("USE_LOCAL_REPLICA", False))
+    except Exception:
+        return False
+
+
+def _connect():
+    os.makedirs(LOCAL_STATE_DIR, exist_ok=True)
+    conn = sqlite3.connect(REPLICA_DB_PATH, timeout=30)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS _sync (
+            sheet_name TEXT PRIMARY KEY,
+            synced_at TEXT NOT NULL,
+            row_count INTEGER NOT NULL
+        )
+    """)
+    return conn
+
+
+def quote_identifier(name):
+    return '"' + name.replace('"', '""') + '"'
+
+
+def _column_names(header):
+    seen = {}
+    columns = []
+    for name in header:
+        name = name.strip() or "Unnamed"
+        if name in seen:
+            seen[name] += 1
+            name = f"{name}.{seen[name]}"
+        else:
+            seen[name] = 0
+        columns.append(name)
+    return columns
+
+
+def sync_worksheet(sheet_name):
+    """Copy one worksheet into its replica table, swapping the table atomically.
+
+    A partitioned table is copied from all of its partitions into one table.
+    """
+    worksheets = table_worksheets(sheet_name)
+    revision = _table_revision(worksheets)
+    header, rows = [], []
+    for worksheet in worksheets:
+        part_header, part_rows = split_header(worksheet.title, worksheet.get_all_values())
+        header = header or _column_names(part_header)
+        rows += part_rows
+    rows = [row + [""] * (len(header) - len(row)) for row in rows]
+
+    table = quote_identifier(sheet_name)
+    conn = _connect()
+    try:
+        with conn:
+            conn.execute(f"DROP TABLE IF EXISTS {table}")
+            if header:
+                conn.execute(f"CREATE TABLE {table} ({', '.join(quote_identifier(c) + ' TEXT' for c in header)})")
+                conn.executemany(
+                    f"INSERT INTO {table} VALUES ({', '.join('?' * len(header))})",
+                    [row[:len(header)] for row in rows]
+                )
+                for column in INDEXED_COLUMNS:
+                    if column in header:
+                        index = quote_identifier(f"idx_{sheet_name}_{column}")
+                        conn.execute(f"CREATE INDEX {index} ON {table} ({quote_identifier(column)})")
+            conn.execute(
+                "INSERT OR REPLACE INTO _sync (sheet_name, synced_at, row_count) VALUES (?, ?, ?)",
+                (sheet_name, datetime.now().strftime("%Y-%m-%d %H:%M:%S"), len(rows))
+            )
+    finally:
+        conn.close()
+    with _dirty_lock:
+        _dirty.discard(sheet_name)
+    _synced[sheet_name] = {"revision": revision, "checked_at": time.monotonic()}
+    return len(rows)
+
+
+def _table_revision(worksheets):
+    return [[worksheet.id, sheet_revision(worksheet)] for worksheet in worksheets]
+
+
+def sync_all():
+    """Re-copy the tables written to since their last copy (and any not re-checked for a while)."""
+    for sheet_name in REPLICATED_SHEETS:
+        try:
+            synced = _synced.get(sheet_name)
+            if synced and revision_unchanged(synced, _table_revision(table_worksheets(sheet_name))):
+                continue
+            sync_worksheet(sheet_name)
+        except Exception as e:
+            # Keep serving the last good copy through outages and rate limits.
+            print(f"Replica sync of '{sheet_name}' failed: {e}")
+
+
+def request_sync(sheet_name):
+    """Mark a sheet (or a partition's table) as changed by a write; readers bypass it until it is re-synced."""
+    with _dirty_lock:
+        _dirty.add(table_name(sheet_name))
+    _wake.set()
+
+
+def _sync_forever():
+    while True:
+        with _dirty_lock:
+            pending = list(_dirty)
+        if pending:
+            for sheet_name in pending:
+                try:
+                    sync_worksheet(sheet_name)
+                except Exception as e:
+                    print(f"Replica sync of '{sheet_name}' failed: {e}")
+        else:
+            sync_all()
+        _wake.wait(SYNC_INTERVAL_SECONDS)
+        _wake.clear()
+
+
+@st.cache_resource
+def start_replica_sync():
+    thread = threading.Thread(target=_sync_forever, name="replica-sync", daemon=True)
+    thread.start()
+    return thread
+
+
+def is_available(sheet_name):
+    if not replica_enabled():
+        return False
+    start_replica_sync()
+    with _dirty_lock:
+        if sheet_name in _dirty:
+            return False
+    conn = _connect()
+    try:
+        return conn.execute("SELECT 1 FROM _sync WHERE sheet_name = ?", (sheet_name,)).fetchone() is not None
+    finally:
+        conn.close()
+
+
+def query_frame(sheet_name, where=None, params=(), columns=None, order_by=None, limit=None, offset=None, distinct=False):
+    """Read rows from the replica, or None if it cannot answer and the caller should use Sheets."""
+    if not is_available(sheet_name):
+        return None
+    select = ", ".join(quote_identifier(c) for c in columns) if columns else "*"
+    sql = f"SELECT {'DISTINCT ' if distinct else ''}{select} FROM {quote_identifier(sheet_name)}"
+    if where:
+        sql += f" WHERE {where}"
+    if order_by:
+        sql += f" ORDER BY {order_by}"
+    if limit:
+        sql += f" LIMIT {int(limit)}"
+        if offset:
+            sql += f" OFFSET {int(offset)}"
+    conn = _connect()
+    try:
+        return pd.read_sql_query(sql, conn, params=params)
+    except sqlite3.OperationalError as e:
+        print(f"Replica query on '{sheet_name}' failed: {e}")
+        return None
+    finally:
+        conn.close()
+
+
+def query_row(sheet_name, expression, where=None, params=()):
+    """Single-row aggregate such as MIN/MAX, or None when the replica cannot answer."""
+    if not is_available(sheet_name):
+        return None
+    sql = f"SELECT {expression} FROM {quote_identifier(sheet_name)}"
+    if where:
+        sql += f" WHERE {where}"
+    conn = _connect()
+    try:
+        return conn.execute(sql, params).fetchone()
+    except sqlite3.OperationalError as e:
+        print(f"Replica query on '{sheet_name}' failed: {e}")
+        return None
+    finally:
+        conn.close()
+
+
+def last_synced(sheet_name):
+    conn = _connect()
+    try:
+        row = conn.execute("SELECT synced_at FROM _sync WHERE sheet_name = ?", (sheet_name,)).fetchone()
+    finally:
+        conn.close()
+    return row[0] if row else None
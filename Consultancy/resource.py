@@ -1,48 +1,26 @@
+import time
+import threading
 import streamlit as st
+import numpy as np
 import pandas as pd
-import gspread
-from datetime import datetime
-from oauth2client.service_account import ServiceAccountCredentials
+from datetime import datetime, timedelta
 from gspread.exceptions import APIError, WorksheetNotFound
-
-from constants import SPREADSHEET_ID, MAIN_SHEET, MERGED_SHEET, CALC_SHEET
-
-# === Google Sheets Setup ===
-creds_dict = st.secrets["GOOGLE_CREDENTIALS"]
-
-scope = [
-    "https://spreadsheets.google.com/feeds",
-    "https://www.googleapis.com/auth/spreadsheets",
-    "https://www.googleapis.com/auth/drive.file",
-    "https://www.googleapis.com/auth/drive"
-]
-creds = ServiceAccountCredentials.from_json_keyfile_dict(creds_dict, scope)
-client = gspread.authorize(creds)
-
-spreadsheet = client.open_by_key(SPREADSHEET_ID)
-
-# === Fix: Ensure Observations sheet has correct headers ===
-def ensure_main_sheet_initialized(spreadsheet, sheet_name):
-    headers = [
-        "Entry Type", "Sector", "Company", "Region", "City", "Sampling Point",
-        "Sampling Point Description", "Longitude", "Latitude", "Pollutant", "Monitoring Officer", "Driver",
-        "Date Time", "Temperature (°C)", "RH (%)", "Pressure (mbar)",
-        "Weather", "Wind Speed", "Wind Direction", "Elapsed Time (min)", "Flow Rate (L/min)", "Observation", "Submitted By",
-        "Submitted At"
-    ]
-    try:
-        sheet = spreadsheet.worksheet(sheet_name)
-    except WorksheetNotFound:
-        sheet = spreadsheet.add_worksheet(title=sheet_name, rows="100", cols="20")
-
-    existing_values = sheet.get_all_values()
-    if len(existing_values) == 0 or all(cell.strip() == '' for cell in existing_values[0]):
-        sheet.clear()
-        sheet.append_row(headers)
-
-    return sheet
-
-sheet = ensure_main_sheet_initialized(spreadsheet, MAIN_SHEET)
+from gspread.utils import rowcol_to_a1
+
+from constants import MAIN_SHEET, MERGED_SHEET, CALC_SHEET
+from gsheets import (
+    get_spreadsheet,
+    read_meta,
+    write_meta,
+    sheet_revision,
+    revision_unchanged,
+    REVISION_CHECK_SECONDS
+)
+from outbox import enqueue_row
+from partitions import table_worksheets
+from replica import query_frame, query_row, quote_identifier, request_sync
+from schema import apply_schema, concat_typed, split_header, to_sheet_values
+from snapshots import load_snapshot, save_snapshot, delete_snapshot
 
 # === Data Utilities ===
 def convert_timestamps_to_string(df):
@@ -50,29 +28,238 @@ def convert_timestamps_to_string(df):
         df[col] = df[col].dt.strftime('%Y-%m-%d %H:%M:%S')
     return df
 
-def load_data_from_sheet(sheet):
+@st.cache_resource
+def _get_tail_cache():
+    # Per-process cache of worksheet frames, keyed by worksheet id. "lock" only guards
+    # the dicts; each sheet's reads run under its own lock, so one slow read doesn't
+    # hold up loads of other sheets.
+    return {"lock": threading.Lock(), "sheets": {}, "sheet_locks": {}}
+
+def _sheet_lock(cache, sheet_id):
+    with cache["lock"]:
+        return cache["sheet_locks"].setdefault(sheet_id, threading.Lock())
+
+def _values_to_frame(headers, rows, sheet_name):
+    if not rows:
+        return pd.DataFrame(columns=headers)
+    return apply_schema(pd.DataFrame(rows, columns=headers), sheet_name)
+
+def _read_full(sheet):
+    all_values = sheet.get_all_values()
+    if not all_values:
+        return None
+    headers, rows = split_header(sheet.title, all_values)
+    return {
+        "title": sheet.title,
+        "headers": headers,
+        "row_count": len(all_values),
+        "last_row": all_values[-1],
+        "df": _values_to_frame(headers, rows, sheet.title),
+    }
+
+def _read_tail(sheet, entry):
+    """Fetch the last row already cached plus everything after it.
+
+    Returns the updated entry, or None when the overlap row no longer matches
+    (rows were edited or deleted) and a full reload is needed.
+    """
+    headers = entry["headers"]
+    width = len(headers)
+    last_col = rowcol_to_a1(1, width).rstrip("0123456789")
+    tail = sheet.get(f"A{entry['row_count']}:{last_col}")
+    tail = [list(row) + [""] * (width - len(row)) for row in tail]
+    if not tail or tail[0] != entry["last_row"]:
+        return None
+    new_rows = tail[1:]
+    if not new_rows:
+        return entry
+    new_df = _values_to_frame(headers, new_rows, sheet.title)
+    df = new_df if entry["df"].empty else concat_typed([entry["df"], new_df], sheet.title)
+    return {
+        "title": sheet.title,
+        "headers": headers,
+        "row_count": entry["row_count"] + len(new_rows),
+        "last_row": new_rows[-1],
+        "df": df,
+    }
+
+def cached_frames():
+    """{worksheet title: typed frame} for everything in this process's tail cache."""
+    cache = _get_tail_cache()
+    with cache["lock"]:
+        return {entry["title"]: entry["df"] for entry in cache["sheets"].values()}
+
+def invalidate_sheet_cache(sheet):
+    cache = _get_tail_cache()
+    # Waits for a read of this sheet in progress, so it can't put its stale entry back.
+    with _sheet_lock(cache, sheet.id):
+        with cache["lock"]:
+            cache["sheets"].pop(sheet.id, None)
+        delete_snapshot(sheet)
+
+def _current_entry(sheet, incremental=True):
+    """The up-to-date tail-cache entry for `sheet`, or None when it is empty. APIError propagates."""
+    cache = _get_tail_cache()
+    with _sheet_lock(cache, sheet.id):
+        revision = sheet_revision(sheet)
+        entry = None
+        if incremental:
+            with cache["lock"]:
+                entry = cache["sheets"].get(sheet.id)
+            entry = entry or load_snapshot(sheet)
+        if entry is not None and revision_unchanged(entry, revision):
+            return entry
+        if entry is not None:
+            edited = revision is not None and entry.get("revision") and entry["revision"][1] != revision[1]
+            # A tail read can't see rows edited in place, only rows appended.
+            entry = None if edited else _read_tail(sheet, entry)
+        if entry is None:
+            entry = _read_full(sheet)
+        if entry is None:
+            with cache["lock"]:
+                cache["sheets"].pop(sheet.id, None)
+            return None
+        entry = {**entry, "revision": revision, "checked_at": time.monotonic()}
+        with cache["lock"]:
+            cache["sheets"][sheet.id] = entry
+        save_snapshot(sheet, entry)
+        return entry
+
+def load_data_from_sheet(sheet, incremental=True):
+    """Load a worksheet as a DataFrame, only downloading rows appended since the last call.
+
+    The sheet's revision in App Meta is checked first: if nothing was written
+    since the cached copy was read, Sheets is not asked for data at all. A
+    cold process starts from the on-disk snapshot, if any, and revalidates it
+    the same way.
+    """
     try:
-        all_values = sheet.get_all_values()
-        if not all_values:
-            return pd.DataFrame()
-        headers = all_values[0]
-        rows = all_values[1:]
-        if not rows:
-            return pd.DataFrame(columns=headers)
-        df = pd.DataFrame(rows, columns=headers)
-        return convert_timestamps_to_string(df)
+        entry = _current_entry(sheet, incremental)
+        return entry["df"].copy() if entry is not None else pd.DataFrame()
     except APIError as e:
-        st.error(f"❌ APIError: {e.response.status_code} - {e.response.reason}")
-        st.text(f"Details: {e.response.text}")
+        return _replica_fallback(sheet.title, e)
+    except Exception as e:
+        st.error(f"❌ Unexpected error: {e}")
         return pd.DataFrame()
+
+def _replica_fallback(sheet_name, error):
+    local_copy = query_frame(sheet_name)
+    if local_copy is not None:
+        st.warning(f"⚠️ Google Sheets unavailable ({error.response.status_code}); showing the local replica of '{sheet_name}'.")
+        return apply_schema(local_copy, sheet_name)
+    st.error(f"❌ APIError: {error.response.status_code} - {error.response.reason}")
+    st.text(f"Details: {error.response.text}")
+    return pd.DataFrame()
+
+def load_table(sheet_name, since=None, shared=False, strict=False):
+    """Load a table that may be split into time partitions ("Observations 2026-10", ...) as one frame.
+
+    Each partition goes through the tail cache like load_data_from_sheet, so
+    only the partitions written since the last call are read again. With
+    `since`, partitions that ended before it are skipped; rows are not
+    filtered. `shared` returns the cached frame itself when the table is a
+    single worksheet (read it, never modify it). `strict` re-raises read
+    errors instead of showing the replica or an empty frame, for callers that
+    must not mistake a failed read for a table without those rows.
+    """
+    try:
+        entries = [_current_entry(sheet) for sheet in table_worksheets(sheet_name, since)]
+    except APIError as e:
+        if strict:
+            raise
+        # The replica holds the table as a whole, not per partition.
+        return _replica_fallback(sheet_name, e)
     except Exception as e:
+        if strict:
+            raise
         st.error(f"❌ Unexpected error: {e}")
         return pd.DataFrame()
+    frames = [entry["df"] for entry in entries if entry is not None and not entry["df"].empty]
+    if not frames:
+        return next((entry["df"].copy() for entry in entries if entry is not None), pd.DataFrame())
+    if len(frames) == 1:
+        return frames[0] if shared else frames[0].copy()
+    return concat_typed(frames, sheet_name)
+
+class RowIndex:
+    """Row positions of a frame grouped by one column and ordered by a datetime column.
+
+    select() turns a group value and a date range into row positions with
+    binary searches, so filters never scan or copy the frame; rows with no
+    timestamp are left out, as the date filters always did.
+    """
+
+    def __init__(self, df, group_column, time_column):
+        times = df[time_column].to_numpy(dtype="datetime64[ns]")
+        groups = df[group_column]
+        if not isinstance(groups.dtype, pd.CategoricalDtype):
+            groups = groups.fillna("").astype(str).astype("category")
+        codes = groups.cat.codes.to_numpy()
+        rows = np.flatnonzero(~np.isnat(times) & (codes >= 0))
+
+        self._empty = (np.array([], dtype=np.intp), np.array([], dtype="datetime64[ns]"))
+        by_time = rows[np.argsort(times[rows], kind="stable")]
+        self._all = (by_time, times[by_time])
+        by_group = by_time[np.argsort(codes[by_time], kind="stable")]
+        sorted_codes = codes[by_group]
+        self._groups = {}
+        for code, value in enumerate(groups.cat.categories):
+            start, stop = np.searchsorted(sorted_codes, [code, code + 1])
+            if stop > start and value != "":
+                rows = by_group[start:stop]
+                self._groups[value] = (rows, times[rows])
+
+    def groups(self):
+        return sorted(self._groups)
+
+    def _rows(self, group):
+        return self._all if group is None else self._groups.get(group, self._empty)
+
+    def time_bounds(self, group=None):
+        """(first, last) timestamp in `group` (or overall), or None when it has no rows."""
+        rows, times = self._rows(group)
+        if not len(rows):
+            return None
+        return pd.Timestamp(times[0]), pd.Timestamp(times[-1])
+
+    def select(self, group=None, date_range=None):
+        """Positions of the rows in `group` (None: all) whose time falls in the inclusive date range."""
+        rows, times = self._rows(group)
+        if date_range and len(date_range) == 2:
+            start, end = date_range
+            bounds = np.array([np.datetime64(start, "ns"), np.datetime64(end + timedelta(days=1), "ns")])
+            first, last = np.searchsorted(times, bounds)
+            rows = rows[first:last]
+        return rows
+
+def load_indexed_frame(sheet, group_column, time_column):
+    """The cached frame for `sheet` and a RowIndex over it, built once per sheet revision.
+
+    The frame is shared with the cache, not copied: take rows with
+    `df.iloc[positions]` and never modify it in place.
+    """
+    try:
+        entry = _current_entry(sheet)
+    except APIError:
+        entry = None
+    if entry is None:
+        df = load_data_from_sheet(sheet)  # reports the error / falls back to the replica
+        if df.empty or not {group_column, time_column}.issubset(df.columns):
+            return df, None
+        return df, RowIndex(df, group_column, time_column)
+    if not {group_column, time_column}.issubset(entry["df"].columns):
+        return entry["df"], None
+    key = ("row_index", group_column, time_column)
+    # Stored on the entry, which is replaced whenever the sheet changes.
+    if key not in entry:
+        entry[key] = RowIndex(entry["df"], group_column, time_column)
+    return entry["df"], entry[key]
 
 def add_data(row, username):
     row.append(username)
     row.append(datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
-    sheet.append_row(row)
+    enqueue_row(MAIN_SHEET, row)
+    request_merge()
 
 def make_unique_headers(headers):
     seen = {}
@@ -88,50 +275,66 @@ def make_unique_headers(headers):
             unique_headers.append(h)
     return unique_headers
 
-def merge_start_stop(df):
+MERGE_KEY_COLUMN = "Merge Key"
+MERGE_CHECKPOINT_KEY = "merge_checkpoint"
+
+def merge_start_stop(df, since_row=0):
+    """Pair START/STOP entries per (Sector, Company) in submission order.
+
+    With `since_row`, only pairs involving a row at or after that position are
+    returned. Pairing still counts over the whole history so the "Merge Key"
+    (Sector|Company|sequence) of a pair never changes.
+    """
     df.columns = df.columns.str.strip()
+    # Typed once here: keys become stripped categories, weather readings float32, meter readings float64, timestamps datetimes.
+    df = apply_schema(df, MAIN_SHEET)
     merge_keys = ["Sector", "Company"]
     start_df = df[df["Entry Type"] == "START"].copy()
     stop_df = df[df["Entry Type"] == "STOP"].copy()
 
-    for key in merge_keys:
-        start_df[key] = start_df[key].astype(str).str.strip()
-        stop_df[key] = stop_df[key].astype(str).str.strip()
-
-    
     if start_df.empty or stop_df.empty:
-        st.warning("⚠️ Either START or STOP entries are missing.")
         return pd.DataFrame()
 
-    start_df["seq"] = start_df.groupby(merge_keys).cumcount() + 1
-    stop_df["seq"] = stop_df.groupby(merge_keys).cumcount() + 1
-
-    
+    # Older rows spell some companies with a trailing space ("GIHOC "); sites.csv
+    # doesn't. Pair on the stripped names whatever the schema does with them.
+    for part in (start_df, stop_df):
+        for column in merge_keys:
+            part[column] = part[column].astype(str).str.strip().astype("category")
+
+    start_df["seq"] = start_df.groupby(merge_keys, observed=True).cumcount() + 1
+    stop_df["seq"] = stop_df.groupby(merge_keys, observed=True).cumcount() + 1
+
+    if since_row:
+        positions = pd.Series(range(len(df)), index=df.index)
+        new_pairs = pd.concat([
+            start_df.loc[positions[start_df.index] >= since_row, merge_keys + ["seq"]],
+            stop_df.loc[positions[stop_df.index] >= since_row, merge_keys + ["seq"]],
+        ])
+        new_index = pd.MultiIndex.from_frame(new_pairs)
+        start_df = start_df[pd.MultiIndex.from_frame(start_df[merge_keys + ["seq"]]).isin(new_index)]
+        stop_df = stop_df[pd.MultiIndex.from_frame(stop_df[merge_keys + ["seq"]]).isin(new_index)]
+        if start_df.empty or stop_df.empty:
+            return pd.DataFrame()
 
     start_df = start_df.rename(columns=lambda x: f"{x}_Start" if x not in merge_keys + ["seq"] else x)
     stop_df = stop_df.rename(columns=lambda x: f"{x}_Stop" if x not in merge_keys + ["seq"] else x)
 
     merged = pd.merge(start_df, stop_df, on=merge_keys + ["seq"], how="inner")
 
-    def to_numeric_safe(df, col_name):
-        if col_name in df.columns:
-            df[col_name] = pd.to_numeric(df[col_name], errors="coerce")
-        return df
-
-    to_numeric_safe(merged, "Elapsed Time (min)_Start")
-    to_numeric_safe(merged, "Elapsed Time (min)_Stop")
     if "Elapsed Time (min)_Start" in merged.columns and "Elapsed Time (min)_Stop" in merged.columns:
-        merged["Elapsed Time Diff (min)"] = (
+        # Rounded so readings like 12369.8 - 12345.6 come out as 1452.0, not 1451.9999999999345.
+        merged["Elapsed Time Diff (min)"] = ((
             merged["Elapsed Time (min)_Stop"] - merged["Elapsed Time (min)_Start"]
-        ) * 60
+        ) * 60).round(6)
 
-    to_numeric_safe(merged, "Flow Rate (L/min)_Start")
-    to_numeric_safe(merged, "Flow Rate (L/min)_Stop")
     if "Flow Rate (L/min)_Start" in merged.columns and "Flow Rate (L/min)_Stop" in merged.columns:
-        merged["Average Flow Rate (L/min)"] = (
+        merged["Average Flow Rate (L/min)"] = ((
             merged["Flow Rate (L/min)_Start"] + merged["Flow Rate (L/min)_Stop"]
-        ) / 2
+        ) / 2).round(6)
 
+    merged[MERGE_KEY_COLUMN] = (
+        merged["Sector"].astype(str) + "|" + merged["Company"].astype(str) + "|" + merged["seq"].astype(str)
+    )
     merged.drop(columns=["seq"], inplace=True)
 
     desired_order = [
@@ -147,67 +350,228 @@ def merge_start_stop(df):
         "Weather_Stop", "Wind Speed_Stop", "Wind Direction_Stop", "Elapsed Time (min)_Stop",
         "Flow Rate (L/min)_Stop", "Observation_Stop", "Submitted At_Stop",
 
-        "Elapsed Time Diff (min)", "Average Flow Rate (L/min)"
+        "Elapsed Time Diff (min)", "Average Flow Rate (L/min)", MERGE_KEY_COLUMN
     ]
     existing_cols = [col for col in desired_order if col in merged.columns]
 
-    st.write("🔁 Merged DataFrame shape:", merged.shape)
-    st.dataframe(merged[existing_cols].head(), use_container_width=True)
-
     return merged[existing_cols]
 
+def _sheet_values(df):
+    return to_sheet_values(df)
+
 def save_merged_data_to_sheet(df, spreadsheet, sheet_name):
-    df = convert_timestamps_to_string(df)
+    """Rewrite the merged sheet in place; readers never see it missing or empty."""
+    return rewrite_sheet(df, spreadsheet, sheet_name)
+
+def rewrite_sheet(df, spreadsheet, sheet_name, value_input_option="RAW"):
+    """Replace a worksheet's contents with `df` without ever deleting or clearing it first."""
+    values = [df.columns.tolist()] + _sheet_values(df)
     try:
-        existing_titles = [ws.title for ws in spreadsheet.worksheets()]
-        if sheet_name in existing_titles:
-            old_sheet = spreadsheet.worksheet(sheet_name)
-            spreadsheet.del_worksheet(old_sheet)
-        new_sheet = spreadsheet.add_worksheet(title=sheet_name, rows=str(len(df) + 10), cols=str(len(df.columns) + 5))
-        new_sheet.update([df.columns.tolist()] + df.values.tolist())
-    except Exception as e:
-        st.error(f"❌ Failed to save merged data: {e}")
-        st.stop()
+        worksheet = spreadsheet.worksheet(sheet_name)
+    except WorksheetNotFound:
+        worksheet = spreadsheet.add_worksheet(title=sheet_name, rows=str(len(values) + 10), cols=str(len(df.columns) + 5))
+    if worksheet.row_count < len(values) or worksheet.col_count < len(df.columns):
+        worksheet.resize(rows=max(worksheet.row_count, len(values) + 10), cols=max(worksheet.col_count, len(df.columns)))
+    worksheet.update(range_name="A1", values=values, value_input_option=value_input_option)
+    stale = []
+    if worksheet.row_count > len(values):
+        stale.append(f"{len(values) + 1}:{worksheet.row_count}")
+    if worksheet.col_count > len(df.columns):
+        first_stale_col = rowcol_to_a1(1, len(df.columns) + 1).rstrip("0123456789")
+        last_col = rowcol_to_a1(1, worksheet.col_count).rstrip("0123456789")
+        stale.append(f"{first_stale_col}1:{last_col}{len(values)}")
+    if stale:
+        worksheet.batch_clear(stale)
+    return worksheet
+
+def upsert_merged_rows(df, worksheet, header=None):
+    """Update rows whose Merge Key already exists and append the rest. Returns (updated, inserted)."""
+    return upsert_keyed_rows(df, worksheet, MERGE_KEY_COLUMN, header)
+
+def upsert_keyed_rows(df, worksheet, key_column, header=None, value_input_option="RAW"):
+    """Update rows whose `key_column` value already exists and append the rest. Returns (updated, inserted)."""
+    header = header or worksheet.row_values(1)
+    key_col = header.index(key_column) + 1
+    existing = {key: row for row, key in enumerate(worksheet.col_values(key_col), start=1) if row > 1}
+    last_col = rowcol_to_a1(1, len(df.columns)).rstrip("0123456789")
+
+    updates, inserts = [], []
+    for key, values in zip(df[key_column], _sheet_values(df)):
+        if key in existing:
+            row = existing[key]
+            updates.append({"range": f"A{row}:{last_col}{row}", "values": [values]})
+        else:
+            inserts.append(values)
+    if updates:
+        worksheet.batch_update(updates, value_input_option=value_input_option)
+    if inserts:
+        worksheet.append_rows(inserts, value_input_option=value_input_option)
+    return len(updates), len(inserts)
+
+def merge_incrementally(df, spreadsheet, sheet_name):
+    """Merge only observations added since the stored checkpoint and upsert them by Merge Key.
+
+    Falls back to a full rebuild when there is no checkpoint, Observations
+    shrank (rows deleted), or the merged sheet's header no longer matches.
+    Returns (merged_rows_written, updated, inserted).
+    """
+    checkpoint_value = read_meta().get(MERGE_CHECKPOINT_KEY, ("", ""))[0]
+    checkpoint = int(checkpoint_value) if checkpoint_value.isdigit() else None
+
+    try:
+        worksheet = spreadsheet.worksheet(sheet_name)
+        header = worksheet.row_values(1)
+    except WorksheetNotFound:
+        worksheet, header = None, []
+
+    full = checkpoint is None or checkpoint > len(df) or MERGE_KEY_COLUMN not in header
+    merged = merge_start_stop(df, since_row=0 if full else checkpoint)
+    if not full and not merged.empty and header != merged.columns.tolist():
+        full = True
+        merged = merge_start_stop(df)
+
+    if full:
+        if not merged.empty:
+            worksheet = save_merged_data_to_sheet(merged, spreadsheet, sheet_name)
+        updated, inserted = 0, len(merged)
+    elif merged.empty:
+        updated, inserted = 0, 0
+    else:
+        updated, inserted = upsert_merged_rows(merged, worksheet, header)
+    if worksheet is not None and (full or updated):
+        invalidate_sheet_cache(worksheet)
+    if full or updated or inserted:
+        request_sync(sheet_name)
 
-def filter_dataframe(df, site_filter=None, date_range=None):
+    if checkpoint != len(df):
+        write_meta(MERGE_CHECKPOINT_KEY, len(df))
+    return merged, updated, inserted
+
+def filter_dataframe(df, site_filter=None, date_range=None, date_column="Submitted At"):
     if df.empty:
         return df
-    if "Submitted At" in df.columns:
-        df["Submitted At"] = pd.to_datetime(df["Submitted At"], errors="coerce")
+    if date_column in df.columns and not pd.api.types.is_datetime64_any_dtype(df[date_column]):
+        df[date_column] = pd.to_datetime(df[date_column], errors="coerce")
     if site_filter and site_filter != "All":
         df = df[df["Company"] == site_filter]
     if date_range and len(date_range) == 2:
         start, end = date_range
-        df = df[(df["Submitted At"].dt.date >= start) & (df["Submitted At"].dt.date <= end)]
+        df = df[(df[date_column].dt.date >= start) & (df[date_column].dt.date <= end)]
     return df
 
-def display_and_merge_data(df, spreadsheet, merged_sheet_name):
-    st.subheader("📊 Debug Info")
-    st.write("📁 Raw DataFrame shape:", df.shape)
-    st.dataframe(df.head(), use_container_width=True)
-
-    if df.empty:
-        st.info("ℹ️ No data submitted yet.")
-        return
-
-    with st.expander("🔍 Filter Records"):
-        site_filter = st.selectbox("Filter by Company", ["All"] + sorted(df["Company"].dropna().unique()))
-        date_range = st.date_input("Filter by Date Range", [])
-
-    filtered_df = filter_dataframe(df, site_filter, date_range)
-    st.write("📁 Filtered DataFrame shape:", filtered_df.shape)
-    st.dataframe(filtered_df.head(), use_container_width=True)
-
-    start_df = filtered_df[filtered_df["Entry Type"] == "START"]
-    stop_df = filtered_df[filtered_df["Entry Type"] == "STOP"]
-    
-
-    merged_df = merge_start_stop(filtered_df)
-    st.write("📦 Merged DataFrame shape:", merged_df.shape)
-
-    if not merged_df.empty:
-        save_merged_data_to_sheet(merged_df, spreadsheet, merged_sheet_name)
-        st.success("✅ Merged records saved to Google Sheets.")
-        st.dataframe(merged_df, use_container_width=True)
+def _merged_filter_clause(site_filter=None, date_range=None, date_column="Date Time_Start"):
+    clauses, params = [], []
+    if site_filter and site_filter not in ("All", "All Companies"):
+        clauses.append(f"{quote_identifier('Company')} = ?")
+        params.append(site_filter)
+    if date_range and len(date_range) == 2:
+        start, end = date_range
+        # Timestamps are stored as 'YYYY-MM-DD HH:MM:SS', so string ranges stay index-friendly.
+        clauses.append(f"{quote_identifier(date_column)} >= ? AND {quote_identifier(date_column)} < ?")
+        params += [start.strftime("%Y-%m-%d"), (end + timedelta(days=1)).strftime("%Y-%m-%d")]
+    return " AND ".join(clauses) or None, params
+
+def query_merged_records(sheet_name, site_filter=None, date_range=None, date_column="Date Time_Start"):
+    """filter_dataframe for the local replica: the filters become an indexed WHERE clause."""
+    where, params = _merged_filter_clause(site_filter, date_range, date_column)
+    return query_frame(sheet_name, where=where, params=params)
+
+def count_merged_records(sheet_name, site_filter=None, date_range=None, date_column="Date Time_Start"):
+    """Number of replica rows query_merged_records would return, or None without a replica."""
+    where, params = _merged_filter_clause(site_filter, date_range, date_column)
+    row = query_row(sheet_name, "COUNT(*)", where=where, params=params)
+    return row[0] if row else None
+
+def query_merged_page(sheet_name, offset, limit, site_filter=None, date_range=None, date_column="Date Time_Start"):
+    """One page of query_merged_records, ordered by `date_column`."""
+    where, params = _merged_filter_clause(site_filter, date_range, date_column)
+    return query_frame(sheet_name, where=where, params=params, order_by=quote_identifier(date_column), limit=limit, offset=offset)
+
+# === Background merge job ===
+MERGE_DEBOUNCE_SECONDS = 10
+
+@st.cache_resource
+def _get_merge_state():
+    return {
+        "lock": threading.Lock(),
+        "run_lock": threading.Lock(),
+        "timer": None,
+        "signature": None,
+        "last_result": None,
+        "error": None,
+    }
+
+def _observations_signature(df):
+    # Cell strings, not typed values: a STOP row's blank coordinates are NaN, and NaN != NaN.
+    return len(df), tuple(to_sheet_values(df.iloc[-1:])[0]) if len(df) else ()
+
+def request_merge(delay=MERGE_DEBOUNCE_SECONDS):
+    """Schedule a background merge; requests made while one is pending collapse into it."""
+    state = _get_merge_state()
+    with state["lock"]:
+        if state["timer"] is not None:
+            return
+        timer = threading.Timer(delay, _run_merge_job)
+        timer.daemon = True
+        state["timer"] = timer
+    timer.start()
+
+def _run_merge_job():
+    state = _get_merge_state()
+    with state["lock"]:
+        state["timer"] = None
+    with state["run_lock"]:
+        try:
+            df = load_table(MAIN_SHEET, strict=True)
+            signature = _observations_signature(df)
+            if df.empty or signature == state["signature"]:
+                return
+            merged, updated, inserted = merge_incrementally(df, get_spreadsheet(), MERGED_SHEET)
+            state["signature"] = signature
+            state["last_result"] = {"updated": updated, "inserted": inserted}
+            state["error"] = None
+        except Exception as e:
+            print(f"Background merge failed: {e}")
+            state["error"] = str(e)
+
+def display_merged_data(spreadsheet, merged_sheet_name):
+    state = _get_merge_state()
+    built_at = read_meta(max_age=REVISION_CHECK_SECONDS).get(MERGE_CHECKPOINT_KEY, ("", ""))[1]
+    st.caption(f"🕒 Merged records last built: {built_at or 'never'}")
+    if state["timer"] is not None or state["run_lock"].locked():
+        st.caption("🔄 A merge is scheduled or running in the background.")
+    if state["error"]:
+        st.warning(f"⚠️ Last background merge failed: {state['error']}")
+    if st.button("🔄 Merge now"):
+        request_merge(delay=0)
+        st.info("ℹ️ Merge started in the background; refresh in a moment.")
+
+    companies = query_frame(merged_sheet_name, columns=["Company"], where=f"{quote_identifier('Company')} != ''", order_by="1", distinct=True)
+    if companies is not None:
+        # Replica available: filter with indexed SQL instead of loading the whole sheet.
+        if companies.empty:
+            st.info("ℹ️ No merged records yet.")
+            return
+        with st.expander("🔍 Filter Records"):
+            site_filter = st.selectbox("Filter by Company", ["All"] + companies["Company"].tolist())
+            date_range = st.date_input("Filter by Date Range", [])
+        filtered_df = query_merged_records(merged_sheet_name, site_filter, date_range)
+        if filtered_df is None:
+            filtered_df = pd.DataFrame()
     else:
-        st.warning("⚠️ No matching START and STOP records found to merge.")
+        try:
+            merged_df = load_data_from_sheet(spreadsheet.worksheet(merged_sheet_name))
+        except WorksheetNotFound:
+            merged_df = pd.DataFrame()
+
+        if merged_df.empty:
+            st.info("ℹ️ No merged records yet.")
+            return
+
+        with st.expander("🔍 Filter Records"):
+            site_filter = st.selectbox("Filter by Company", ["All"] + sorted(merged_df["Company"].dropna().unique()))
+            date_range = st.date_input("Filter by Date Range", [])
+
+        filtered_df = filter_dataframe(merged_df, site_filter, date_range, date_column="Date Time_Start")
+    st.write("📦 Merged DataFrame shape:", filtered_df.shape)
+    st.dataframe(filtered_df, use_container_width=True)
@@ -0,0 +1,196 @@
+import numpy as np
+import pandas as pd
+
+from constants import (
+    MAIN_SHEET,
+    MERGED_SHEET,
+    CALC_SHEET,
+    NOISE_SHEET_NAME,
+    GASES_SHEET_NAME,
+    STACK_SHEET_NAME,
+    VOC_SHEET_NAME
+)
+from partitions import table_name
+
+# Column dtypes for the frames built from the Observations, Merged Records and
+# PM Calculations worksheets. Sheets hands back strings; apply_schema turns
+# them into compact typed columns once, at load time, and to_sheet_values
+# turns them back into cells for writing.
+CATEGORY = "category"
+FLOAT32 = "float32"
+FLOAT64 = "float64"
+DATETIME = "datetime"
+
+DATETIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+OBSERVATION_COLUMNS = [
+    "Entry Type", "Sector", "Company", "Region", "City", "Sampling Point",
+    "Sampling Point Description", "Longitude", "Latitude", "Pollutant", "Monitoring Officer", "Driver",
+    "Date Time", "Temperature (°C)", "RH (%)", "Pressure (mbar)",
+    "Weather", "Wind Speed", "Wind Direction", "Elapsed Time (min)", "Flow Rate (L/min)", "Observation", "Submitted By",
+    "Submitted At"
+]
+
+OBSERVATION_DTYPES = {
+    "Entry Type": CATEGORY,
+    "Sector": CATEGORY,
+    "Company": CATEGORY,
+    "Region": CATEGORY,
+    "City": CATEGORY,
+    "Sampling Point": CATEGORY,
+    "Pollutant": CATEGORY,
+    "Driver": CATEGORY,
+    "Weather": CATEGORY,
+    "Wind Direction": CATEGORY,
+    "Submitted By": CATEGORY,
+    "Longitude": FLOAT32,
+    "Latitude": FLOAT32,
+    "Temperature (°C)": FLOAT32,
+    "RH (%)": FLOAT32,
+    "Pressure (mbar)": FLOAT32,
+    "Wind Speed": FLOAT32,
+    # Meter readings that are subtracted or averaged for the PM volume keep float64.
+    "Elapsed Time (min)": FLOAT64,
+    "Flow Rate (L/min)": FLOAT64,
+    "Date Time": DATETIME,
+    "Submitted At": DATETIME,
+}
+
+# Merged rows carry each observation column twice, suffixed _Start and _Stop,
+# except the pairing keys which appear once.
+MERGED_DTYPES = {
+    "Sector": CATEGORY,
+    "Company": CATEGORY,
+    **{f"{column}_{side}": dtype
+       for column, dtype in OBSERVATION_DTYPES.items() if column not in ("Sector", "Company")
+       for side in ("Start", "Stop")},
+    "Elapsed Time Diff (min)": FLOAT64,
+    "Average Flow Rate (L/min)": FLOAT64,
+}
+
+# Filter weights are differences of near-equal gram values, so they keep float64.
+CALC_DTYPES = {
+    **MERGED_DTYPES,
+    "Pre Weight (g)": FLOAT64,
+    "Post Weight (g)": FLOAT64,
+    "PM (µg/m³)": FLOAT64,
+    "PM Status": CATEGORY,
+}
+
+SCHEMAS = {
+    MAIN_SHEET: OBSERVATION_DTYPES,
+    MERGED_SHEET: MERGED_DTYPES,
+    CALC_SHEET: CALC_DTYPES,
+}
+
+# Row layout written by components/noise.py: these shared columns, then the
+# readings for the monitoring type.
+MONITORING_COLUMNS = [
+    "Timestamp", "Sector", "Company", "Region", "City", "Sampling Point", "Coordinate",
+    "Sampling Point Description", "Date Time", "Weather", "Temperature (°C)", "Wind Speed",
+    "Wind Direction", "RH (%)", "Monitoring Officer", "Driver", "Submitted By", "Submitted At",
+]
+
+# The header of every table that is written row by row. The monitoring
+# worksheets were started without a header row; split_header gives them these
+# columns, and new partitions are created with them.
+TABLE_COLUMNS = {
+    MAIN_SHEET: OBSERVATION_COLUMNS,
+    NOISE_SHEET_NAME: MONITORING_COLUMNS + ["Leq", "L10", "L50", "L90", "Lmax"],
+    GASES_SHEET_NAME: MONITORING_COLUMNS + ["NO₂", "SO₂"],
+    STACK_SHEET_NAME: MONITORING_COLUMNS + [
+        "Generator Set", "Installation", "Fuel", "T-room (°C)", "T-gas (°C)",
+        "CO2 (%)", "O2 (%)", "CO (mg/Nm³)", "SO2 (mg/Nm³)", "NO2 (mg/Nm³)",
+    ],
+    VOC_SHEET_NAME: MONITORING_COLUMNS + ["Total VOCs (mg/m³)", "Benzene (mg/m³)", "Toluene (mg/m³)", "Xylene (mg/m³)"],
+}
+
+
+def split_header(sheet_name, values):
+    """(header, data rows) of a worksheet's get_all_values().
+
+    For a table in TABLE_COLUMNS whose first row isn't a header (its first cell
+    isn't the first column name), every row is data and the registered
+    columns are the header.
+    """
+    columns = TABLE_COLUMNS.get(table_name(sheet_name))
+    if columns and values and values[0][:1] != columns[:1]:
+        width = len(columns)
+        return list(columns), [row[:width] + [""] * (width - len(row)) for row in values]
+    return (values[0], values[1:]) if values else ([], [])
+
+
+def _to_datetime(series):
+    parsed = pd.to_datetime(series, errors="coerce", format=DATETIME_FORMAT)
+    # Cells typed in by hand may use another layout; parse just those the slow way.
+    leftover = parsed.isna() & series.notna() & (series.astype(str).str.strip() != "")
+    if leftover.any():
+        parsed[leftover] = pd.to_datetime(series[leftover], errors="coerce", format="mixed")
+    return parsed
+
+
+def _convert(series, dtype):
+    if dtype == CATEGORY:
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            return series
+        return series.fillna("").astype(str).str.strip().astype("category")
+    if dtype == DATETIME:
+        if pd.api.types.is_datetime64_any_dtype(series):
+            return series
+        return _to_datetime(series)
+    if series.dtype == dtype:
+        return series
+    if series.dtype == np.float32:
+        # e.g. a snapshot saved as float32: widen through the short repr, not the float32 error.
+        series = series.astype(str)
+    return pd.to_numeric(series, errors="coerce").astype(dtype)
+
+
+def apply_schema(df, sheet_name):
+    """Return `df` with the registered dtypes for `sheet_name`; unknown columns are left alone.
+
+    Columns that already have the right dtype are not touched, so this is
+    cheap to call again on a frame that is already typed. Partitions such as
+    "Observations 2026-10" use their table's schema.
+    """
+    dtypes = SCHEMAS.get(table_name(sheet_name), {})
+    converted = {
+        column: _convert(df[column], dtype)
+        for column, dtype in dtypes.items() if column in df.columns
+    }
+    if not converted:
+        return df
+    return df.assign(**converted)
+
+
+def concat_typed(frames, sheet_name):
+    """pd.concat for typed frames; categories that differ between frames are re-unified."""
+    df = pd.concat(frames, ignore_index=True)
+    return apply_schema(df, sheet_name)
+
+
+def to_sheet_values(df):
+    """Rows of cell values for writing `df` back to a worksheet ('' for missing)."""
+    cells = {}
+    for column in df.columns:
+        series = df[column]
+        if pd.api.types.is_datetime64_any_dtype(series):
+            cells[column] = series.dt.strftime(DATETIME_FORMAT).astype(object)
+        elif series.dtype == np.float32:
+            # float32 -> Python float would print 16.700000762939453; go through its short repr.
+            cells[column] = pd.to_numeric(series.astype(str), errors="coerce").astype(object)
+        else:
+            cells[column] = series.astype(object)
+    out = pd.DataFrame(cells, index=df.index)
+    return out.where(out.notna(), "").values.tolist()
+
+
+def frame_memory(df):
+    """Deep memory use of `df` in bytes."""
+    return int(df.memory_usage(deep=True).sum())
+
+
+def untyped_memory(df):
+    """Bytes `df` would take as the all-string frame Sheets returns, for before/after reports."""
+    strings = pd.DataFrame(to_sheet_values(df), columns=df.columns).astype(str)
+    return frame_memory(strings)
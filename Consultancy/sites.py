@@ -0,0 +1,168 @@
+import os
+import time
+import bisect
+import difflib
+import threading
+from collections import namedtuple
+
+import pandas as pd
+import streamlit as st
+from gspread.exceptions import WorksheetNotFound
+
+from constants import SITES_PATH, SITES_SHEET
+from gsheets import get_spreadsheet, cached_read
+
+# The monitored sites (sector, company, region, city, sampling points and
+# known coordinates), loaded from data/sites.csv or, with SITES_SOURCE =
+# "sheet" in secrets.toml, from the "Sites" worksheet with the same columns.
+# The registry is indexed by company and sector once per load and reloaded
+# when the file or worksheet changes, so adding a site needs no redeploy.
+SITE_COLUMNS = ["Sector", "Company", "Region", "City", "Sampling Points", "Longitude", "Latitude"]
+DEFAULT_SAMPLING_POINTS = ["Point 1", "Point 2", "Point 3", "Point 4"]
+SITES_CHECK_SECONDS = 5
+SEARCH_LIMIT = 50
+
+Site = namedtuple("Site", ["sector", "company", "region", "city", "sampling_points", "longitude", "latitude"])
+
+
+def _normalize(text):
+    return " ".join(str(text).lower().split())
+
+
+def _coordinate(value):
+    value = pd.to_numeric(value, errors="coerce")
+    return None if pd.isna(value) else float(value)
+
+
+class SiteRegistry:
+    """Sites indexed by company and sector, with prefix and fuzzy company search."""
+
+    def __init__(self, df):
+        df = df.reindex(columns=SITE_COLUMNS).fillna("").astype(str)
+        self._sectors = {}
+        self._by_company = {}
+        for row in df.itertuples(index=False):
+            sector, company = row[0].strip(), row[1].strip()
+            if not sector:
+                continue
+            companies = self._sectors.setdefault(sector, [])
+            if not company or company in self._by_company:
+                continue
+            points = [point.strip() for point in row[4].split(";") if point.strip()]
+            self._by_company[company] = Site(
+                sector, company, row[2].strip() or "Unknown", row[3].strip() or "Unknown",
+                points or DEFAULT_SAMPLING_POINTS, _coordinate(row[5]), _coordinate(row[6]),
+            )
+            companies.append(company)
+        # Every word of every name, sorted, so a prefix is two binary searches.
+        self._words = sorted(
+            (word, company)
+            for company in self._by_company
+            for word in set(_normalize(company).split()) | {_normalize(company)}
+        )
+        self._spellings = {}
+        for word, company in self._words:
+            self._spellings.setdefault(word, []).append(company)
+
+    def __len__(self):
+        return len(self._by_company)
+
+    def sectors(self):
+        return list(self._sectors)
+
+    def companies(self, sector=None):
+        if sector is None:
+            return list(self._by_company)
+        return list(self._sectors.get(sector, []))
+
+    def site(self, company):
+        return self._by_company.get(company)
+
+    def region_city(self, company):
+        site = self._by_company.get(company)
+        return (site.region, site.city) if site else ("Unknown", "Unknown")
+
+    def sampling_points(self, company):
+        site = self._by_company.get(company)
+        return site.sampling_points if site else DEFAULT_SAMPLING_POINTS
+
+    def search(self, query, sector=None, limit=SEARCH_LIMIT):
+        """Companies whose name, or a word in it, starts with `query`; close spellings if none do."""
+        query = _normalize(query)
+        if not query:
+            return self.companies(sector)[:limit]
+        start = bisect.bisect_left(self._words, (query,))
+        stop = bisect.bisect_left(self._words, (query + "\uffff",))
+        matches = dict.fromkeys(company for _, company in self._words[start:stop])
+        if not matches:
+            close = difflib.get_close_matches(query, self._spellings, n=limit, cutoff=0.75)
+            matches = dict.fromkeys(company for word in close for company in self._spellings[word])
+        return [
+            company for company in matches
+            if sector is None or self._by_company[company].sector == sector
+        ][:limit]
+
+
+def _sites_source():
+    try:
+        return str(st.secrets.get("SITES_SOURCE", "file")).lower()
+    except Exception:
+        return "file"
+
+
+@st.cache_resource
+def get_sites_sheet():
+    return get_spreadsheet().worksheet(SITES_SHEET)
+
+
+def _read_sites():
+    """(signature, frame) of the configured source; the signature changes when the data does."""
+    if _sites_source() == "sheet":
+        try:
+            values = cached_read(get_sites_sheet(), "get_all_values")
+        except WorksheetNotFound:
+            st.warning(f"⚠ Worksheet '{SITES_SHEET}' not found; using {SITES_PATH}.")
+        else:
+            if values:
+                return values, pd.DataFrame(values[1:], columns=values[0])
+            return values, pd.DataFrame(columns=SITE_COLUMNS)
+    stat = os.stat(SITES_PATH)
+    return (stat.st_mtime_ns, stat.st_size), None
+
+
+@st.cache_resource
+def _get_registry_state():
+    return {"lock": threading.Lock(), "registry": None, "signature": None, "checked_at": 0.0}
+
+
+def get_site_registry():
+    """The current SiteRegistry; the source is re-checked at most every SITES_CHECK_SECONDS."""
+    state = _get_registry_state()
+    with state["lock"]:
+        if state["registry"] is not None and time.monotonic() - state["checked_at"] < SITES_CHECK_SECONDS:
+            return state["registry"]
+        signature, df = _read_sites()
+        if state["registry"] is None or signature != state["signature"]:
+            if df is None:
+                df = pd.read_csv(SITES_PATH, dtype=str, keep_default_na=False)
+            state["registry"] = SiteRegistry(df)
+            state["signature"] = signature
+        state["checked_at"] = time.monotonic()
+        return state["registry"]
+
+
+def reload_sites():
+    """Drop the loaded registry so the next lookup reads the source again."""
+    state = _get_registry_state()
+    with state["lock"]:
+        state["registry"] = None
+
+
+def select_company(sector, label="🏢 Select Company", key=None):
+    """Search box plus company selectbox for `sector`; returns the company or "-- Select --"."""
+    registry = get_site_registry()
+    query = st.text_input("🔎 Search company", key=f"{key}_search" if key else None)
+    options = registry.search(query, sector) if query else registry.companies(sector)
+    if query and not options:
+        st.info("No matching company in this sector.")
+    return st.selectbox(label, ["-- Select --"] + options, key=key)
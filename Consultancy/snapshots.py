@@ -0,0 +1,113 @@
+import os
+import json
+import threading
+from datetime import datetime
+
+from constants import SNAPSHOT_DIR
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # snapshots are an optimisation; without pyarrow every cold start reads Sheets
+    pa = pq = None
+
+# Parquet copies of the worksheet frames held in resource's tail cache, so a
+# restarted process starts from disk and only revalidates against Sheets.
+# Each file carries its revision (row count, last row and the App Meta
+# revision tokens) in the schema metadata; resource.load_data_from_sheet uses
+# it to decide between serving the file, a tail read and a full reload.
+REVISION_KEY = b"consultancy.revision"
+
+_save_lock = threading.Lock()
+_saved_revisions = {}
+
+
+def snapshots_enabled():
+    return pq is not None
+
+
+def _path(sheet):
+    spreadsheet_id = getattr(sheet, "spreadsheet_id", None) or "default"
+    return os.path.join(SNAPSHOT_DIR, str(spreadsheet_id), f"{sheet.id}.parquet")
+
+
+def _same_revision(saved, revision):
+    return (
+        bool(saved)
+        and saved["row_count"] == revision["row_count"]
+        and saved["last_row"] == revision["last_row"]
+        and saved.get("tokens") == revision["tokens"]
+    )
+
+
+def load_snapshot(sheet):
+    """The tail-cache entry saved for `sheet`, memory-mapped from disk, or None."""
+    if not snapshots_enabled():
+        return None
+    path = _path(sheet)
+    if not os.path.exists(path):
+        return None
+    try:
+        table = pq.read_table(path, memory_map=True)
+        revision = json.loads(table.schema.metadata[REVISION_KEY])
+        df = table.to_pandas()
+    except Exception as e:
+        print(f"Ignoring unreadable snapshot {path}: {e}")
+        return None
+    _saved_revisions[path] = revision
+    return {
+        "title": revision["title"],
+        "headers": revision["headers"],
+        "row_count": revision["row_count"],
+        "last_row": revision["last_row"],
+        "revision": revision.get("tokens"),
+        "df": df,
+    }
+
+
+def _write(path, entry, revision):
+    table = pa.Table.from_pandas(entry["df"], preserve_index=False)
+    table = table.replace_schema_metadata({**(table.schema.metadata or {}), REVISION_KEY: json.dumps(revision).encode()})
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    pq.write_table(table, tmp_path)
+    os.replace(tmp_path, path)
+
+
+def _save(path, entry, revision):
+    with _save_lock:
+        if _same_revision(_saved_revisions.get(path), revision):
+            return
+        try:
+            _write(path, entry, revision)
+            _saved_revisions[path] = revision
+        except Exception as e:
+            print(f"Could not write snapshot {path}: {e}")
+
+
+def save_snapshot(sheet, entry):
+    """Write `entry` to disk in the background if its revision differs from the saved one."""
+    if not snapshots_enabled():
+        return
+    path = _path(sheet)
+    revision = {
+        "row_count": entry["row_count"],
+        "last_row": entry["last_row"],
+        "title": entry["title"],
+        "headers": entry["headers"],
+        "tokens": entry.get("revision"),
+        "saved_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+    }
+    if _same_revision(_saved_revisions.get(path), revision):
+        return
+    threading.Thread(target=_save, args=(path, entry, revision), name="snapshot-writer", daemon=True).start()
+
+
+def delete_snapshot(sheet):
+    path = _path(sheet)
+    with _save_lock:
+        _saved_revisions.pop(path, None)
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass